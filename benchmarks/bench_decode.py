@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Throughput of batch METAR decoding against the per-report path.
+
+The fixed corpus in benchmarks/data/metars.txt is repeated to the
+requested size.
+
+Usage:
+
+    python benchmarks/bench_decode.py --reports 20000 --processes 4
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+from itertools import islice, cycle
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from metar import Metar  # noqa: E402
+
+from wxcast.api import decode_metars, metar_to_dict  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'data', 'metars.txt')
+FIELDS = ('station', 'time', 'temperature', 'dew point', 'wind', 'pressure')
+
+
+def load_corpus(size):
+    with open(CORPUS) as f:
+        reports = [line.strip() for line in f if line.strip()]
+
+    return list(islice(cycle(reports), size))
+
+
+def per_report(corpus):
+    """The decode path used by get_metar, one report at a time."""
+    results = []
+
+    for raw in corpus:
+        try:
+            results.append(metar_to_dict(Metar.Metar(raw)))
+        except Metar.ParserError:
+            results.append(None)
+
+    return results
+
+
+def timed(label, func, corpus, baseline=None, repeat=3):
+    elapsed = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = func(corpus)
+        elapsed = min(elapsed or 1e9, time.perf_counter() - start)
+
+    rate = len(corpus) / elapsed
+
+    print(
+        '{:<34}{:>10.3f}s{:>14,.0f}/s{:>9}'.format(
+            label,
+            elapsed,
+            rate,
+            '{:.2f}x'.format(rate / baseline) if baseline else ''
+        )
+    )
+    return rate, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--reports', type=int, default=20000)
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=0,
+        help='Worker processes for an extra parallel run, off by default.'
+    )
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.reports)
+    warnings.simplefilter('ignore', RuntimeWarning)
+    print(f'{len(corpus)} reports, {os.cpu_count()} CPUs')
+    print('{:<34}{:>11}{:>16}{:>9}'.format('path', 'time', 'reports', ''))
+
+    baseline, expected = timed('metar_to_dict per report', per_report, corpus)
+    rate, results = timed(
+        'decode_metars',
+        lambda c: list(decode_metars(c)),
+        corpus,
+        baseline
+    )
+    assert results == expected
+
+    timed(
+        'decode_metars (6 fields)',
+        lambda c: list(decode_metars(c, fields=FIELDS)),
+        corpus,
+        baseline
+    )
+    timed(
+        'decode_metars (fields, no strict)',
+        lambda c: list(decode_metars(c, fields=FIELDS, strict=False)),
+        corpus,
+        baseline
+    )
+
+    if args.processes and args.processes > 1:
+        rate, results = timed(
+            f'decode_metars ({args.processes} processes)',
+            lambda c: list(decode_metars(c, processes=args.processes)),
+            corpus,
+            baseline
+        )
+        assert results == expected
+
+
+if __name__ == '__main__':
+    main()
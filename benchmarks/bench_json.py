@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+JSON decoding throughput on the recorded cassette payloads.
+
+Compares the previous stdlib path with an OrderedDict hook against
+the plain stdlib and orjson backends of wxcast.jsonlib.
+
+Usage:
+
+    python benchmarks/bench_json.py --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from collections import OrderedDict
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from server import load_cassettes  # noqa: E402
+
+from wxcast.jsonlib import BACKENDS  # noqa: E402
+
+
+def load_payloads():
+    """
+    Return the JSON bodies of all cassettes, largest first.
+    """
+    payloads = []
+
+    for status, headers, body in load_cassettes('http://localhost').values():
+        try:
+            json.loads(body)
+        except ValueError:
+            continue
+
+        payloads.append(body)
+
+    return sorted(payloads, key=len, reverse=True)
+
+
+def timed(label, loads, payloads, repeat, baseline=None):
+    elapsed = None
+    size = sum(len(payload) for payload in payloads)
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            loads(payload)
+        elapsed = min(elapsed or 1e9, time.perf_counter() - start)
+
+    rate = size / elapsed / 1e6
+    print(
+        '{:<34}{:>10.4f}s{:>10.1f}MB/s{:>9}'.format(
+            label,
+            elapsed,
+            rate,
+            '{:.2f}x'.format(rate / baseline) if baseline else ''
+        )
+    )
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--largest',
+        type=int,
+        help='Only decode the n largest payloads.'
+    )
+    args = parser.parse_args()
+
+    payloads = load_payloads()[:args.largest]
+    print(
+        '{} payloads, {:,} bytes, largest {:,} bytes\n'.format(
+            len(payloads),
+            sum(len(payload) for payload in payloads),
+            len(payloads[0])
+        )
+    )
+    print('{:<34}{:>11}{:>14}{:>9}'.format('backend', 'time', 'rate', ''))
+
+    baseline = timed(
+        'json (object_pairs_hook)',
+        partial(json.loads, object_pairs_hook=OrderedDict),
+        payloads,
+        args.repeat
+    )
+
+    for name, loads in sorted(BACKENDS.items()):
+        timed(name, loads, payloads, args.repeat, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Achieved request rate through the per-host rate limiter.
+
+Many concurrent api calls are replayed through the local stand-in
+server. The achieved rate should stay at the configured limit, after
+the initial burst, however many workers are used.
+
+Usage:
+
+    python benchmarks/bench_ratelimit.py --rate 10 --requests 100 -w 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from server import ReplayServer  # noqa: E402
+
+from wxcast import api  # noqa: E402
+from wxcast.session import (  # noqa: E402
+    create_session,
+    get_rate_stats,
+    get_session,
+    set_session
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rate', type=float, default=10.0)
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('-w', '--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with ReplayServer() as server:
+        api.NWS_API = server.base_url
+        set_session(create_session(rate_limit=args.rate, burst=args.burst))
+
+        def call(_):
+            # Bypass request coalescing, every call is a request.
+            return get_session().get(f'{server.base_url}/offices/OHX')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    stats = get_rate_stats()
+    set_session(None)
+    expected = max(args.requests - args.burst, 0) / args.rate
+
+    print(f'requests:       {server.requests}')
+    print(f'elapsed:        {elapsed:.2f}s (expected {expected:.2f}s)')
+    print(
+        'achieved rate:  {:.2f}/s after burst (limit {:.2f}/s)'.format(
+            max(args.requests - args.burst, 0) / elapsed, args.rate
+        )
+    )
+    print(f'throttled:      {stats["throttled"]}')
+    print(f'retries:        {stats["retries"]}')
+
+
+if __name__ == '__main__':
+    main()
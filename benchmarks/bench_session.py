@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Per-call latency of the wxcast api with and without a pooled session.
+
+Replays the recorded cassettes through a local stand-in server. The
+connect delay approximates the TCP+TLS handshake that every new
+connection to api.weather.gov costs.
+
+Usage:
+
+    python benchmarks/bench_session.py --rounds 20 --connect-delay 0.05
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from server import ReplayServer  # noqa: E402
+
+from wxcast import api  # noqa: E402
+from wxcast.constants import HEADERS  # noqa: E402
+from wxcast.session import create_session, set_session  # noqa: E402
+
+CALLS = [
+    ('get_metar', ('KDEN',)),
+    ('get_nws_product', ('bou', 'afd')),
+    ('get_point_info', ('39.74,-104.992',)),
+    ('get_wfo_products', ('bou',)),
+    ('get_wfo_info', ('ohx',)),
+    ('get_stations_for_wfo', ('ohx',)),
+    ('get_station_info', ('kbna',)),
+]
+
+
+class UnpooledSession(object):
+    """Mimics the previous behaviour of one requests.get per call."""
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('headers', HEADERS)
+        return requests.get(url, **kwargs)
+
+
+def run(rounds):
+    timings = {name: [] for name, _ in CALLS}
+
+    for _ in range(rounds):
+        for name, args in CALLS:
+            start = time.perf_counter()
+            getattr(api, name)(*args)
+            timings[name].append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument(
+        '--connect-delay',
+        type=float,
+        default=0.05,
+        help='Seconds added to every new connection (simulated handshake).'
+    )
+    args = parser.parse_args()
+
+    with ReplayServer(connect_delay=args.connect_delay) as server:
+        api.NWS_API = server.base_url
+        results = {}
+
+        for label, session in (
+            ('unpooled', UnpooledSession()),
+            ('pooled', create_session())
+        ):
+            set_session(session)
+            server.connections = 0
+            results[label] = (run(args.rounds), server.connections)
+
+    set_session(None)
+
+    print(
+        '{:<22}{:>14}{:>14}{:>10}'.format(
+            'call', 'unpooled ms', 'pooled ms', 'speedup'
+        )
+    )
+    for name, _ in CALLS:
+        before = statistics.median(results['unpooled'][0][name]) * 1000
+        after = statistics.median(results['pooled'][0][name]) * 1000
+        print(
+            '{:<22}{:>14.2f}{:>14.2f}{:>9.1f}x'.format(
+                name, before, after, before / after
+            )
+        )
+
+    print(
+        '\nconnections opened: unpooled={0} pooled={1}'.format(
+            results['unpooled'][1], results['pooled'][1]
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
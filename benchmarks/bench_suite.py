@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Regression suite for CLI latency, import time and decode/render cost.
+
+Every click command is run in-process against the local stand-in for
+api.weather.gov with --refresh, so each run pays for the HTTP round
+trips, JSON parsing and output formatting but not for a real network.
+The ArcGIS geocode for the forecast is seeded in the lookup cache since
+the stand-in only replays NWS responses.
+
+Each benchmark reports the median seconds per operation and the same
+time relative to a fixed reference workload timed on the same machine.
+The relative times are compared with benchmarks/baselines.json and the
+script exits with a non-zero status when any benchmark is slower than
+its baseline by more than the tolerance. Relative times carry over
+between machines far better than seconds, so the tracked baselines
+can be checked on any machine and in CI.
+
+--save writes the relative times to the given file. The tracked
+baselines only change when that file is given explicitly.
+
+Usage:
+
+    python benchmarks/bench_suite.py --tolerance 0.5
+    python benchmarks/bench_suite.py --only cli:
+    python benchmarks/bench_suite.py --save /tmp/baselines.json
+    python benchmarks/bench_suite.py --save benchmarks/baselines.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from click.testing import CliRunner  # noqa: E402
+from metar import Metar  # noqa: E402
+
+from server import ReplayServer  # noqa: E402
+
+from wxcast import api, utils  # noqa: E402
+from wxcast.cache import LookupCache  # noqa: E402
+from wxcast.cli import main as cli  # noqa: E402
+from wxcast.constants import GEOCODE_TTL  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+CORPUS = os.path.join(os.path.dirname(__file__), 'data', 'metars.txt')
+
+COMMANDS = [
+    ('metar', ['metar', 'KDEN']),
+    ('metar -d', ['metar', '-d', 'KDEN']),
+    ('conditions', ['conditions', '-t', 'F', 'KDFW']),
+    ('text', ['text', 'bou', 'afd']),
+    ('forecast', ['forecast', 'denver, co']),
+    ('products', ['products', 'bou']),
+    ('offices', ['offices']),
+    ('office', ['office', 'OHX']),
+    ('stations', ['stations', 'OHX']),
+    ('station', ['station', 'KBNA']),
+]
+GEOCODE = ('denver, co', (39.74001000000004, -104.99201999999997))
+
+
+def measure(func, rounds, number=1):
+    """
+    Median seconds per call of func over the given rounds.
+
+    :param func: Callable to time.
+    :param rounds: Number of timed rounds after one warm up round.
+    :param number: Calls per round.
+    :return: Median seconds per call.
+    """
+    func()
+    timings = []
+
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return statistics.median(timings)
+
+
+def reference_work():
+    """Fixed pure Python work that all results are divided by."""
+    records = [
+        {'id': i, 'name': str(i) * 3, 'value': i / 7} for i in range(2000)
+    ]
+    json.loads(json.dumps(records))
+    sorted(records, key=lambda record: record['name'])
+
+
+def bench_reference(rounds):
+    return measure(reference_work, rounds, number=5)
+
+
+def bench_commands(rounds):
+    results = {}
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            ReplayServer() as server:
+        os.environ['WXCAST_CACHE_DIR'] = cache_dir
+        api.NWS_API = server.base_url
+
+        lookups = LookupCache()
+        lookups.set('geocode', GEOCODE[0], GEOCODE[1], GEOCODE_TTL)
+        lookups.close()
+
+        for name, args in COMMANDS:
+            def run():
+                result = runner.invoke(cli, ['--refresh'] + args)
+
+                if result.exit_code or server.misses:
+                    raise SystemExit(
+                        '{0} failed: {1}{2}'.format(
+                            name, result.output, server.misses
+                        )
+                    )
+
+            results['cli:' + name] = measure(run, rounds)
+
+    return results
+
+
+def bench_import(rounds):
+    code = (
+        'import time; start = time.perf_counter(); import wxcast.cli; '
+        'print(time.perf_counter() - start)'
+    )
+    timings = []
+
+    for _ in range(rounds):
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=ROOT
+        )
+        timings.append(float(output))
+
+    return {'import wxcast.cli': statistics.median(timings)}
+
+
+def load_metars():
+    metars = []
+
+    with open(CORPUS) as f:
+        for line in f:
+            try:
+                metars.append(Metar.Metar(line.strip()))
+            except Metar.ParserError:
+                pass
+
+    return metars
+
+
+def bench_decode(rounds):
+    metars = load_metars()
+
+    def decode():
+        for metar in metars:
+            api.metar_to_dict(metar)
+
+    return {
+        'metar_to_dict': measure(decode, rounds, number=20) / len(metars)
+    }
+
+
+def bench_render(rounds):
+    data = api.metar_to_dict(load_metars()[0])
+    spaces = utils.get_max_key(data)
+
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.echo_dict(data, False, spaces=spaces)
+
+    return {'echo_dict': measure(render, rounds, number=200)}
+
+
+def compare(results, reference, baselines, tolerance):
+    """
+    Print results next to the baselines and return the regressions.
+
+    :param results: Dictionary of {benchmark: seconds}.
+    :param reference: Seconds of the reference work on this machine.
+    :param baselines: Dictionary of {benchmark: relative time}.
+    :param tolerance: Allowed slowdown as a fraction of the baseline.
+    :return: List of regressed benchmark names.
+    """
+    regressions = []
+    print('reference work: {:.4f} ms\n'.format(reference * 1000))
+    print(
+        '{:<22}{:>12}{:>12}{:>12}{:>9}'.format(
+            'benchmark', 'median ms', 'relative', 'baseline', ''
+        )
+    )
+
+    for name, seconds in results.items():
+        relative = seconds / reference
+        baseline = baselines.get(name)
+        status = ''
+
+        if baseline:
+            ratio = relative / baseline
+            status = '{:.2f}x'.format(ratio)
+
+            if ratio > 1 + tolerance:
+                regressions.append(name)
+                status += ' SLOWER'
+
+        print(
+            '{:<22}{:>12.4f}{:>12.4g}{:>12}  {}'.format(
+                name,
+                seconds * 1000,
+                relative,
+                '{:.4g}'.format(baseline) if baseline else '-',
+                status
+            )
+        )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.5,
+        help='Allowed slowdown relative to the baseline (0.5 = 50%%).'
+    )
+    parser.add_argument(
+        '--only',
+        default='',
+        help='Only run benchmarks whose name starts with this prefix.'
+    )
+    parser.add_argument(
+        '--baselines',
+        default=BASELINES,
+        help='File with the baselines to compare with.'
+    )
+    parser.add_argument(
+        '--save',
+        metavar='FILE',
+        help='Store the relative times as baselines in FILE.'
+    )
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', RuntimeWarning)
+    reference = bench_reference(args.rounds)
+    results = {}
+
+    for bench in (bench_commands, bench_import, bench_decode, bench_render):
+        results.update(bench(args.rounds))
+
+    results = {
+        name: seconds for name, seconds in results.items()
+        if name.startswith(args.only)
+    }
+
+    try:
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    regressions = compare(results, reference, baselines, args.tolerance)
+
+    if args.save:
+        try:
+            with open(args.save) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = {}
+
+        saved.update(
+            (name, seconds / reference) for name, seconds in results.items()
+        )
+
+        with open(args.save, 'w') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+        print('\nBaselines saved to {0}'.format(args.save))
+    elif regressions:
+        sys.exit(
+            '\n{0} benchmark(s) regressed more than {1:.0%}: {2}'.format(
+                len(regressions), args.tolerance, ', '.join(regressions)
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Local stand-in for api.weather.gov that replays the recorded cassettes.
+
+Responses are served over plain HTTP/1.1 with keep-alive. A connect
+delay can be configured to approximate the TCP+TLS handshake cost paid
+on every new connection to the real api.
+"""
+
+import glob
+import gzip
+import os
+import threading
+import time
+import zlib
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import yaml
+
+NWS_HOST = 'https://api.weather.gov'
+CASSETTES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    'tests',
+    'cassettes'
+)
+SKIP_HEADERS = {
+    'connection',
+    'content-encoding',
+    'content-length',
+    'transfer-encoding'
+}
+
+
+def _decode_body(body, headers):
+    if isinstance(body, str):
+        body = body.encode()
+
+    encoding = ','.join(headers.get('Content-Encoding', [])).lower()
+    if 'gzip' in encoding:
+        body = gzip.decompress(body)
+    elif 'deflate' in encoding:
+        body = zlib.decompress(body)
+
+    return body
+
+
+def load_cassettes(base_url, path=CASSETTES):
+    """
+    Load all recorded NWS responses keyed by request path.
+
+    Absolute api.weather.gov urls in the payloads are rewritten to
+    point at base_url so follow up requests stay local.
+
+    :param base_url: The url the stand-in server is reachable at.
+    :param path: Directory containing vcr cassettes.
+    :return: Dictionary of {path: (status, headers, body)}.
+    """
+    responses = {}
+
+    for cassette in sorted(glob.glob(os.path.join(path, '*.yml'))):
+        with open(cassette) as f:
+            data = yaml.safe_load(f)
+
+        for interaction in data['interactions']:
+            url = urlsplit(interaction['request']['uri'])
+            if not interaction['request']['uri'].startswith(NWS_HOST):
+                continue
+
+            key = url.path + ('?' + url.query if url.query else '')
+            response = interaction['response']
+            body = _decode_body(
+                response['body']['string'],
+                response['headers']
+            ).replace(NWS_HOST.encode(), base_url.encode())
+            headers = [
+                (name, value)
+                for name, values in response['headers'].items()
+                if name.lower() not in SKIP_HEADERS
+                for value in values
+            ]
+            responses.setdefault(
+                key,
+                (response['status']['code'], headers, body)
+            )
+
+    return responses
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Called once per new connection, not per request.
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+
+        self.server.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        self.server.requests += 1
+
+        try:
+            status, headers, body = self.server.responses[self.path]
+        except KeyError:
+            self.server.misses.append(self.path)
+            status, headers, body = (
+                404,
+                [('Content-Type', 'application/json')],
+                b'{"status": 404}'
+            )
+
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, connect_delay=0.0, host='127.0.0.1', port=0):
+        super().__init__((host, port), ReplayHandler)
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.requests = 0
+        self.misses = []
+        self.base_url = 'http://{0}:{1}'.format(*self.server_address)
+        self.responses = load_cassettes(self.base_url)
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
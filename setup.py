@@ -33,14 +33,38 @@ with open('CHANGES.md') as changes_file:
 
 requirements = [
     'certifi',
-    'Click>=6.0',
+    'Click>=8.0',
     'geopy',
     'requests',
     'metar'
 ]
 
+aio_requirements = [
+    'aiohttp'
+]
+
+numpy_requirements = [
+    'numpy'
+]
+
+arrow_requirements = [
+    'pyarrow'
+]
+
+json_requirements = [
+    'orjson'
+]
+
+stream_requirements = [
+    'ijson'
+]
+
 test_requirements = [
+    'aiohttp',
     'flake8',
+    'ijson',
+    'numpy',
+    'pyarrow',
     'pytest',
     'pytest-cov',
     'vcrpy'
@@ -62,11 +86,16 @@ setup(
     },
     entry_points={
         'console_scripts': [
-            'wxcast=wxcast.cli:main'
+            'wxcast=wxcast.client:main'
         ]
     },
     install_requires=requirements,
     extras_require={
+        'aio': aio_requirements,
+        'numpy': numpy_requirements,
+        'arrow': arrow_requirements,
+        'json': json_requirements,
+        'stream': stream_requirements,
         'test': test_requirements,
     },
     license='GPLv3+',
@@ -0,0 +1,133 @@
+import io
+
+import pytest
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from wxcast import api, cache, session
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    """Keep wxcast cache files out of the user's home directory."""
+    path = tmpdir.mkdir('cache')
+    monkeypatch.setenv('WXCAST_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def lookup_cache(monkeypatch):
+    """Start every test without the lookup cache set by cli commands."""
+    monkeypatch.setattr(cache, '_lookup_cache', None)
+
+
+class FakeJson(object):
+    """Answer api.get_json and api.iter_json with bodies set per url."""
+
+    def __init__(self, monkeypatch):
+        self.responses = {}
+        self.requested = []
+        monkeypatch.setattr(api, 'get_json', self.get_json)
+        monkeypatch.setattr(api, 'iter_json', self.iter_json)
+
+    def set(self, url, body, status=200):
+        self.responses[url] = (status, body)
+
+    def get_json(self, url):
+        self.requested.append(url)
+        return self.responses.get(
+            url, (404, {'status': 404, 'detail': 'Not Found'})
+        )
+
+    def iter_json(self, url, prefix):
+        status, data = self.get_json(url)
+        return status, session._select(data, prefix.split('.'))
+
+
+@pytest.fixture
+def fake_json(monkeypatch):
+    """
+    Fake the NWS api responses for tests of the wxcast.api functions.
+
+    Urls without a body answer 404.
+    """
+    return FakeJson(monkeypatch)
+
+
+class FakeApi(object):
+    """Replace wxcast.api functions and record their calls."""
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.calls = []
+
+    def set(self, name, result):
+        """
+        Replace api.<name>.
+
+        A callable result is called with the arguments of every call,
+        any other result is returned as is.
+        """
+        def fake(*args, **kwargs):
+            self.calls.append((name, args))
+
+            if callable(result):
+                return result(*args, **kwargs)
+
+            return result
+
+        self.monkeypatch.setattr(api, name, fake)
+
+    def called(self, name):
+        """Return the positional arguments of every call to api.<name>."""
+        return [args for called, args in self.calls if called == name]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    Fake wxcast.api functions for tests of the layers above the api.
+
+    Tests of the api functions themselves use fake_json.
+    """
+    return FakeApi(monkeypatch)
+
+
+class FakeSend(object):
+    """Answer requests sent by any HTTPAdapter with canned responses."""
+
+    def __init__(self):
+        self.reply(200)
+
+    def reply(self, *statuses, body=b'', headers=None):
+        """
+        Set the responses and clear the sent urls.
+
+        Requests are answered with statuses in order, the last status
+        is repeated. Every response has the same body and headers.
+        """
+        self.statuses = statuses
+        self.body = body
+        self.headers = headers or {}
+        self.sent = []
+
+    def __call__(self, request, **kwargs):
+        self.sent.append(request.url)
+        index = min(len(self.sent), len(self.statuses)) - 1
+
+        response = requests.Response()
+        response.status_code = self.statuses[index]
+        response.raw = io.BytesIO(self.body)
+        response.headers.update(self.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+
+@pytest.fixture
+def fake_send(monkeypatch):
+    """Fake the transport for tests of the session and retry layer."""
+    fake = FakeSend()
+    monkeypatch.setattr(HTTPAdapter, 'send', fake)
+    return fake
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+import vcr
+
+from wxcast import session
+from wxcast.exceptions import WxcastException, WxcastNotFound
+
+aio = pytest.importorskip('wxcast.aio')
+
+
+def run_loop(coro):
+    # asyncio.run needs Python 3.7.
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await aio.close_session()
+
+    return run_loop(wrapper())
+
+
+@vcr.use_cassette('tests/cassettes/aio_metars.yml')
+def test_get_metar():
+    async def gather():
+        return await asyncio.gather(
+            aio.get_metar('KDEN'),
+            aio.get_metar('KFAKE'),
+            return_exceptions=True
+        )
+
+    metar, error = run(gather())
+    assert metar.startswith('KDEN 232253Z')
+    assert isinstance(error, WxcastNotFound)
+    assert 'KFAKE is not a valid station id.' in str(error)
+
+
+def test_get_metar_bad_report(monkeypatch):
+    async def get_json(url):
+        return 200, {
+            'properties': {
+                'rawMessage': 'KBAD NOT A METAR',
+                'elevation': {'value': 1656}
+            }
+        }
+
+    monkeypatch.setattr(aio, '_get_json', get_json)
+
+    with pytest.raises(WxcastException) as error:
+        run(aio.get_metar('KBAD', decoded=True))
+
+    assert 'Could not decode metar for KBAD' in str(error.value)
+
+
+def test_get_point_info(monkeypatch):
+    requested = []
+
+    async def get_json(url):
+        requested.append(url)
+
+        if url.endswith('/0.0,0.0'):
+            return 404, {'status': 404}
+
+        return 200, {'properties': {'gridId': 'BOU', 'gridX': 62, 'gridY': 61}}
+
+    monkeypatch.setattr(aio, '_get_json', get_json)
+
+    # Coordinates are rounded like api.get_point_info does.
+    point = run(aio.get_point_info('39.740001234,-104.99212345'))
+    assert point == {'wfo': 'BOU', 'x': 62, 'y': 61}
+    assert requested == [f'{aio.NWS_API}/points/39.74,-104.9921']
+
+    with pytest.raises(WxcastNotFound):
+        run(aio.get_point_info('0,0'))
+
+
+@vcr.use_cassette('tests/cassettes/aio_text_afd.yml')
+def test_get_nws_product():
+    text = run(aio.get_nws_product('bou', 'afd'))
+    assert 'Area Forecast Discussion' in text
+
+
+@vcr.use_cassette('tests/cassettes/aio_office.yml')
+def test_get_wfo_info():
+    info = run(aio.get_wfo_info('ohx'))
+    assert info['name'] == 'Nashville, TN'
+
+
+@vcr.use_cassette('tests/cassettes/aio_station_invalid.yml')
+def test_get_station_info_invalid():
+    with pytest.raises(WxcastException):
+        run(aio.get_station_info('kfake'))
+
+
+def test_get_seven_day_forecast_geocode_error(monkeypatch):
+    from geopy.exc import GeocoderServiceError
+    from geopy.geocoders import ArcGIS
+
+    async def geocode(self, query, **kwargs):
+        raise GeocoderServiceError('unavailable')
+
+    monkeypatch.setattr(ArcGIS, 'geocode', geocode)
+
+    with pytest.raises(WxcastException) as error:
+        run(aio.get_seven_day_forecast('denver'))
+
+    assert 'Could not geocode location: denver' in str(error.value)
+
+
+def test_get_session_new_loop():
+    async def first():
+        return aio.get_session()
+
+    async def second():
+        session = aio.get_session()
+        await asyncio.sleep(0)
+        return session
+
+    old = run_loop(first())
+    new = run(second())
+
+    assert new is not old
+    assert old.closed
+
+
+class FakeResponse(object):
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession(object):
+    """Answer aio requests with statuses in order."""
+
+    closed = False
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url):
+        self.sent.append(url)
+        return FakeResponse(*self.responses.pop(0))
+
+    async def close(self):
+        self.closed = True
+
+
+def test_get_json_retry(monkeypatch):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    session.set_session(session.create_session())
+    aio.set_session(FakeSession(
+        (503, b'', {}),
+        (429, b'', {'Retry-After': '2'}),
+        (200, b'{"id": "KDEN"}', {})
+    ))
+
+    try:
+        status, data = run(aio._get_json('http://wx/stations/KDEN'))
+        stats = session.get_rate_stats()
+    finally:
+        session.set_session(None)
+
+    assert (status, data) == (200, {'id': 'KDEN'})
+    assert 0.25 <= sleeps[0] <= 0.5
+    assert sleeps[1] == 2
+    assert stats['requests'] == 3
+    assert stats['retry_statuses'] == {503: 1, 429: 1}
+
+
+def test_get_json_retry_gives_up(monkeypatch):
+    async def sleep(delay):
+        pass
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    fake = FakeSession(*[(503, b'unavailable', {})] * 4)
+    aio.set_session(fake)
+
+    status, data = run(aio._get_json('http://wx/stations/KDEN'))
+    assert (status, data) == (503, None)
+    assert len(fake.sent) == 4
@@ -0,0 +1,119 @@
+import vcr
+
+from metar import Metar
+
+from wxcast import api
+
+
+@vcr.use_cassette('tests/cassettes/metars.yml')
+def test_get_metars():
+    results = {
+        station_id: (metar, error)
+        for station_id, metar, error in api.get_metars(
+            ['KDEN', 'KFAKE'], max_workers=1
+        )
+    }
+
+    assert results['KDEN'][0].startswith('KDEN 232253Z')
+    assert results['KDEN'][1] is None
+    assert results['KFAKE'][0] is None
+    assert 'KFAKE is not a valid station id.' in str(results['KFAKE'][1])
+
+
+def test_get_metars_bad_report(monkeypatch):
+    reports = {
+        'KDEN': 'KDEN 232253Z 36018KT 10SM FEW033 04/M03 A2985',
+        'KBAD': 'KBAD NOT A METAR'
+    }
+    monkeypatch.setattr(
+        api,
+        '_get_latest_metar',
+        lambda station_id: (
+            reports[station_id], {'elevation': {'value': 1656}}
+        )
+    )
+
+    results = list(
+        api.get_metars(['KDEN', 'KBAD', 'KDEN'], decoded=True, max_workers=1)
+    )
+
+    assert len(results) == 3
+    decoded = [metar for station_id, metar, error in results if metar]
+    assert [metar['station'] for metar in decoded] == ['KDEN', 'KDEN']
+
+    errors = [error for station_id, metar, error in results if error]
+    assert len(errors) == 1
+    assert 'Could not decode metar for KBAD' in str(errors[0])
+
+
+def test_decode_metars():
+    raw = [
+        'KDEN 232253Z 36018KT 10SM FEW033 BKN065 BKN200 04/M03 A2985 '
+        'RMK AO2 SLP104 T00441028 $',
+        'KXYZ NOT A METAR',
+        'KDFW 241953Z 11009G18KT 10SM SCT120 BKN250 23/08 A2972 '
+        'RMK AO2 SLP064 T02330078'
+    ]
+    expected = api.metar_to_dict(
+        Metar.Metar(raw[0], month=3, year=2021), temp_unit='F'
+    )
+
+    results = list(
+        api.decode_metars(raw, temp_unit='F', month=3, year=2021, chunksize=2)
+    )
+    assert results[0] == expected
+    assert results[1] is None
+    assert results[2]['wind'] == 'ESE at 9 knots, gusting to 18 knots'
+
+    results = list(
+        api.decode_metars(raw, fields=['station', 'wind'], processes=2)
+    )
+    assert results[0] == {'station': 'KDEN', 'wind': 'N at 18 knots'}
+    assert results[1] is None
+
+
+def test_decode_metars_errors(monkeypatch):
+    raw = ['KDEN 232253Z 36018KT 10SM 04/M03 A2985', 'KDFW 241953Z 23/08']
+
+    def station(metar_obj, temp_unit, pressure_unit):
+        if metar_obj.station_id == 'KDEN':
+            raise ValueError('bad group')
+
+        return metar_obj.station_id
+
+    monkeypatch.setattr(api, 'METAR_FIELDS', (('station', None, station),))
+    results = list(api.decode_metars(raw, strict=False))
+
+    assert isinstance(results[0], api.WxcastException)
+    assert 'bad group' in str(results[0])
+    assert results[1] == {'station': 'KDFW'}
+
+
+def test_decode_metars_processes(monkeypatch):
+    pools = []
+
+    class Pool(object):
+        def __init__(self, processes):
+            pools.append(processes)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def imap(self, func, chunks):
+            return map(func, chunks)
+
+    import multiprocessing
+
+    monkeypatch.setattr(multiprocessing, 'Pool', Pool)
+    raw = ['KDEN 232253Z 36018KT 10SM 04/M03 A2985'] * 3
+
+    # Worker processes are only used when requested.
+    assert len(list(api.decode_metars(raw, chunksize=1))) == 3
+    list(api.decode_metars(raw, processes=1))
+    assert pools == []
+
+    assert len(list(api.decode_metars(raw, processes=4))) == 3
+    assert pools == [4]
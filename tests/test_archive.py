@@ -0,0 +1,142 @@
+import sqlite3
+
+import pytest
+
+from click.testing import CliRunner
+
+from wxcast import api
+from wxcast.archive import ProductArchive, text_digest
+from wxcast.cli import main
+
+LISTING = f'{api.NWS_API}/products/types/AFD/locations/BOU'
+TEXTS = {
+    'a': 'AREA FORECAST DISCUSSION\nSNOW TONIGHT.',
+    'b': 'AREA FORECAST DISCUSSION\nSNOW TONIGHT.',
+    'c': 'AREA FORECAST DISCUSSION\nCLEARING.',
+}
+
+
+def fake_products(fake_json, broken=()):
+    fake_json.set(LISTING, {
+        '@graph': [
+            {
+                '@id': f'{api.NWS_API}/products/{product_id}',
+                'id': product_id,
+                'issuanceTime': f'2021-03-23T0{index}:00:00+00:00'
+            }
+            for index, product_id in enumerate(sorted(TEXTS))
+        ]
+    })
+
+    for product_id, text in TEXTS.items():
+        url = f'{api.NWS_API}/products/{product_id}'
+
+        if product_id in broken:
+            fake_json.set(url, {'status': 500}, status=500)
+        else:
+            fake_json.set(url, {'id': product_id, 'productText': text})
+
+    return fake_json.requested
+
+
+def test_product_archive_dedup(tmpdir):
+    archive = ProductArchive(str(tmpdir.join('archive.sqlite')))
+
+    assert archive.add('a', 'bou', 'afd', '2021-03-23T00:00', TEXTS['a'])
+    assert not archive.add('b', 'bou', 'afd', '2021-03-23T01:00', TEXTS['b'])
+    assert archive.add('c', 'bou', 'afd', '2021-03-23T02:00', TEXTS['c'])
+
+    assert archive.missing(['a', 'd', 'c', 'e']) == ['d', 'e']
+    assert archive.missing([]) == []
+    assert archive.get_text('b') == TEXTS['a']
+    assert archive.get_text('d') is None
+    assert [row[0] for row in archive.issuances('BOU', 'AFD')] == [
+        'c', 'b', 'a'
+    ]
+    assert archive.issuances('BOU', 'AFD')[0][2] == text_digest(TEXTS['c'])
+
+    counts = archive.counts()
+    assert counts['products'] == 3
+    assert counts['texts'] == 2
+    archive.close()
+
+
+def test_product_archive_last_seen(tmpdir):
+    with ProductArchive(str(tmpdir.join('archive.sqlite'))) as archive:
+        archive.add('c', 'bou', 'afd', '2021-03-23T02:00', TEXTS['c'])
+        archive.set_last_seen('bou', 'afd', TEXTS['a'])
+        archive.set_last_seen('slc', 'afd', TEXTS['a'])
+        assert archive.counts()['texts'] == 2
+
+        # Still last seen for slc.
+        archive.set_last_seen('bou', 'afd', TEXTS['c'])
+        assert archive.counts()['texts'] == 2
+
+        # Replaced texts that are not referenced are deleted.
+        archive.set_last_seen('slc', 'afd', 'NEW TEXT')
+        assert archive.counts()['texts'] == 2
+        assert archive.last_seen('SLC', 'AFD') == 'NEW TEXT'
+
+        # Archived texts are kept.
+        archive.set_last_seen('bou', 'afd', 'NEW TEXT')
+        assert archive.counts()['texts'] == 2
+        assert archive.get_text('c') == TEXTS['c']
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        archive.counts()
+
+
+def test_archive_products(tmpdir, fake_json):
+    requested = fake_products(fake_json)
+    archive = ProductArchive(str(tmpdir.join('archive.sqlite')))
+
+    summary = api.archive_products(
+        'bou', 'afd', count=2, archive=archive, max_workers=1
+    )
+    assert summary == {
+        'listed': 2,
+        'skipped': 0,
+        'fetched': 2,
+        'new texts': 1,
+        'failed': 0
+    }
+
+    # Archived issuances are not requested again.
+    del requested[:]
+    summary = api.archive_products('bou', 'afd', archive=archive)
+    assert summary['skipped'] == 2
+    assert summary['fetched'] == 1
+    assert summary['new texts'] == 1
+    assert requested == [LISTING, f'{api.NWS_API}/products/c']
+    assert archive.counts()['texts'] == 2
+
+
+def test_archive_products_failure(tmpdir, fake_json):
+    fake_products(fake_json, broken=('b', 'c'))
+    archive = ProductArchive(str(tmpdir.join('archive.sqlite')))
+
+    summary = api.archive_products('bou', 'afd', archive=archive)
+    assert summary['fetched'] == 1
+    assert summary['failed'] == 2
+    assert archive.missing(['a', 'b', 'c']) == ['b', 'c']
+
+
+def test_archive_cli(fake_json):
+    fake_products(fake_json)
+    runner = CliRunner()
+
+    result = runner.invoke(main, ['archive', 'fetch', '-w', '1', 'afd', 'bou'])
+    assert result.exit_code == 0
+    assert 'fetched' in result.output
+
+    result = runner.invoke(main, ['archive', 'list', 'bou', 'afd'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1].startswith('c')
+
+    result = runner.invoke(main, ['archive', 'show', 'c'])
+    assert result.exit_code == 0
+    assert 'CLEARING.' in result.output
+
+    result = runner.invoke(main, ['archive', 'status'])
+    assert result.exit_code == 0
+    assert 'texts' in result.output
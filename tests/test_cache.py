@@ -0,0 +1,128 @@
+import io
+import time
+
+import requests
+import vcr
+
+from requests.adapters import HTTPAdapter
+
+from wxcast import api
+from wxcast.cache import (
+    CacheEntry,
+    LookupCache,
+    ResponseCache,
+    parse_cache_control,
+    set_lookup_cache
+)
+from wxcast.session import CacheAdapter, create_session, set_session
+
+
+def test_parse_cache_control():
+    directives = parse_cache_control('public, max-age=278, s-maxage=300')
+    assert directives == {'public': True, 'max-age': '278', 's-maxage': '300'}
+
+
+def test_cache_entry_freshness():
+    now = time.time()
+    entry = CacheEntry('url', 200, {'Cache-Control': 'max-age=60'}, b'', now)
+    assert entry.is_fresh(now + 30)
+    assert not entry.is_fresh(now + 61)
+
+    entry.headers['Age'] = '45'
+    assert not entry.is_fresh(now + 30)
+
+    entry.headers = {'Cache-Control': 'no-cache', 'ETag': '"abc"'}
+    assert not entry.is_fresh(now)
+    assert entry.validators() == {'If-None-Match': '"abc"'}
+    assert entry.is_storable()
+
+    entry.headers = {'Cache-Control': 'no-store, max-age=60'}
+    assert not entry.is_storable()
+
+
+def test_response_cache_eviction(tmpdir):
+    cache = ResponseCache(str(tmpdir.join('http.sqlite')), max_size=10)
+    headers = {'Cache-Control': 'max-age=60', 'Content-Encoding': 'gzip'}
+
+    cache.set('a', 200, headers, b'123456')
+    assert cache.get('a').headers == {'Cache-Control': 'max-age=60'}
+
+    cache.set('b', 200, headers, b'123456')
+    assert cache.get('a') is None
+    assert cache.get('b').body == b'123456'
+    assert cache.size() == 6
+
+    assert cache.set('c', 500, headers, b'1') is None
+    cache.clear()
+    assert cache.size() == 0
+
+
+@vcr.use_cassette('tests/cassettes/products.yml')
+def test_cached_session():
+    set_session(create_session(cache=ResponseCache()))
+    try:
+        first = api.get_wfo_products('bou')
+        second = api.get_wfo_products('bou')
+    finally:
+        set_session(None)
+
+    assert first == second
+
+
+def test_cache_adapter_revalidate(tmpdir, monkeypatch):
+    cache = ResponseCache(str(tmpdir.join('http.sqlite')))
+    cache.set('http://wx/a', 200, {'ETag': '"v1"'}, b'{"a": 1}')
+    sent = []
+
+    def send(self, request, **kwargs):
+        sent.append(request.headers.get('If-None-Match'))
+        response = requests.Response()
+        response.status_code = 304
+        response.raw = io.BytesIO()
+        response.headers['Cache-Control'] = 'max-age=60'
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, 'send', send)
+    session = requests.Session()
+    session.mount('http://', CacheAdapter(cache))
+
+    response = session.get('http://wx/a')
+    assert response.status_code == 200
+    assert response.from_cache
+    assert response.json() == {'a': 1}
+    assert sent == ['"v1"']
+
+    # Refreshed entry is now fresh and served without a request.
+    session.get('http://wx/a')
+    assert sent == ['"v1"']
+
+
+def test_lookup_cache(tmpdir):
+    cache = LookupCache(str(tmpdir.join('lookups.sqlite')))
+    cache.set('geocode', 'denver', [39.74, -104.99], 60)
+    cache.set('point', 'expired', {'wfo': 'BOU'}, -1)
+
+    assert cache.get('geocode', 'denver') == [39.74, -104.99]
+    assert cache.get('point', 'denver') is None
+    assert cache.get('point', 'expired') is None
+
+    cache.clear('geocode')
+    assert cache.get('geocode', 'denver') is None
+
+
+def test_cached_forecast_lookups():
+    set_lookup_cache(LookupCache())
+    try:
+        with vcr.use_cassette(
+            'tests/cassettes/forecast.yml',
+            allow_playback_repeats=True
+        ) as cassette:
+            first = api.get_seven_day_forecast('denver, co')
+            assert cassette.play_count == 3
+
+            second = api.get_seven_day_forecast('Denver,  CO')
+            assert cassette.play_count == 4
+    finally:
+        set_lookup_cache(None)
+
+    assert first == second
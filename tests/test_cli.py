@@ -217,3 +217,30 @@ def test_conditions():
         out = f.read()
 
     assert out == result.output
+
+
+@vcr.use_cassette('tests/cassettes/metars.yml')
+def test_metars(tmpdir):
+    ids = tmpdir.join('stations.txt')
+    ids.write('# Stations\nKFAKE\n\n')
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['metar', 'KDEN', '-f', str(ids), '-w', '1']
+    )
+    assert result.exit_code == 0
+
+    with open('tests/cassettes/metar.out', 'r') as f:
+        out = f.read()
+
+    with open('tests/cassettes/metar_invalid.out', 'r') as f:
+        out += f.read()
+
+    assert sorted(out.splitlines()) == sorted(result.output.splitlines())
+
+
+def test_metars_no_ids():
+    runner = CliRunner()
+    result = runner.invoke(main, ['metar'])
+    assert result.exit_code == 2
+    assert 'At least one station id is required.' in result.output
@@ -0,0 +1,177 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from wxcast import __version__, client
+from wxcast.client import get_environment
+from wxcast.daemon import DaemonServer, ping, run_command, stop
+
+
+@pytest.fixture
+def fake_offices(fake_api):
+    fake_api.set(
+        'get_wfo_list',
+        {'BOU': 'Boulder, CO', 'SLC': 'Salt Lake City, UT'}
+    )
+    return fake_api
+
+
+@pytest.fixture
+def server(fake_offices, tmpdir):
+    server = DaemonServer(str(tmpdir.join('d.sock')), idle_timeout=10)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    yield server
+    stop(server.path)
+    thread.join(5)
+
+
+def run(args, warm):
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    code = run_command(args, stdout, stderr, warm=warm)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def test_get_socket_path(monkeypatch):
+    monkeypatch.setenv('WXCAST_CACHE_DIR', '/tmp/wx')
+    monkeypatch.delenv('WXCAST_DAEMON_SOCKET', raising=False)
+    assert client.get_socket_path() == '/tmp/wx/daemon.sock'
+
+    monkeypatch.setenv('WXCAST_DAEMON_SOCKET', '/tmp/wx.sock')
+    assert client.get_socket_path() == '/tmp/wx.sock'
+
+
+def test_should_forward():
+    assert client.get_command(['--rate-limit', '2', 'metar']) == 'metar'
+    assert client.should_forward(['--no-cache', 'metar', 'KSLC'])
+    assert client.should_forward(['text', 'afd', 'bou'])
+    assert not client.should_forward(['metar', '--watch', 'KSLC'])
+    assert not client.should_forward(['metar', '--watch=120', 'KSLC'])
+    assert not client.should_forward(['metar', '-f', '-'])
+    assert not client.should_forward(['export', 'metars', 'a.csv', 'KSLC'])
+    assert not client.should_forward(['daemon', 'status'])
+    assert not client.should_forward([])
+    assert not client.should_forward(['text', 'afd', 'bou'], isatty=True)
+    assert client.should_forward(['text', '--json', 'afd', 'bou'], True)
+    assert not client.should_forward(['history', 'KSLC'])
+
+
+def test_run_command(fake_offices):
+    warm = {}
+    code, stdout, stderr = run(['offices', '--json'], warm)
+    assert code == 0
+    assert json.loads(stdout) == [
+        {'wfo': 'BOU', 'name': 'Boulder, CO'},
+        {'wfo': 'SLC', 'name': 'Salt Lake City, UT'}
+    ]
+
+    code, stdout, stderr = run(['offices', '--json'], warm)
+    assert len(warm) == 1
+
+    code, stdout, stderr = run(['nowhere'], warm)
+    assert code == 2
+    assert 'No such command' in stderr
+
+
+def test_run_command_debug(fake_offices):
+    root = logging.getLogger()
+    level = root.level
+    handlers = list(root.handlers)
+    warm = {}
+
+    code, stdout, stderr = run(['--debug', 'offices'], warm)
+    assert 'wxcast: Rate limit stats' in stderr
+    assert root.level == level
+    assert root.handlers == handlers
+
+    code, stdout, stderr = run(['offices'], warm)
+    assert stderr == ''
+
+    code, stdout, stderr = run(['--debug', 'offices'], warm)
+    assert 'wxcast: Rate limit stats' in stderr
+
+
+def test_daemon_forward(server, fake_offices):
+    status = ping(server.path)
+    assert status['version'] == __version__
+    assert status['requests'] == 0
+
+    stdout = io.StringIO()
+    code = client.forward(['offices', '--ndjson'], server.path, stdout)
+    assert code == 0
+    assert stdout.getvalue().splitlines()[0] == \
+        '{"wfo":"BOU","name":"Boulder, CO"}'
+
+    stderr = io.StringIO()
+    code = client.forward(['nowhere'], server.path, stdout, stderr)
+    assert code == 2
+    assert 'No such command' in stderr.getvalue()
+    assert ping(server.path)['requests'] == 2
+    assert len(server.warm) == 1
+
+    # Clients with another cache dir or JSON backend run in process.
+    env = dict(get_environment(), WXCAST_JSON='no-such-backend')
+    response = client.request(
+        {
+            'op': 'run',
+            'version': __version__,
+            'args': ['offices'],
+            'env': env
+        },
+        server.path
+    )
+    assert response is None
+
+    # A busy daemon refuses the command and the client runs it itself.
+    with server._command_lock:
+        assert client.forward(['offices'], server.path) is None
+
+    response = client.request(
+        {'op': 'run', 'version': '0.0.1', 'args': ['offices']}, server.path
+    )
+    assert response is None
+
+    with pytest.raises(OSError):
+        DaemonServer(server.path)
+
+
+def test_daemon_stream_frames(server, fake_api):
+    frames = []
+
+    def get_metars(station_ids, temp_unit, decoded, max_workers):
+        yield 'KSLC', 'KSLC 231753Z 33007KT', None
+        # The first result was sent before the second is fetched.
+        assert {'out': 'KSLC 231753Z 33007KT\n'} in frames
+        yield 'KDEN', 'KDEN 231753Z 36018KT', None
+
+    fake_api.set('get_metars', get_metars)
+    server.dispatch(
+        {
+            'op': 'run',
+            'version': __version__,
+            'args': ['metar', 'A', 'B'],
+            'env': get_environment()
+        },
+        frames.append
+    )
+
+    assert 'start' in frames[0]
+    assert frames[-1] == {'exit': 0}
+    assert ''.join(frame.get('out', '') for frame in frames) == \
+        'KSLC 231753Z 33007KT\nKDEN 231753Z 36018KT\n'
+
+
+def test_client_fallback(fake_offices, monkeypatch, tmpdir, capsys):
+    monkeypatch.setenv('WXCAST_DAEMON_SOCKET', str(tmpdir.join('none')))
+    assert client.forward(['offices']) is None
+
+    with pytest.raises(SystemExit) as error:
+        client.main(['offices', '--json'])
+
+    assert error.value.code == 0
+    assert 'Boulder, CO' in capsys.readouterr().out
+    assert len(fake_offices.called('get_wfo_list')) == 1
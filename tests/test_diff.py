@@ -0,0 +1,122 @@
+from click.testing import CliRunner
+
+from wxcast import api
+from wxcast.archive import ProductArchive
+from wxcast.cli import main
+from wxcast.diff import section_diff, split_sections, unified_diff
+
+OLD = '''AFDBOU
+Area Forecast Discussion
+803 PM MDT Fri Jun 15 2018
+
+.UPDATE...
+Evening showers ending.
+
+&&
+
+.SHORT TERM...(This evening through Saturday)
+Gusty winds with limited rainfall.
+
+&&
+
+.AVIATION...
+VFR.
+
+$$
+'''
+
+NEW = '''AFDBOU
+Area Forecast Discussion
+326 AM MDT Sat Jun 16 2018
+
+.SHORT TERM...(This evening through Saturday)
+Gusty winds with limited rainfall.
+
+&&
+
+.AVIATION...
+VFR with afternoon storms.
+
+&&
+
+.FIRE WEATHER...
+Red Flag Warning for Jackson county.
+
+$$
+'''
+
+
+def test_split_sections():
+    sections = split_sections(OLD)
+
+    assert list(sections) == ['', 'UPDATE', 'SHORT TERM', 'AVIATION']
+    assert sections['UPDATE'].startswith('.UPDATE...\nEvening')
+    assert ''.join(sections.values()) == OLD
+    assert list(split_sections('.A...\n1\n.A...\n2\n')) == ['A', 'A (2)']
+
+
+def test_section_diff():
+    assert section_diff(OLD, NEW) == [
+        ('changed', 'AVIATION', split_sections(NEW)['AVIATION']),
+        ('added', 'FIRE WEATHER', split_sections(NEW)['FIRE WEATHER']),
+        ('removed', 'UPDATE', '')
+    ]
+    assert section_diff(OLD, OLD) == []
+
+
+def test_unified_diff():
+    lines = unified_diff(OLD, NEW)
+
+    assert lines[:2] == ['--- previous', '+++ latest']
+    assert '+VFR with afternoon storms.' in lines
+    assert '-Evening showers ending.' in lines
+    assert unified_diff(OLD, OLD) == []
+
+
+def test_text_diff(monkeypatch):
+    texts = [OLD, OLD, NEW]
+    monkeypatch.setattr(
+        api, 'get_nws_product', lambda wfo, product: texts.pop(0)
+    )
+    closed = []
+    close = ProductArchive.close
+
+    def close_archive(archive):
+        closed.append(archive.path)
+        close(archive)
+
+    monkeypatch.setattr(ProductArchive, 'close', close_archive)
+    runner = CliRunner()
+
+    # First run prints the full text.
+    result = runner.invoke(main, ['text', '--diff', 'bou', 'afd'])
+    assert result.exit_code == 0
+    assert result.output == OLD + '\n'
+
+    # Unchanged text prints nothing.
+    result = runner.invoke(main, ['text', '--diff', 'BOU', 'AFD'])
+    assert result.exit_code == 0
+    assert result.output == ''
+
+    result = runner.invoke(
+        main,
+        ['text', '--no-color', '--diff', '--diff-format', 'sections',
+         'bou', 'afd']
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        'CHANGED: .AVIATION...',
+        '.AVIATION...',
+        'VFR with afternoon storms.',
+        '',
+        '&&',
+        '',
+        'ADDED: .FIRE WEATHER...',
+        '.FIRE WEATHER...',
+        'Red Flag Warning for Jackson county.',
+        '',
+        '$$',
+        '',
+        'REMOVED: .UPDATE...'
+    ]
+    assert len(closed) == 3
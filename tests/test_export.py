@@ -0,0 +1,113 @@
+import csv
+
+import pytest
+
+from click.testing import CliRunner
+from metar import Metar
+
+from wxcast import api
+from wxcast.cli import main
+from wxcast.exceptions import WxcastException
+from wxcast.export import (
+    FORECAST_SCHEMA,
+    OBSERVATION_SCHEMA,
+    export_rows,
+    forecast_rows,
+    observation_row
+)
+from wxcast.observation import Observation
+
+RAW = [
+    'KDEN 232253Z 36018KT 10SM FEW033 BKN065 04/M03 A2985',
+    'KSLC 232254Z 33010KT 10SM -RA BKN070 12/02 A2990',
+    'KDFW 232253Z 11009G18KT 10SM SCT120 23/08 A2972',
+]
+PERIODS = [
+    {
+        'number': 1,
+        'name': 'Tonight',
+        'startTime': '2021-03-23T18:00:00-06:00',
+        'endTime': '2021-03-24T06:00:00-06:00',
+        'isDaytime': False,
+        'temperature': 30,
+        'temperatureUnit': 'F',
+        'windSpeed': '2 to 6 mph',
+        'windDirection': 'SSW',
+        'shortForecast': 'Partly Cloudy',
+        'detailedForecast': 'Partly cloudy, with a low around 30.'
+    }
+]
+
+
+def observations():
+    return [
+        Observation.from_metar(Metar.Metar(raw, month=3, year=2021))
+        for raw in RAW
+    ]
+
+
+def test_export_csv(tmpdir):
+    path = str(tmpdir.join('obs.csv'))
+    rows = (observation_row(o) for o in observations())
+
+    assert export_rows(rows, path, OBSERVATION_SCHEMA, chunksize=2) == 3
+
+    with open(path) as f:
+        records = list(csv.DictReader(f))
+
+    assert list(records[0]) == [name for name, _ in OBSERVATION_SCHEMA]
+    assert [r['station'] for r in records] == ['KDEN', 'KSLC', 'KDFW']
+    assert records[0]['time'] == '2021-03-23T22:53:00Z'
+    assert records[0]['wind_gust'] == ''
+    assert float(records[2]['wind_gust']) == 18.0
+
+
+def test_export_unknown_format(tmpdir):
+    with pytest.raises(WxcastException):
+        export_rows([], str(tmpdir.join('obs.txt')), OBSERVATION_SCHEMA)
+
+
+@pytest.mark.parametrize('extension', ['arrow', 'parquet'])
+def test_export_arrow(tmpdir, extension):
+    pa = pytest.importorskip('pyarrow')
+    path = str(tmpdir.join(f'forecast.{extension}'))
+    rows = forecast_rows('denver', PERIODS * 3)
+
+    assert export_rows(rows, path, FORECAST_SCHEMA, chunksize=2) == 3
+
+    if extension == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        assert pq.ParquetFile(path).num_row_groups == 2
+    else:
+        table = pa.ipc.open_file(path).read_all()
+
+    assert table.schema.names == [name for name, _ in FORECAST_SCHEMA]
+    assert table.schema.field('start_time').type == pa.timestamp(
+        'ms', tz='UTC'
+    )
+    row = table.slice(0, 1).to_pylist()[0]
+    assert row['start_time'].hour == 0
+    assert row['temperature'] == 30.0
+    assert row['is_daytime'] is False
+
+
+def test_export_metars_cli(tmpdir, monkeypatch):
+    def get_observations(station_ids, max_workers):
+        for observation in observations():
+            yield observation.station, observation, None
+        yield 'KFAKE', None, WxcastException('KFAKE is not valid.')
+
+    monkeypatch.setattr(api, 'get_observations', get_observations)
+    path = str(tmpdir.join('metars.csv'))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['export', 'metars', '-o', path, 'KDEN', 'KSLC', 'KFAKE']
+    )
+    assert result.exit_code == 0
+    assert 'KFAKE is not valid.' in result.output
+    assert f'Wrote 3 rows to {path}' in result.output
+
+    with open(path) as f:
+        assert len(f.readlines()) == 4
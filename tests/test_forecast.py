@@ -0,0 +1,172 @@
+import math
+import time
+
+import pytest
+
+from click.testing import CliRunner
+
+from wxcast import api
+from wxcast.cli import main
+from wxcast.exceptions import WxcastException
+from wxcast.forecast import HourlyForecast
+
+HOURLY = f'{api.NWS_API}/gridpoints/BOU/62,61/forecast/hourly'
+PERIODS = [
+    {
+        'startTime': '2021-03-03T14:00:00-07:00',
+        'temperature': 41,
+        'temperatureUnit': 'F',
+        'windSpeed': '7 mph',
+        'windDirection': 'E',
+        'shortForecast': 'Chance Snow Showers'
+    },
+    {
+        'startTime': '2021-03-03T15:00:00-07:00',
+        'temperature': None,
+        'temperatureUnit': 'F',
+        'windSpeed': '5 to 10 mph',
+        'windDirection': 'E',
+        'shortForecast': 'Chance Snow Showers'
+    },
+    {
+        'startTime': '2021-03-03T16:00:00-07:00',
+        'temperature': 38,
+        'temperatureUnit': 'F',
+        'windSpeed': '',
+        'windDirection': '',
+        'shortForecast': 'Mostly Cloudy'
+    }
+]
+
+
+@pytest.fixture
+def fake_forecast(fake_json, fake_api):
+    fake_json.set(HOURLY, {'properties': {'periods': PERIODS}})
+    fake_api.set('geocode_location', (39.74, -104.992))
+    fake_api.set('get_point_info', {'wfo': 'BOU', 'x': 62, 'y': 61})
+    return fake_json
+
+
+def test_hourly_forecast_columns():
+    forecast = HourlyForecast.from_periods(PERIODS)
+
+    assert len(forecast) == 3
+    assert forecast.temperature_unit == 'F'
+    assert forecast.wind_speed_unit == 'mph'
+    assert forecast.start_time[0] == 1614805200
+    assert forecast.local_time(0).hour == 14
+    assert list(forecast.wind_speed[:2]) == [7.0, 10.0]
+    assert math.isnan(forecast.temperature[1])
+    assert math.isnan(forecast.wind_speed[2])
+    assert forecast.short_forecast[0] is forecast.short_forecast[1]
+
+    data = forecast.to_dict()
+    assert list(data) == list(HourlyForecast.COLUMNS)
+    assert data['wind_direction'] == ['E', 'E', '']
+
+    records = list(forecast.to_records())
+    assert records[1]['temperature'] is None
+    assert records[2]['wind_speed'] is None
+    assert records[2]['wind_direction'] is None
+    assert records[0]['start_time'].hour == 14
+
+
+def test_hourly_forecast_pandas():
+    pd = pytest.importorskip('pandas')
+    frame = HourlyForecast.from_periods(PERIODS).to_pandas()
+
+    assert list(frame.columns) == list(HourlyForecast.COLUMNS)
+    assert frame['start_time'][0] == pd.Timestamp('2021-03-03T21:00Z')
+    assert frame['temperature'][2] == 38
+
+
+def test_hourly_forecast_arrow():
+    pytest.importorskip('pyarrow')
+    forecast = HourlyForecast.from_periods(PERIODS)
+    table = forecast.to_arrow()
+
+    assert table.num_rows == 3
+    assert table.column_names == list(HourlyForecast.COLUMNS)
+    assert table.column('wind_speed').to_pylist()[:2] == [7.0, 10.0]
+
+    # The table does not lock the forecast arrays.
+    forecast.append(PERIODS[0])
+    assert len(forecast) == 4
+    assert table.num_rows == 3
+
+
+def test_get_hourly_forecast(fake_forecast):
+    forecast = api.get_hourly_forecast('denver, co')
+
+    assert fake_forecast.requested == [HOURLY]
+    assert len(forecast) == 3
+
+
+def test_forecast_hourly_cli(fake_forecast):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['forecast', '--hourly', '--no-color', 'denver, co']
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        'time          temp  wind      forecast',
+        'Wed 03 14:00  41F   E 7 mph   Chance Snow Showers',
+        'Wed 03 15:00        E 10 mph  Chance Snow Showers',
+        'Wed 03 16:00  38F             Mostly Cloudy'
+    ]
+
+
+@pytest.fixture
+def fake_forecasts(fake_api):
+    delays = {'slow': 0.05, 'fast': 0}
+
+    def get_seven_day_forecast(location):
+        if location not in delays:
+            raise WxcastException(f'Location not found: {location}.')
+
+        time.sleep(delays[location])
+        return [{'name': 'Tonight', 'detailedForecast': location}]
+
+    fake_api.set('get_seven_day_forecast', get_seven_day_forecast)
+    return fake_api
+
+
+def test_get_forecasts_order(fake_forecasts):
+    locations = ['slow', 'fake', 'fast']
+
+    results = list(api.get_forecasts(locations, max_workers=3, ordered=True))
+    assert [location for location, _, _ in results] == locations
+    assert results[0][1] == [{'name': 'Tonight', 'detailedForecast': 'slow'}]
+    assert 'Location not found: fake.' == str(results[1][2])
+
+    results = list(api.get_forecasts(locations, max_workers=3))
+    assert results[-1][0] == 'slow'
+
+
+def test_forecast_locations_cli(fake_forecasts, tmpdir):
+    locations = tmpdir.join('locations.txt')
+    locations.write('# Locations\nfake\n\n')
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ['forecast', '--no-color', 'slow', 'fast', '-f', str(locations)]
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        'slow',
+        'Tonight:  slow',
+        '',
+        'fast',
+        'Tonight:  fast',
+        '',
+        'fake',
+        'Location not found: fake.'
+    ]
+
+
+def test_forecast_no_locations():
+    runner = CliRunner()
+    result = runner.invoke(main, ['forecast'])
+    assert result.exit_code == 2
+    assert 'At least one location is required.' in result.output
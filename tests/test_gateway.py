@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+
+import requests
+
+from urllib.request import urlopen
+
+from wxcast import api
+from wxcast.cache import MemoryCache
+from wxcast.exceptions import WxcastException, WxcastNotFound
+from wxcast.gateway import Gateway, GatewayServer, match_route
+
+
+def called(fake_api):
+    return [args[0] for args in fake_api.called('get_metar')]
+
+
+def get_metar(station_id, temp_unit='C', decoded=False):
+    if station_id.upper() == 'XXXX':
+        raise WxcastNotFound(f'{station_id} is not a valid station id.')
+
+    if station_id.upper() == 'DOWN':
+        try:
+            raise requests.exceptions.ConnectionError('refused')
+        except requests.exceptions.ConnectionError:
+            raise WxcastException('Connection could not be established.')
+
+    if station_id.upper() == 'FAIL':
+        raise WxcastException('No metar data in response.')
+
+    if decoded:
+        return {
+            'station': station_id.upper(),
+            'type': 'METAR',
+            'temperature': temp_unit,
+            'elevation': 1288.0
+        }
+
+    return f'{station_id.upper()} 231753Z 33007KT 10SM CLR'
+
+
+def test_memory_cache(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    cache = MemoryCache(max_entries=2)
+
+    cache.set('a', 1, 10)
+    cache.set('b', 2, 20)
+    assert cache.get('a') == 1
+
+    # b is least recently used and dropped first.
+    cache.set('c', 3, 10)
+    assert cache.get('b') is None
+    assert len(cache) == 2
+
+    now[0] += 15
+    assert cache.get('a') is None
+    assert cache.get('c') is None
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+
+def test_match_route():
+    assert match_route(['metar', 'KSLC'])[1] == ['KSLC']
+    assert match_route(['Offices', 'BOU', 'stations'])[1] == ['BOU']
+    assert match_route(['text', 'BOU']) is None
+    assert match_route([]) is None
+
+
+def test_gateway_cache(fake_api):
+    fake_api.set('get_metar', get_metar)
+    gateway = Gateway(ttl=60)
+
+    status, headers, body = gateway.handle('/metar/KSLC')
+    assert status == 200
+    assert headers['X-Cache'] == 'MISS'
+    assert headers['Cache-Control'] == 'max-age=60'
+    assert json.loads(body) == 'KSLC 231753Z 33007KT 10SM CLR'
+
+    status, headers, body = gateway.handle('/metar/kslc')
+    assert headers['X-Cache'] == 'HIT'
+
+    status, headers, body = gateway.handle(
+        '/metar/KSLC?temp_unit=F&decoded=1'
+    )
+    assert json.loads(body)['temperature'] == 'F'
+    assert called(fake_api) == ['KSLC', 'KSLC']
+
+    stats = gateway.stats()
+    assert stats['cache'] == {'entries': 2, 'hits': 1, 'misses': 2}
+
+
+def test_gateway_errors(fake_api):
+    fake_api.set('get_metar', get_metar)
+    gateway = Gateway(ttl=60)
+
+    status, headers, body = gateway.handle('/metar/XXXX')
+    assert status == 404
+    assert 'XXXX' in json.loads(body)['error']
+
+    status, headers, body = gateway.handle('/metar/XXXX')
+    assert headers['X-Cache'] == 'HIT'
+    assert called(fake_api) == ['XXXX']
+
+    # Upstream failures are not cached.
+    status, headers, body = gateway.handle('/metar/DOWN')
+    assert status == 503
+    assert headers['Cache-Control'] == 'no-store'
+
+    status, headers, body = gateway.handle('/metar/FAIL')
+    assert status == 502
+    gateway.handle('/metar/FAIL')
+    assert called(fake_api) == ['XXXX', 'DOWN', 'FAIL', 'FAIL']
+
+    status, headers, body = gateway.handle('/metar/KSLC?temp_unit=K')
+    assert status == 400
+    assert headers['Cache-Control'] == 'no-store'
+
+    status, headers, body = gateway.handle('/forecast')
+    assert status == 400
+
+    status, headers, body = gateway.handle('/nowhere')
+    assert status == 404
+
+
+def test_gateway_coalesce(fake_api):
+    started = threading.Event()
+    release = threading.Event()
+
+    def get_wfo_list():
+        started.set()
+        release.wait(5)
+        return {'BOU': 'Boulder, CO'}
+
+    fake_api.set('get_wfo_list', get_wfo_list)
+    gateway = Gateway(static_ttl=3600)
+    results = []
+
+    def worker():
+        results.append(gateway.handle('/offices'))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+
+    for thread in threads[1:]:
+        thread.start()
+
+    time.sleep(0.1)
+    release.set()
+
+    for thread in threads:
+        thread.join(5)
+
+    assert len(fake_api.called('get_wfo_list')) == 1
+    assert len(results) == 5
+    assert all(result[0] == 200 for result in results)
+    assert results[0][1]['Cache-Control'] == 'max-age=3600'
+    assert gateway.stats()['coalesced']['coalesced'] == 4
+
+
+def test_gateway_server(fake_api):
+    fake_api.set('get_metar', get_metar)
+    server = GatewayServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = 'http://{}:{}'.format(*server.server_address[:2])
+
+    try:
+        with urlopen(f'{url}/conditions/KSLC') as response:
+            assert response.headers['Content-Type'] == 'application/json'
+            assert json.loads(response.read()) == {
+                'station': 'KSLC', 'temperature': 'C'
+            }
+
+        with urlopen(f'{url}/stats') as response:
+            assert json.loads(response.read())['cache']['misses'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
+
+
+def test_metar_conditions():
+    decoded = {
+        'type': 'METAR',
+        'temperature': '4.4 C',
+        'station': 'KDEN',
+        'remarks': 'AO2',
+        'sea level pressure': '1010.4 mb',
+        'elevation': 1656.0
+    }
+
+    assert list(api.metar_conditions(decoded).items()) == [
+        ('station', 'KDEN'),
+        ('temperature', '4.4 C')
+    ]
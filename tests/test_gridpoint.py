@@ -0,0 +1,111 @@
+import pytest
+
+from wxcast import api
+from wxcast.exceptions import WxcastException, WxcastNotFound
+
+np = pytest.importorskip('numpy')
+
+from wxcast.gridpoint import duration_hours  # noqa: E402
+
+GRIDPOINT = f'{api.NWS_API}/gridpoints/BOU/62,61'
+POINT = f'{api.NWS_API}/points/39.74,-104.992'
+PROPERTIES = {
+    'validTimes': '2021-03-02T12:00:00+00:00/PT6H',
+    'elevation': {'unitCode': 'wmoUnit:m', 'value': 1655.064},
+    'temperature': {
+        'uom': 'wmoUnit:degC',
+        'values': [
+            {'validTime': '2021-03-02T12:00:00+00:00/PT2H', 'value': 1.5},
+            {'validTime': '2021-03-02T14:00:00+00:00/PT1H', 'value': None},
+            {'validTime': '2021-03-02T15:00:00+00:00/P1D', 'value': 4.0}
+        ]
+    },
+    'quantitativePrecipitation': {
+        'uom': 'wmoUnit:mm',
+        'values': [
+            {'validTime': '2021-03-02T06:00:00+00:00/PT8H', 'value': 0.5}
+        ]
+    },
+    'weather': {
+        'values': [
+            {
+                'validTime': '2021-03-02T12:00:00+00:00/PT6H',
+                'value': [{'weather': 'snow'}]
+            }
+        ]
+    }
+}
+
+
+@pytest.fixture
+def fake_gridpoint(fake_json):
+    fake_json.set(GRIDPOINT, {'properties': PROPERTIES})
+    fake_json.set(
+        POINT, {'properties': {'gridId': 'BOU', 'gridX': 62, 'gridY': 61}}
+    )
+    return fake_json
+
+
+def test_duration_hours():
+    assert duration_hours('PT1H') == 1
+    assert duration_hours('P1D') == 24
+    assert duration_hours('P2DT12H') == 60
+    assert duration_hours('PT30M') == 1
+
+    with pytest.raises(WxcastException):
+        duration_hours('PT')
+
+
+def test_get_gridpoint_data(fake_gridpoint):
+    data = api.get_gridpoint_data('39.74,-104.992')
+
+    assert fake_gridpoint.requested == [POINT, GRIDPOINT]
+    assert list(data['layers']) == [
+        'temperature',
+        'quantitativePrecipitation'
+    ]
+    assert data['units']['quantitativePrecipitation'] == 'wmoUnit:mm'
+    assert data['time'][0] == np.datetime64('2021-03-02T12', 'h')
+    assert data['time'].size == 6
+    np.testing.assert_array_equal(
+        data['layers']['temperature'],
+        [1.5, 1.5, np.nan, 4.0, 4.0, 4.0]
+    )
+    np.testing.assert_array_equal(
+        data['layers']['quantitativePrecipitation'],
+        [0.5, 0.5, np.nan, np.nan, np.nan, np.nan]
+    )
+
+
+def test_get_gridpoint_data_layers(fake_gridpoint):
+    data = api.get_gridpoint_data(
+        wfo='bou', x=62, y=61, layers=['temperature']
+    )
+    assert list(data['layers']) == ['temperature']
+
+    with pytest.raises(WxcastException):
+        api.get_gridpoint_data(wfo='bou', x=62, y=61, layers=['weather'])
+
+    with pytest.raises(WxcastException):
+        api.get_gridpoint_data(wfo='bou', x=62, y=61, layers=['fake'])
+
+
+def test_get_gridpoint_data_location(fake_gridpoint, fake_api):
+    fake_api.set('geocode_location', (39.74, -104.992))
+
+    data = api.get_gridpoint_data('Denver, CO', layers=['temperature'])
+    assert list(data['layers']) == ['temperature']
+    assert fake_api.called('geocode_location') == [('Denver, CO',)]
+
+    api.get_gridpoint_data((39.74, -104.992))
+    assert len(fake_api.called('geocode_location')) == 1
+    assert fake_gridpoint.requested == [POINT, GRIDPOINT] * 2
+
+    # The wfo, x and y override the location.
+    with pytest.raises(WxcastNotFound) as error:
+        api.get_gridpoint_data('39.74,-104.992', wfo='bou', x=1, y=1)
+
+    assert str(error.value) == 'No gridpoint data found for: BOU 1,1.'
+
+    with pytest.raises(WxcastException):
+        api.get_gridpoint_data()
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from click.testing import CliRunner
+
+from wxcast import api
+from wxcast.cli import main
+
+BASE = f'{api.NWS_API}/stations/KDEN/observations'
+
+
+def feature(raw, timestamp):
+    return {
+        'properties': {
+            'rawMessage': raw,
+            'timestamp': timestamp,
+            'elevation': {'unitCode': 'wmoUnit:m', 'value': 1656}
+        }
+    }
+
+
+PAGES = {
+    BASE + '?limit=100&start=2021-03-23T00%3A00%3A00%2B00%3A00': {
+        'features': [
+            feature(
+                'KDEN 232253Z 36018KT 10SM FEW033 BKN065 04/M03 A2985',
+                '2021-03-23T22:53:00+00:00'
+            ),
+            feature('', '2021-03-23T22:00:00+00:00'),
+        ],
+        'pagination': {'next': BASE + '?cursor=2'}
+    },
+    BASE + '?cursor=2': {
+        'features': [
+            feature('KDEN INVALID', '2021-03-23T21:00:00+00:00'),
+            feature(
+                'KDEN 232053Z 01012KT 10SM BKN070 06/M04 A2983',
+                '2021-03-23T20:53:00+00:00'
+            )
+        ],
+        'pagination': {'next': BASE + '?cursor=3'}
+    },
+    BASE + '?cursor=3': {
+        'features': [],
+        'pagination': {'next': BASE + '?cursor=4'}
+    }
+}
+
+
+@pytest.fixture
+def fake_pages(fake_json):
+    for url, page in PAGES.items():
+        fake_json.set(url, page)
+
+    return fake_json
+
+
+def test_iter_observations(fake_pages):
+    observations = api.iter_observations(
+        'KDEN', start='2021-03-23T00:00:00+00:00'
+    )
+
+    first = next(observations)
+    assert first.station == 'KDEN'
+    assert first.temperature == 4.0
+    assert first.elevation == 1656
+    assert first.time.month == 3
+
+    rest = list(observations)
+    assert [o.temperature for o in rest] == [6.0]
+    assert len(fake_pages.requested) == 3
+
+
+def test_history_cli(fake_pages):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['history', '--start', '2021-03-23T00:00:00+00:00', 'KDEN']
+    )
+    assert result.exit_code == 0
+
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [r['time'] for r in records] == [
+        '2021-03-23T22:53:00Z',
+        '2021-03-23T20:53:00Z'
+    ]
+    assert records[0]['wind_speed'] == 18.0
+
+
+def test_history_cli_invalid(fake_pages):
+    runner = CliRunner()
+    result = runner.invoke(main, ['history', 'KDEN'])
+    assert result.exit_code == 1
+    assert 'Could not retrieve observations for KDEN: Not Found' in (
+        result.output
+    )
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 7),
+    reason='-X importtime needs Python 3.7'
+)
+
+# Budget for the cumulative import time of wxcast.cli in microseconds.
+IMPORT_BUDGET = 100000
+
+
+def import_times(module):
+    """Return {module: cumulative microseconds} using -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_cli_import_budget():
+    times = import_times('wxcast.cli')
+
+    for module in ('requests', 'geopy', 'metar', 'sqlite3', 'aiohttp'):
+        assert module not in times
+
+    # Best of three to keep a busy machine from failing the budget.
+    best = min(
+        [times['wxcast.cli']] +
+        [import_times('wxcast.cli')['wxcast.cli'] for _ in range(2)]
+    )
+    assert best < IMPORT_BUDGET
+
+
+def test_api_lazy_imports():
+    times = import_times('wxcast.api')
+
+    for module in ('geopy', 'metar', 'multiprocessing'):
+        assert module not in times
+
+
+def test_client_imports():
+    times = import_times('wxcast.client')
+
+    for module in ('click', 'requests', 'wxcast.cli'):
+        assert module not in times
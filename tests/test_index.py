@@ -0,0 +1,170 @@
+import os
+import time
+
+from collections import OrderedDict
+
+import pytest
+
+from click.testing import CliRunner
+
+from wxcast.cli import main, open_index
+from wxcast.constants import INDEX_MAX_AGE
+from wxcast.exceptions import WxcastException, WxcastNotFound
+from wxcast.index import StationIndex
+
+
+def get_wfo_info(wfo):
+    if wfo != 'BOU':
+        raise WxcastNotFound('Invalid WFO code.')
+
+    return {
+        'name': 'Denver/Boulder, CO',
+        'telephone': '303-494-3210',
+        'fax number': '',
+        'email': 'bou@noaa.gov',
+        'address': '325 Broadway, Boulder, CO 80305'
+    }
+
+
+def get_station_info(station_id):
+    return {
+        'name': station_id + ' airport',
+        'time zone': 'America/Denver',
+        'elevation': 1656.0
+    }
+
+
+@pytest.fixture
+def index_api(fake_api):
+    fake_api.set(
+        'get_wfo_list',
+        OrderedDict([('BOU', 'Denver, CO'), ('AER', 'Anchorage')])
+    )
+    fake_api.set('get_wfo_info', get_wfo_info)
+    fake_api.set(
+        'get_stations_for_wfo',
+        lambda wfo: ['KDEN', 'KBJC'] if wfo == 'BOU' else []
+    )
+    fake_api.set(
+        'get_wfo_products',
+        OrderedDict([('AFD', 'Area Forecast Discussion')])
+    )
+    fake_api.set('get_station_info', get_station_info)
+    return fake_api
+
+
+def test_station_index(tmpdir, index_api):
+    index = StationIndex(str(tmpdir.join('index.sqlite')))
+    assert not index.is_fresh()
+
+    summary = index.refresh(max_workers=1)
+    assert summary == {
+        'offices': 2, 'stations': 2, 'products': 2,
+        'failed offices': 0, 'failed stations': 0, 'updated': True
+    }
+    assert index.is_fresh()
+
+    assert list(index.get_wfo_list()) == ['BOU', 'AER']
+    assert index.get_wfo_info('bou')['email'] == 'bou@noaa.gov'
+    assert index.get_wfo_info('aer') is None
+    assert index.get_stations_for_wfo('bou') == ['KDEN', 'KBJC']
+    assert index.get_station_info('kden')['time zone'] == 'America/Denver'
+    assert index.get_wfo_products('aer') == {
+        'AFD': 'Area Forecast Discussion'
+    }
+    assert index.get_station_info('KFAKE') is None
+
+    index.max_age = 0
+    assert not index.is_fresh()
+
+
+def test_station_index_failures(tmpdir, index_api):
+    index = StationIndex(str(tmpdir.join('index.sqlite')))
+    index.refresh(max_workers=1)
+    refreshed = index.refreshed
+
+    def get_station_info_flaky(station_id):
+        if station_id == 'KBJC':
+            raise WxcastException('Unable to establish connection.')
+
+        return get_station_info(station_id)
+
+    index_api.set('get_station_info', get_station_info_flaky)
+
+    # One of two stations failed, the previous index is kept.
+    summary = index.refresh(max_workers=1)
+    assert summary['failed offices'] == 0
+    assert summary['failed stations'] == 1
+    assert not summary['updated']
+    assert summary['stations'] == 2
+    assert index.refreshed == refreshed
+    assert index.get_station_info('kbjc')['name'] == 'KBJC airport'
+
+    summary = index.refresh(max_workers=1, max_failures=0.5)
+    assert summary['updated']
+    assert summary['stations'] == 1
+    assert index.refreshed > refreshed
+
+    def offline(wfo):
+        raise WxcastException('offline')
+
+    index_api.set('get_wfo_products', offline)
+
+    summary = index.refresh(max_workers=1, max_failures=0.5)
+    assert summary['failed offices'] == 2
+    assert not summary['updated']
+
+
+def set_refreshed(index, refreshed):
+    index._db.execute(
+        "REPLACE INTO meta VALUES ('refreshed', ?)", (str(refreshed),)
+    )
+    index._db.commit()
+
+
+def test_open_index_warm(tmpdir, monkeypatch):
+    monkeypatch.setenv('WXCAST_CACHE_DIR', str(tmpdir))
+    path = str(tmpdir.join('index.sqlite'))
+    warm = {}
+    assert open_index(warm) is None
+
+    index = StationIndex(path)
+    assert open_index(warm) is None
+
+    set_refreshed(index, time.time())
+    station_index = open_index(warm)
+    assert station_index.is_fresh()
+    assert open_index(warm) is station_index
+
+    # Freshness is checked for every command.
+    set_refreshed(index, time.time() - INDEX_MAX_AGE - 1)
+    assert open_index(warm) is None
+
+    # A rebuilt index file is reopened.
+    index.close()
+    os.unlink(path)
+    set_refreshed(StationIndex(path), time.time())
+    assert open_index(warm) not in (None, station_index)
+
+
+def test_index_cli(index_api):
+    runner = CliRunner()
+
+    result = runner.invoke(main, ['index', 'refresh', '-w', '1'])
+    assert result.exit_code == 0
+    assert 'stations:  2' in result.output
+    assert 'updated:  yes' in result.output
+
+    def offline(*args):
+        raise WxcastException('offline')
+
+    index_api.set('get_stations_for_wfo', offline)
+
+    result = runner.invoke(main, ['stations', 'bou'])
+    assert result.output == 'KDEN\nKBJC\n'
+
+    result = runner.invoke(main, ['--refresh', 'stations', 'bou'])
+    assert result.output == 'offline\n'
+
+    result = runner.invoke(main, ['index', 'status'])
+    assert 'fresh:  yes' in result.output
@@ -0,0 +1,53 @@
+import pytest
+
+from wxcast import jsonlib
+from wxcast.exceptions import WxcastException
+
+DOCUMENT = b'{"b": 1, "a": {"d": [1.5, null, true], "c": "\\u00b0F"}}'
+
+
+@pytest.fixture
+def backend():
+    name = jsonlib.get_backend()
+    yield
+    jsonlib.set_backend(name)
+
+
+@pytest.mark.parametrize('name', sorted(jsonlib.BACKENDS))
+def test_loads(backend, name):
+    jsonlib.set_backend(name)
+    data = jsonlib.loads(DOCUMENT)
+
+    assert jsonlib.get_backend() == name
+    assert type(data) is dict
+    assert list(data) == ['b', 'a']
+    assert data['a'] == {'d': [1.5, None, True], 'c': '°F'}
+    assert jsonlib.loads(DOCUMENT.decode()) == data
+
+    with pytest.raises(ValueError):
+        jsonlib.loads(b'<html>')
+
+
+def test_default_backend(backend, monkeypatch):
+    monkeypatch.setenv('WXCAST_JSON', 'json')
+    jsonlib.set_backend()
+    assert jsonlib.get_backend() == 'json'
+
+    monkeypatch.delenv('WXCAST_JSON')
+    jsonlib.set_backend()
+    assert jsonlib.get_backend() == (
+        'orjson' if 'orjson' in jsonlib.BACKENDS else 'json'
+    )
+
+
+def test_unknown_backend(backend):
+    with pytest.raises(WxcastException):
+        jsonlib.set_backend('simplejson')
+
+
+def test_unknown_env_backend(backend, monkeypatch, caplog):
+    monkeypatch.setenv('WXCAST_JSON', 'simplejson')
+    jsonlib.set_backend()
+
+    assert jsonlib.get_backend() == 'json'
+    assert 'WXCAST_JSON backend simplejson is not available' in caplog.text
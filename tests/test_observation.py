@@ -0,0 +1,80 @@
+import pytest
+import vcr
+
+from metar import Metar
+
+from wxcast import api
+from wxcast.observation import Observation
+
+RAW = (
+    'KBOS 241954Z 29016G26KT 10SM FEW050 11/M04 A2998 RMK AO2 '
+    'PK WND 30030/1915 SLP152 T01061044'
+)
+METARS = (
+    RAW,
+    'KDEN 232253Z 36018KT 10SM FEW033 BKN065 BKN200 04/M03 A2985 '
+    'RMK AO2 SLP104 T00441028 $',
+    'KDFW 241953Z 11009G18KT 10SM SCT120 BKN250 23/08 A2972 '
+    'RMK AO2 SLP064 T02330078',
+    'EGLL 241950Z 24012KT 9999 SCT030 09/04 Q1012',
+    'LFPG 241930Z 00000KT 0350 R27L/0450N R26R/0600V1000U FG VV001 '
+    '05/05 Q1020',
+    'KORD 241951Z VRB03KT 1/2SM R28L/2400FT -FZRA BR OVC004 M01/M02 '
+    'A2990 RMK AO2 WSHFT 1930 I1001 I3003 P0002 T10061017',
+)
+
+
+def test_observation_from_metar():
+    metar_obj = Metar.Metar(RAW, month=3, year=2021)
+    observation = Observation.from_metar(metar_obj, elevation=5.0)
+
+    assert observation.station == 'KBOS'
+    assert observation.temperature == pytest.approx(10.6)
+    assert observation.dewpoint == pytest.approx(-4.4)
+    assert observation.wind_direction == 290.0
+    assert observation.wind_speed == 16.0
+    assert observation.wind_gust == 26.0
+    assert observation.visibility == pytest.approx(16093.44)
+    assert observation.pressure == pytest.approx(1015.24, abs=0.01)
+    assert Observation.UNITS['pressure'] == 'MB'
+    assert not hasattr(observation, '__dict__')
+
+    expected = api.metar_to_dict(metar_obj, temp_unit='F')
+    expected['elevation'] = 5.0
+    assert observation.to_dict(temp_unit='F') == expected
+
+    data = observation.to_dict(speed_unit='MPH', distance_unit='M')
+    assert data['wind'] == 'WNW at 18 mph, gusting to 30 mph'
+    assert data['visibility'] == '16093 meters'
+
+
+@pytest.mark.parametrize('raw', METARS)
+@pytest.mark.parametrize('temp_unit,pressure_unit', [('C', 'MB'), ('F', 'IN')])
+def test_observation_to_dict_parity(raw, temp_unit, pressure_unit):
+    metar_obj = Metar.Metar(raw, month=3, year=2021)
+    observation = Observation.from_metar(metar_obj)
+
+    assert observation.to_dict(
+        temp_unit=temp_unit, pressure_unit=pressure_unit
+    ) == api.metar_to_dict(
+        metar_obj, temp_unit=temp_unit, pressure_unit=pressure_unit
+    )
+
+
+def test_observation_invalid_field():
+    with pytest.raises(TypeError):
+        Observation('KBOS', humidity=10)
+
+
+def test_decode_observations():
+    results = list(api.decode_observations([RAW, 'KXYZ NOT A METAR']))
+    assert results[0].station == 'KBOS'
+    assert results[1] is None
+
+
+@vcr.use_cassette('tests/cassettes/decoded_metar.yml')
+def test_get_observation():
+    observation = api.get_observation('KDEN')
+    assert observation.station == 'KDEN'
+    assert observation.temperature == pytest.approx(4.4)
+    assert observation.elevation == 1656
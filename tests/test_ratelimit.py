@@ -0,0 +1,102 @@
+import requests
+
+from wxcast.ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after
+)
+from wxcast.session import RetryAdapter
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def retry_session(limiter, sleeps, retries=3):
+    session = requests.Session()
+    session.mount(
+        'http://',
+        RetryAdapter(limiter=limiter, retries=retries, sleep=sleeps.append)
+    )
+    return session
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+    bucket.pause(3)
+    assert bucket.reserve() == 3
+
+
+def test_rate_limiter_stats():
+    sleeps = []
+    limiter = RateLimiter(rate=1, burst=1, sleep=sleeps.append)
+
+    limiter.acquire('a')
+    limiter.acquire('b')
+    limiter.acquire('a')
+
+    stats = limiter.stats()
+    assert stats['requests'] == 3
+    assert stats['throttled'] == 1
+    assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_backoff_delay():
+    for attempt in range(4):
+        delay = backoff_delay(attempt, backoff=1, max_delay=4)
+        assert min(4, 2 ** attempt) / 2 <= delay <= min(4, 2 ** attempt)
+
+
+def test_retry_after(fake_send):
+    fake_send.reply(429, 200, headers={'Retry-After': '2'})
+    sleeps = []
+    limiter = RateLimiter(sleep=sleeps.append)
+    response = retry_session(limiter, sleeps).get('http://wx/a')
+
+    assert response.status_code == 200
+    assert len(fake_send.sent) == 2
+    assert sleeps[0] >= 2
+
+    stats = limiter.stats()
+    assert stats['requests'] == 2
+    assert stats['retries'] == 1
+    assert stats['retry_statuses'] == {429: 1}
+
+
+def test_retry_gives_up(fake_send):
+    fake_send.reply(503)
+    sleeps = []
+    response = retry_session(None, sleeps, retries=2).get('http://wx/a')
+
+    assert response.status_code == 503
+    assert len(fake_send.sent) == 3
+    assert len(sleeps) == 2
+
+
+def test_no_retry(fake_send):
+    # Long Retry-After and 500 (invalid ids) are returned right away.
+    fake_send.reply(503, headers={'Retry-After': '3600'})
+    assert retry_session(None, []).get('http://wx/a').status_code == 503
+
+    fake_send.reply(500)
+    assert retry_session(None, []).get('http://wx/a').status_code == 500
+    assert len(fake_send.sent) == 1
@@ -0,0 +1,185 @@
+import json
+
+import pytest
+import vcr
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from click.testing import CliRunner
+
+from wxcast.cli import main
+from wxcast.render import Renderer, dumps
+
+
+def test_dumps():
+    value = {'time': datetime(2021, 3, 23, 22, 53, tzinfo=timezone.utc)}
+    assert dumps(value) == '{"time":"2021-03-23T22:53:00+00:00"}'
+
+
+def test_renderer_text(capsys):
+    with Renderer(None, True) as out:
+        out.echo('KDEN', fg='yellow')
+        out.dict(OrderedDict([('wind', 'calm'), ('sky', 'clear')]))
+        out.error('Failed', station='KSLC')
+
+    assert capsys.readouterr().out == (
+        'KDEN\nwind:  calm\n sky:  clear\nFailed\n'
+    )
+
+
+def test_renderer_json(capsys):
+    out = Renderer('json', many=True)
+    out.echo('ignored')
+    out.dict({'station': 'KDEN'})
+    out.flush()
+    assert capsys.readouterr().out == ''
+
+    out.error('Failed', station='KSLC')
+    out.close()
+    assert json.loads(capsys.readouterr().out) == [
+        {'station': 'KDEN'},
+        {'station': 'KSLC', 'error': 'Failed'}
+    ]
+
+    with Renderer('json') as out:
+        out.mapping({'BOU': 'Denver'}, ('wfo', 'name'))
+
+    assert json.loads(capsys.readouterr().out) == {
+        'wfo': 'BOU',
+        'name': 'Denver'
+    }
+
+    with Renderer('json', many=True) as out:
+        out.mapping({}, ('wfo', 'name'))
+
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_renderer_ndjson(capsys):
+    with Renderer('ndjson') as out:
+        out.mapping(
+            OrderedDict([('BOU', 'Denver'), ('SLC', 'Salt Lake City')]),
+            ('wfo', 'name')
+        )
+        out.flush()
+        assert capsys.readouterr().out == (
+            '{"wfo":"BOU","name":"Denver"}\n'
+            '{"wfo":"SLC","name":"Salt Lake City"}\n'
+        )
+
+        out.text('ignored', [{'station': 'KDEN'}])
+
+    assert capsys.readouterr().out == '{"station":"KDEN"}\n'
+
+
+def test_renderer_table(capsys):
+    with Renderer('table') as out:
+        out.dict(OrderedDict([('name', 'Denver'), ('elevation', 1656)]))
+
+    assert capsys.readouterr().out == (
+        'field      value\nname       Denver\nelevation  1656\n'
+    )
+
+    with Renderer('table', many=True) as out:
+        out.record({'station': 'KDEN', 'wind': None})
+        out.record({'station': 'KSLC', 'sky': ['FEW', 'BKN']})
+
+    assert capsys.readouterr().out == (
+        'station  wind  sky\n'
+        'KDEN\n'
+        'KSLC           ["FEW","BKN"]\n'
+    )
+
+
+@vcr.use_cassette('tests/cassettes/products.yml')
+def test_products_formats():
+    runner = CliRunner()
+
+    result = runner.invoke(main, ['products', '--json', 'bou'])
+    assert result.exit_code == 0
+    products = json.loads(result.output)
+    assert products[0] == {
+        'product': 'AFD',
+        'name': 'Area Forecast Discussion'
+    }
+
+    result = runner.invoke(main, ['products', '--ndjson', 'bou'])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert len(lines) == len(products)
+    assert json.loads(lines[0]) == {
+        'product': 'AFD',
+        'name': 'Area Forecast Discussion'
+    }
+
+    result = runner.invoke(main, ['products', '--table', 'bou'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[:2] == [
+        'product  name',
+        'AFD      Area Forecast Discussion'
+    ]
+
+
+@vcr.use_cassette('tests/cassettes/metar.yml')
+def test_metar_json():
+    runner = CliRunner()
+    result = runner.invoke(main, ['metar', '--json', 'KDEN'])
+    assert result.exit_code == 0
+
+    records = json.loads(result.output)
+    assert len(records) == 1
+    assert records[0]['station'] == 'KDEN'
+    assert records[0]['metar'].startswith('KDEN ')
+
+
+@vcr.use_cassette('tests/cassettes/forecast.yml')
+def test_forecast_ndjson():
+    runner = CliRunner()
+    result = runner.invoke(main, ['forecast', '--ndjson', 'denver, co'])
+    assert result.exit_code == 0
+
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert records[0]['location'] == 'denver, co'
+    assert records[0]['number'] == 1
+    assert records[0]['start_time'].endswith('+00:00')
+    assert all(record['detailed_forecast'] for record in records)
+
+
+@pytest.mark.parametrize('cassette,args,many,key', [
+    ('metar', ['metar', 'KDEN'], True, 'station'),
+    ('metar_invalid', ['metar', 'KFAKE'], True, 'station'),
+    ('decoded_metar', ['metar', '-d', 'KDEN'], True, 'station'),
+    ('conditions', ['conditions', 'KDFW'], True, 'station'),
+    ('forecast', ['forecast', 'denver, co'], True, 'location'),
+    ('forecast_invalid', ['forecast', 'Fake, FK'], True, 'location'),
+    ('offices', ['offices'], True, 'wfo'),
+    ('products', ['products', 'bou'], True, 'product'),
+    ('products_invalid', ['products', 'fake'], True, 'wfo'),
+    ('stations', ['stations', 'OHX'], True, 'station'),
+    ('stations_invalid', ['stations', 'fake'], True, 'wfo'),
+    ('office', ['office', 'OHX'], False, 'wfo'),
+    ('office_invalid', ['office', 'fake'], False, 'wfo'),
+    ('station', ['station', 'KBNA'], False, 'station'),
+    ('station_invalid', ['station', 'KFAKE'], False, 'station'),
+    ('text_afd', ['text', 'bou', 'afd'], False, 'wfo'),
+    ('text_afd_invalid', ['text', 'fake', 'afd'], False, 'wfo'),
+])
+def test_json_shape(cassette, args, many, key):
+    runner = CliRunner()
+
+    with vcr.use_cassette(f'tests/cassettes/{cassette}.yml'):
+        result = runner.invoke(main, args[:1] + ['--json'] + args[1:])
+
+    assert result.exit_code == 0
+    document = json.loads(result.output)
+
+    if many:
+        assert isinstance(document, list)
+        assert document
+    else:
+        document = [document]
+
+    for record in document:
+        assert isinstance(record, dict)
+        assert list(record)[0] == key
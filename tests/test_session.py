@@ -0,0 +1,208 @@
+import io
+import json
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+from itertools import islice
+
+from wxcast import api, session
+from wxcast.cache import ResponseCache
+from wxcast.constants import HEADERS
+
+LISTING = b'{"@context": {}, "@graph": [' + b', '.join(
+    b'{"@id": "http://wx/products/%d", "id": "%d", "wmo": 1.5}' % (i, i)
+    for i in range(1000)
+) + b']}'
+CACHED = {'Cache-Control': 'max-age=60'}
+OFFICE = json.dumps({
+    '@id': 'https://api.weather.gov/offices/BOU',
+    'name': 'Denver/Boulder, CO',
+    'telephone': '(303) 494-4221',
+    'faxNumber': '(303) 494-4102',
+    'email': 'w-bou.webmaster@noaa.gov',
+    'address': {
+        'streetAddress': '325 Broadway',
+        'addressLocality': 'Boulder',
+        'addressRegion': 'CO',
+        'postalCode': '80305-3328'
+    },
+    'approvedObservationStations': [
+        'https://api.weather.gov/stations/KDEN',
+        'https://api.weather.gov/stations/KBJC'
+    ]
+}).encode()
+
+
+class PlainSession(object):
+    """A session without adapters, only a get method."""
+
+    def __init__(self, body, release=None):
+        self.body = body
+        self.release = release
+        self.sent = []
+
+    def get(self, url, **kwargs):
+        self.sent.append(url)
+
+        if self.release:
+            self.release.wait(5)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(self.body)
+        response.url = url
+        return response
+
+
+def test_create_session():
+    s = session.create_session(pool_connections=2, pool_maxsize=8)
+    adapter = s.get_adapter('https://api.weather.gov')
+
+    assert s.headers['User-Agent'] == HEADERS['User-Agent']
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 8
+    assert 'Connection' not in s.headers or \
+        s.headers['Connection'] == 'keep-alive'
+
+    s = session.create_session(keep_alive=False)
+    assert s.headers['Connection'] == 'close'
+
+
+def test_get_set_session():
+    session.set_session(None)
+    shared = session.get_session()
+    assert session.get_session() is shared
+
+    custom = session.create_session()
+    session.set_session(custom)
+    assert session.get_session() is custom
+
+    session.set_session(None)
+    assert session.get_session() is not custom
+
+
+def test_iter_json_stream(fake_send):
+    pytest.importorskip('ijson')
+    fake_send.reply(200, body=LISTING, headers=CACHED)
+    session.set_session(session.create_session())
+
+    try:
+        # Without a cache stopping early leaves the rest unread.
+        status, items = session.iter_json('http://wx/list', '@graph.item')
+        assert status == 200
+        assert list(islice(items, 2)) == [
+            {'@id': 'http://wx/products/0', 'id': '0', 'wmo': 1.5},
+            {'@id': 'http://wx/products/1', 'id': '1', 'wmo': 1.5}
+        ]
+        items.close()
+        assert fake_send.sent == ['http://wx/list']
+    finally:
+        session.set_session(None)
+
+
+def test_iter_json_cached(tmpdir, fake_send):
+    pytest.importorskip('ijson')
+    fake_send.reply(200, body=LISTING, headers=CACHED)
+    cache = ResponseCache(str(tmpdir.join('http.sqlite')))
+    session.set_session(session.create_session(cache=cache))
+
+    try:
+        # With a cache the whole listing is read and stored, even when
+        # the consumer only needs the first entry.
+        status, items = session.iter_json('http://wx/list', '@graph.item')
+        assert next(items)['id'] == '0'
+        assert cache.get('http://wx/list').body == LISTING
+
+        # Served from the cache without a request.
+        status, items = session.iter_json('http://wx/list', '@graph.item')
+        assert status == 200
+        assert next(items)['id'] == '0'
+        assert fake_send.sent == ['http://wx/list']
+    finally:
+        session.set_session(None)
+
+
+def test_iter_json_error(fake_send):
+    pytest.importorskip('ijson')
+    fake_send.reply(404, body=b'{"status": 404}', headers=CACHED)
+    session.set_session(session.create_session())
+
+    try:
+        status, items = session.iter_json('http://wx/list', '@graph.item')
+        assert status == 404
+        assert list(items) == []
+    finally:
+        session.set_session(None)
+
+
+def test_iter_json_without_ijson(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'ijson', None)
+    monkeypatch.setattr(
+        session,
+        'get_json',
+        lambda url: (200, {'a': [{'b': 1}, {'c': 2}, {'b': [3, 4]}]})
+    )
+
+    status, items = session.iter_json('http://wx/list', 'a.item.b')
+    assert list(items) == [1, [3, 4]]
+
+    status, items = session.iter_json('http://wx/list', 'a.item.b.item')
+    assert list(items) == [3, 4]
+
+
+def test_iter_json_plain_session():
+    pytest.importorskip('ijson')
+    plain = PlainSession(LISTING)
+    session.set_session(plain)
+
+    try:
+        status, items = session.iter_json('http://wx/list', '@graph.item')
+        assert status == 200
+        assert next(items)['id'] == '0'
+        items.close()
+        assert plain.sent == ['http://wx/list']
+    finally:
+        session.set_session(None)
+
+
+def test_wfo_info_and_stations_share_request():
+    release = threading.Event()
+    plain = PlainSession(OFFICE, release)
+    session.set_session(plain)
+    session._flight.reset_stats()
+    results = {}
+
+    def info():
+        results['info'] = api.get_wfo_info('bou')
+
+    def stations():
+        results['stations'] = api.get_stations_for_wfo('bou')
+
+    threads = [threading.Thread(target=info)]
+    threads[0].start()
+
+    try:
+        while not plain.sent:
+            time.sleep(0.001)
+
+        threads.append(threading.Thread(target=stations))
+        threads[1].start()
+
+        # Wait for the stations call to queue behind the info call.
+        while session.get_coalesce_stats()['coalesced'] < 1:
+            time.sleep(0.001)
+    finally:
+        release.set()
+
+        for thread in threads:
+            thread.join(5)
+
+        session.set_session(None)
+
+    assert plain.sent == ['https://api.weather.gov/offices/BOU']
+    assert results['stations'] == ['KDEN', 'KBJC']
+    assert results['info']['name'] == 'Denver/Boulder, CO'
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from wxcast.singleflight import SingleFlight
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'a': 1}
+
+    def worker():
+        results.append(flight.do('url', fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+
+    for thread in threads[1:]:
+        thread.start()
+
+    # Wait for the followers to queue behind the leader.
+    while flight.stats()['coalesced'] < 4:
+        time.sleep(0.001)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'a': 1}] * 5
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'calls': 1, 'coalesced': 4}
+
+    # Completed calls are not cached.
+    flight.do('url', fetch)
+    assert len(calls) == 2
+
+
+def test_single_flight_error():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('url', fail)
+
+    flight.reset_stats()
+    assert flight.stats() == {'calls': 0, 'coalesced': 0}
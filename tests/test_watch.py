@@ -0,0 +1,84 @@
+from click.testing import CliRunner
+
+from wxcast.cli import main
+from wxcast.watch import poll
+
+
+class FakeSleep(object):
+    def __init__(self, limit):
+        self.limit = limit
+        self.delays = []
+
+    def __call__(self, delay):
+        self.delays.append(delay)
+
+        if len(self.delays) >= self.limit:
+            raise KeyboardInterrupt
+
+
+def test_poll_changes_only():
+    polls = iter([
+        [('KDEN', 1, 'a'), ('KSLC', 1, 'b')],
+        [('KDEN', 1, 'a'), ('KSLC', 1, 'b')],
+        [('KDEN', 2, 'c'), ('KSLC', 1, 'b')],
+        [('KDEN', 2, 'c'), ('KSLC', 1, 'b')],
+    ])
+    sleep = FakeSleep(4)
+    items = []
+
+    try:
+        for item in poll(lambda: next(polls), 10, 30, sleep=sleep):
+            items.append(item)
+    except KeyboardInterrupt:
+        pass
+
+    assert items == ['a', 'b', 'c']
+    assert sleep.delays == [10, 20, 10, 20]
+
+
+def test_poll_backoff_limit():
+    sleep = FakeSleep(5)
+
+    try:
+        for item in poll(lambda: [('KDEN', 1, 'a')], 10, 30, sleep=sleep):
+            pass
+    except KeyboardInterrupt:
+        pass
+
+    assert sleep.delays == [10, 20, 30, 30, 30]
+
+
+def test_metar_watch(fake_api, monkeypatch):
+    polls = iter([
+        [('KDEN', 'KDEN 1', None)],
+        [('KDEN', 'KDEN 1', None)],
+        [('KDEN', 'KDEN 2', None)],
+    ])
+
+    def get_metars(station_ids, temp_unit, decoded, max_workers):
+        return next(polls)
+
+    fake_api.set('get_metars', get_metars)
+    sleep = FakeSleep(3)
+    monkeypatch.setattr('wxcast.watch.time.sleep', sleep)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['metar', '--watch', '--no-color', 'KDEN'])
+    assert result.exit_code == 0
+    assert result.output == 'KDEN 1\nKDEN 2\n'
+    assert sleep.delays[0] == 60
+
+
+def test_watch_interval(fake_api, monkeypatch):
+    fake_api.set('get_nws_product', 'AFD')
+    sleep = FakeSleep(1)
+    monkeypatch.setattr('wxcast.watch.time.sleep', sleep)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['text', '--watch', '120', 'bou', 'afd'])
+    assert result.exit_code == 0
+    assert sleep.delays == [120]
+
+    result = runner.invoke(main, ['text', 'bou', 'afd', '--watch=5'])
+    assert result.exit_code == 2
+    assert sleep.delays == [120]
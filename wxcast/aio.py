@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import logging
+
+import aiohttp
+
+from geopy.adapters import AioHTTPAdapter
+from geopy.exc import GeopyError
+from geopy.geocoders import ArcGIS
+from urllib.parse import urlsplit
+
+from wxcast import jsonlib
+from wxcast.api import (
+    _api_errors,
+    _decode_metar,
+    _forecast_url,
+    _graph_items,
+    _parse_forecast_periods,
+    _parse_geolocation,
+    _parse_latest_metar,
+    _parse_point,
+    _parse_product_listing,
+    _parse_station_info,
+    _parse_stations,
+    _parse_wfo_info,
+    _parse_wfo_list,
+    _parse_wfo_products,
+    _point_location
+)
+from wxcast.constants import (
+    HEADERS,
+    MAX_RETRIES,
+    NWS_API,
+    POOL_MAXSIZE,
+    RETRY_MAX_DELAY,
+    RETRY_STATUSES
+)
+from wxcast.exceptions import WxcastException
+from wxcast.ratelimit import backoff_delay, parse_retry_after
+from wxcast.session import get_rate_limiter
+
+logger = logging.getLogger('wxcast')
+
+CONNECTION_ERRORS = (aiohttp.ClientConnectionError,)
+
+_session = None
+_session_loop = None
+
+
+def create_session(limit=POOL_MAXSIZE, keep_alive=True):
+    """
+    Create a pooled aiohttp session for the NWS api.
+
+    Must be called with a running event loop.
+
+    :param limit: Max number of simultaneous connections.
+    :param keep_alive: If False connections are closed after each request.
+    :return: An aiohttp client session with the wxcast headers.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        force_close=not keep_alive
+    )
+    return aiohttp.ClientSession(
+        headers=dict(HEADERS),
+        connector=connector
+    )
+
+
+def get_session():
+    """
+    Return the shared session for the running event loop.
+
+    A new session is created on first use, if the previous session was
+    closed or if it belongs to a different event loop. A session left
+    behind by a different event loop is closed on the running loop.
+
+    :return: The module level aiohttp client session.
+    """
+    global _session, _session_loop
+
+    loop = asyncio.get_event_loop()
+    stale = _session_loop not in (None, loop)
+
+    if _session is None or _session.closed or stale:
+        if stale and _session is not None and not _session.closed:
+            loop.create_task(_session.close())
+
+        _session = create_session()
+        _session_loop = loop
+
+    return _session
+
+
+def set_session(session):
+    """
+    Replace the shared session used by all aio functions.
+
+    The caller owns the given session. Passing None resets the
+    shared session and a new default session is created on next use.
+
+    :param session: An aiohttp client session or None.
+    """
+    global _session, _session_loop
+
+    _session = session
+    _session_loop = None
+
+
+async def close_session():
+    """
+    Close the shared session and release pooled connections.
+    """
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+    _session = None
+
+
+async def _get_json(url):
+    """
+    GET the url and return the status code and parsed body.
+
+    Requests share the rate limiter of wxcast.session and are retried
+    like RetryAdapter does, without blocking the event loop.
+
+    The body is None for error responses that are not JSON.
+    """
+    limiter = get_rate_limiter()
+    host = urlsplit(url).netloc
+    attempt = 0
+
+    while True:
+        if limiter:
+            wait = limiter.reserve(host)
+
+            if wait:
+                await asyncio.sleep(wait)
+
+        try:
+            async with get_session().get(url) as response:
+                status = response.status
+                retry_after = parse_retry_after(
+                    response.headers.get('Retry-After')
+                )
+                retry = status in RETRY_STATUSES and attempt < MAX_RETRIES
+
+                if retry_after and retry_after > RETRY_MAX_DELAY:
+                    # Waiting that long is worse than failing.
+                    retry = False
+
+                if not retry:
+                    body = await response.read()
+
+                    try:
+                        return status, jsonlib.loads(body)
+                    except ValueError:
+                        if status < 400:
+                            raise
+
+                        return status, None
+
+                delay = max(retry_after or 0, backoff_delay(attempt))
+
+                if limiter and (retry_after or status == 429):
+                    limiter.pause(host, delay)
+        except aiohttp.ClientConnectionError as error:
+            if attempt >= MAX_RETRIES:
+                raise
+
+            status = type(error).__name__
+            delay = backoff_delay(attempt)
+
+        if limiter:
+            limiter.record_retry(status)
+
+        attempt += 1
+        logger.debug(
+            'Retry %d for %s after %s in %.2fs',
+            attempt, url, status, delay
+        )
+        await asyncio.sleep(delay)
+
+
+async def get_metar(station_id, temp_unit='C', decoded=False):
+    """
+    Retrieve METAR for ICAO.
+
+    :param icao: Airport code.
+    :param decoded: Flag to decode the METAR.
+    :return: Returns raw METAR string or dictionary with decoded info.
+    """
+    site = f'{NWS_API}/stations/{station_id}/observations/latest'
+
+    with _api_errors(
+        f'Could not retrieve metar for {station_id}', CONNECTION_ERRORS
+    ):
+        raw_metar, properties = _parse_latest_metar(
+            station_id, *await _get_json(site)
+        )
+
+    if decoded:
+        return _decode_metar(station_id, raw_metar, properties, temp_unit)
+
+    # else return raw metar
+    return raw_metar
+
+
+async def get_nws_product(wfo, product):
+    """
+    Returns text from product for given WFO.
+
+    :param wfo: Weather forecast office abbreviation code.
+    :param product: The text product to return.
+    :return: Product text value as string.
+    """
+    site = '{NWS_API}/products/types/{product}/locations/{wfo}'.format(
+        NWS_API=NWS_API,
+        product=product.upper(),
+        wfo=wfo.upper()
+    )
+
+    with _api_errors(
+        f'No wx data found attempting to retrieve {product} issued by {wfo}',
+        CONNECTION_ERRORS
+    ):
+        status, data = await _get_json(site)
+        listing = _parse_product_listing(status, _graph_items(data), 1)
+        status, data = await _get_json(listing[0]['@id'])
+        return data['productText']
+
+
+async def get_seven_day_forecast(location):
+    """
+    Retrieve seven day forecast for the given location.
+
+    :param location: String value of location (address, name, zip, etc).
+    :return: A dictionary with forecast split in periods.
+    """
+    try:
+        async with ArcGIS(
+            user_agent='wxcast app. https://github.com/smarlowucf/wxcast',
+            adapter_factory=AioHTTPAdapter
+        ) as geolocator:
+            geolocation = await geolocator.geocode(location)
+    except GeopyError as error:
+        raise WxcastException(
+            f'Could not geocode location: {location}: {error}'
+        )
+
+    latitude, longitude = _parse_geolocation(location, geolocation)
+    latlong = f'{latitude},{longitude}'
+
+    with _api_errors(
+        f'No forecast found for location: {location} coordinates: {latlong}',
+        CONNECTION_ERRORS,
+        detail=False
+    ):
+        point_data = await get_point_info(latlong)
+        return _parse_forecast_periods(
+            *await _get_json(_forecast_url(point_data, 'forecast'))
+        )
+
+
+async def get_point_info(location):
+    """
+    Retrieve point forecast info for the given location.
+
+    :param location: String value of coordinates (lat/lon).
+    :return: A dictionary with info on a point forecast location.
+    """
+    location = _point_location(location)
+
+    with _api_errors(
+        f'No point found for coordinates: {location}.',
+        CONNECTION_ERRORS,
+        detail=False
+    ):
+        return _parse_point(*await _get_json(f'{NWS_API}/points/{location}'))
+
+
+async def get_wfo_list():
+    """
+    Get a list of the available weather forecast offices (wfo).
+
+    :return: Return dictionary of wfo {code: name}.
+    """
+    site = f'{NWS_API}/products/locations/'
+
+    with _api_errors('Could not retrieve list of WFOs', CONNECTION_ERRORS):
+        return _parse_wfo_list(*await _get_json(site))
+
+
+async def get_wfo_products(wfo):
+    """
+    Get a list of the text products available for the given WFO.
+
+    :param wfo: The weather forecast office to retrieve product list for.
+    :return: Return dictionary of text products {code: name}.
+    """
+    site = f'{NWS_API}/products/locations/{wfo.upper()}/types'
+
+    with _api_errors(
+        f'Could not retrieve products for WFO {wfo}', CONNECTION_ERRORS
+    ):
+        status, data = await _get_json(site)
+        return _parse_wfo_products(_graph_items(data))
+
+
+async def get_wfo_info(wfo):
+    """
+    Get information for the given WFO.
+
+    :param wfo: The weather forecast office to retrieve info for.
+    :return: Return dictionary of text info {code: name}.
+    """
+    site = f'{NWS_API}/offices/{wfo.upper()}'
+
+    with _api_errors(
+        f'Could not retrieve info for WFO {wfo}', CONNECTION_ERRORS
+    ):
+        return _parse_wfo_info(*await _get_json(site))
+
+
+async def get_stations_for_wfo(wfo):
+    """
+    Get a list of weather stations for the given WFO.
+
+    :param wfo: The weather forecast office to retrieve station list for.
+    :return: Return dictionary of text info {code: name}.
+    """
+    site = f'{NWS_API}/offices/{wfo.upper()}'
+
+    with _api_errors(
+        f'Could not retrieve weather stations for WFO {wfo}',
+        CONNECTION_ERRORS
+    ):
+        return _parse_stations(*await _get_json(site))
+
+
+async def get_station_info(station_id):
+    """
+    Get information for a given weather station.
+
+    :param station_id: The weather station id to retrieve info for.
+    :return: Return dictionary of text info {code: name}.
+    """
+    site = f'{NWS_API}/stations/{station_id.upper()}'
+
+    with _api_errors(
+        f'Could not retrieve info for weather station {station_id}',
+        CONNECTION_ERRORS
+    ):
+        return _parse_station_info(*await _get_json(site))
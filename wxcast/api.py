@@ -22,80 +22,523 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import logging
 import requests
 
 from collections import OrderedDict
-from geopy.geocoders import ArcGIS
-from metar import Metar
-
-from wxcast.constants import HEADERS, NWS_API
-from wxcast.exceptions import WxcastException
-
-
-def metar_to_dict(metar_obj, temp_unit='C', pressure_unit='MB'):
-    data = {}
-    data['station'] = metar_obj.station_id
-
-    if metar_obj.type:
-        data['type'] = metar_obj.report_type()
-    if metar_obj.time:
-        data['time'] = metar_obj.time.ctime()
-    if metar_obj.temp:
-        data['temperature'] = metar_obj.temp.string(temp_unit)
-    if metar_obj.dewpt:
-        data['dew point'] = metar_obj.dewpt.string(temp_unit)
-    if metar_obj.wind_speed:
-        data['wind'] = metar_obj.wind()
-    if metar_obj.wind_speed_peak:
-        data['peak wind'] = metar_obj.peak_wind()
-    if metar_obj.wind_shift_time:
-        data['wind shift'] = metar_obj.wind_shift()
-    if metar_obj.vis:
-        data['visibility'] = metar_obj.visibility()
-    if metar_obj.runway:
-        data['visual range'] = metar_obj.runway_visual_range()
-    if metar_obj.press:
-        data['pressure'] = metar_obj.press.string(pressure_unit)
-    if metar_obj.weather:
-        data['weather'] = metar_obj.present_weather()
-    if metar_obj.sky:
-        data['sky'] = metar_obj.sky_conditions(', ')
-    if metar_obj.press_sea_level:
-        data['sea level pressure'] = metar_obj.press_sea_level.string(
-            pressure_unit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import timezone
+from functools import partial
+from itertools import islice
+from urllib.parse import urlencode
+
+from wxcast.cache import get_lookup_cache
+from wxcast.constants import (
+    ARCHIVE_COUNT,
+    HISTORY_PAGE_SIZE,
+    GEOCODE_TTL,
+    MAX_WORKERS,
+    METAR_CHUNKSIZE,
+    NWS_API,
+    POINT_TTL
+)
+from wxcast.exceptions import WxcastException, WxcastNotFound
+from wxcast.session import get_json, iter_json
+
+logger = logging.getLogger('wxcast')
+
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError,)
+
+# geopy, metar and multiprocessing are slow to import and only needed by
+# some calls, they are imported where used to keep CLI startup fast.
+
+
+# (key, attribute checked before formatting, formatter)
+METAR_FIELDS = (
+    ('station', None, lambda m, t, p: m.station_id),
+    ('type', 'type', lambda m, t, p: m.report_type()),
+    ('time', 'time', lambda m, t, p: m.time.ctime()),
+    ('temperature', 'temp', lambda m, t, p: m.temp.string(t)),
+    ('dew point', 'dewpt', lambda m, t, p: m.dewpt.string(t)),
+    ('wind', 'wind_speed', lambda m, t, p: m.wind()),
+    ('peak wind', 'wind_speed_peak', lambda m, t, p: m.peak_wind()),
+    ('wind shift', 'wind_shift_time', lambda m, t, p: m.wind_shift()),
+    ('visibility', 'vis', lambda m, t, p: m.visibility()),
+    ('visual range', 'runway', lambda m, t, p: m.runway_visual_range()),
+    ('pressure', 'press', lambda m, t, p: m.press.string(p)),
+    ('weather', 'weather', lambda m, t, p: m.present_weather()),
+    ('sky', 'sky', lambda m, t, p: m.sky_conditions(', ')),
+    (
+        'sea level pressure',
+        'press_sea_level',
+        lambda m, t, p: m.press_sea_level.string(p)
+    ),
+    ('6 hour max temp', 'max_temp_6hr', lambda m, t, p: str(m.max_temp_6hr)),
+    ('6 hour min temp', 'max_temp_6hr', lambda m, t, p: str(m.min_temp_6hr)),
+    (
+        '24 hour max temp',
+        'max_temp_24hr',
+        lambda m, t, p: str(m.max_temp_24hr)
+    ),
+    (
+        '24 hour min temp',
+        'max_temp_24hr',
+        lambda m, t, p: str(m.min_temp_24hr)
+    ),
+    ('1 hour precip', 'precip_1hr', lambda m, t, p: str(m.precip_1hr)),
+    ('3 hour precip', 'precip_3hr', lambda m, t, p: str(m.precip_3hr)),
+    ('6 hour precip', 'precip_6hr', lambda m, t, p: str(m.precip_6hr)),
+    ('24 hour precip', 'precip_24hr', lambda m, t, p: str(m.precip_24hr)),
+    (
+        '1 hour ice',
+        'ice_accretion_1hr',
+        lambda m, t, p: str(m.ice_accretion_1hr)
+    ),
+    (
+        '3 hour ice',
+        'ice_accretion_3hr',
+        lambda m, t, p: str(m.ice_accretion_3hr)
+    ),
+    (
+        '6 hour ice',
+        'ice_accretion_6hr',
+        lambda m, t, p: str(m.ice_accretion_6hr)
+    ),
+    ('remarks', '_remarks', lambda m, t, p: m.remarks(', ')),
+)
+# Decoded metar keys left out of the current conditions.
+CONDITIONS_EXCLUDE = (
+    'station',
+    'type',
+    'sea level pressure',
+    'remarks',
+    'elevation'
+)
+
+
+class _MetarFormatter(object):
+    """
+    Format parsed METARs like metar_to_dict.
+
+    The table of fields to format is built once, so batches do not
+    filter METAR_FIELDS again for every report. Instances pickle by
+    their arguments so they can be sent to worker processes.
+    """
+
+    def __init__(self, temp_unit='C', pressure_unit='MB', fields=None):
+        self.temp_unit = temp_unit
+        self.pressure_unit = pressure_unit
+        self.fields = fields
+        self.formatters = tuple(
+            (key, attribute, formatter)
+            for key, attribute, formatter in METAR_FIELDS
+            if fields is None or key in fields
+        )
+        self.remarks = fields is None or 'remarks' in fields
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.temp_unit, self.pressure_unit, self.fields)
+        )
+
+    def __call__(self, metar_obj):
+        temp_unit = self.temp_unit
+        pressure_unit = self.pressure_unit
+        data = {}
+
+        for key, attribute, formatter in self.formatters:
+            if attribute is None or getattr(metar_obj, attribute):
+                data[key] = formatter(metar_obj, temp_unit, pressure_unit)
+
+        if self.remarks and metar_obj._unparsed_remarks:
+            data['remarks'] = data.get('remarks', '') + ', '.join(
+                metar_obj._unparsed_remarks
+            )
+
+        return data
+
+
+def metar_to_dict(metar_obj, temp_unit='C', pressure_unit='MB', fields=None):
+    """
+    Convert a parsed METAR to a dictionary of display strings.
+
+    :param metar_obj: A Metar.Metar instance.
+    :param temp_unit: Unit for temperature values.
+    :param pressure_unit: Unit for pressure values.
+    :param fields: Optional collection of keys to include, other
+        fields are not formatted.
+    :return: Dictionary of decoded values.
+    """
+    return _MetarFormatter(temp_unit, pressure_unit, fields)(metar_obj)
+
+
+def metar_conditions(decoded):
+    """
+    Return the current conditions from a decoded metar dictionary.
+
+    :param decoded: Dictionary from metar_to_dict or get_metar.
+    :return: Dictionary with the station followed by the conditions.
+    """
+    conditions = OrderedDict([('station', decoded.get('station'))])
+
+    for key, value in decoded.items():
+        if key not in CONDITIONS_EXCLUDE:
+            conditions[key] = value
+
+    return conditions
+
+
+def _wrap_error(error, message):
+    """
+    Return a WxcastException for message that keeps not found errors.
+    """
+    if isinstance(error, WxcastNotFound):
+        return WxcastNotFound(message)
+
+    return WxcastException(message)
+
+
+@contextmanager
+def _api_errors(message, connection_errors=CONNECTION_ERRORS, detail=True):
+    """
+    Map errors raised while requesting and parsing an api response.
+
+    Shared by wxcast.api and wxcast.aio, which pass the connection
+    errors of their http client.
+
+    :param message: Message of the raised WxcastException.
+    :param connection_errors: Exception classes of failed connections.
+    :param detail: If True the original error is appended to message.
+    """
+    try:
+        yield
+    except connection_errors as error:
+        raise WxcastException(
+            f'Connection could not be established with the NWS rest api: '
+            f'{error}'
+        )
+    except Exception as error:
+        raise _wrap_error(error, f'{message}: {error}' if detail else message)
+
+
+def _graph_items(data):
+    """
+    Return an iterator of the @graph list of a parsed listing.
+    """
+    if isinstance(data, dict):
+        return iter(data.get('@graph') or ())
+
+    return iter(())
+
+
+def _parse_latest_metar(station_id, status, data):
+    """
+    Return the raw METAR and properties of a latest observation.
+    """
+    if data.get('status', 200) == 404:
+        raise WxcastNotFound(f'{station_id} is not a valid station id.')
+
+    raw_metar = data['properties']['rawMessage']
+
+    if not raw_metar:
+        raise Exception(
+            'No metar data in response, try again in a few minutes.'
         )
-    if metar_obj.max_temp_6hr:
-        data['6 hour max temp'] = str(metar_obj.max_temp_6hr)
-    if metar_obj.max_temp_6hr:
-        data['6 hour min temp'] = str(metar_obj.min_temp_6hr)
-    if metar_obj.max_temp_24hr:
-        data['24 hour max temp'] = str(metar_obj.max_temp_24hr)
-    if metar_obj.max_temp_24hr:
-        data['24 hour min temp'] = str(metar_obj.min_temp_24hr)
-    if metar_obj.precip_1hr:
-        data['1 hour precip'] = str(metar_obj.precip_1hr)
-    if metar_obj.precip_3hr:
-        data['3 hour precip'] = str(metar_obj.precip_3hr)
-    if metar_obj.precip_6hr:
-        data['6 hour precip'] = str(metar_obj.precip_6hr)
-    if metar_obj.precip_24hr:
-        data['24 hour precip'] = str(metar_obj.precip_24hr)
-    if metar_obj.ice_accretion_1hr:
-        data['1 hour ice'] = str(metar_obj.ice_accretion_1hr)
-    if metar_obj.ice_accretion_3hr:
-        data['3 hour ice'] = str(metar_obj.ice_accretion_3hr)
-    if metar_obj.ice_accretion_6hr:
-        data['6 hour ice'] = str(metar_obj.ice_accretion_6hr)
-    if metar_obj._remarks:
-        data['remarks'] = metar_obj.remarks(', ')
-    if metar_obj._unparsed_remarks:
-        data['remarks'] = data.get('remarks', '') + ', '.join(
-            metar_obj._unparsed_remarks
+
+    return raw_metar, data['properties']
+
+
+def _decode_metar(station_id, raw_metar, properties, temp_unit='C'):
+    """
+    Decode a METAR like get_metar(decoded=True).
+    """
+    from metar import Metar
+
+    try:
+        metar_obj = Metar.Metar(raw_metar)
+    except Metar.ParserError as error:
+        raise WxcastException(
+            f'Could not decode metar for {station_id}: {error}'
         )
 
+    data = metar_to_dict(metar_obj, temp_unit=temp_unit)
+    data['elevation'] = properties['elevation']['value']
     return data
 
 
+def _parse_product_listing(status, items, count=None):
+    """
+    Return the first count issuances of a product listing.
+    """
+    if status == 404:
+        raise WxcastNotFound('Unable to establish connection with NWS api.')
+
+    listing = list(islice(items, count))
+
+    if not listing:
+        raise WxcastNotFound('WFO and product combination not found.')
+
+    return listing
+
+
+def _parse_forecast_properties(status, data):
+    if status == 404:
+        raise WxcastNotFound()
+    elif 'properties' not in data:
+        raise Exception()
+
+    return data['properties']
+
+
+def _parse_forecast_periods(status, data):
+    return _parse_forecast_properties(status, data)['periods']
+
+
+def _forecast_url(point_data, endpoint):
+    return (
+        f'{NWS_API}/gridpoints/{point_data["wfo"]}/'
+        f'{point_data["x"]},{point_data["y"]}/{endpoint}'
+    )
+
+
+def _parse_geolocation(location, geolocation):
+    """
+    Return (latitude, longitude) of a geopy location.
+    """
+    if not geolocation:
+        raise WxcastNotFound(f'Location not found: {location}.')
+
+    return geolocation.latitude, geolocation.longitude
+
+
+def _point_location(location):
+    """
+    Round lat,lon coordinates to the 4 decimal places the NWS api uses.
+    """
+    try:
+        # The NWS api redirects to coordinates with 4 decimal places.
+        return ','.join(
+            str(round(float(value), 4)) for value in location.split(',')
+        )
+    except ValueError:
+        return location
+
+
+def _parse_point(status, data):
+    if status == 404:
+        raise WxcastNotFound()
+    elif 'properties' not in data:
+        raise Exception()
+
+    return {
+        'wfo': data['properties']['gridId'],
+        'x': data['properties']['gridX'],
+        'y': data['properties']['gridY']
+    }
+
+
+def _parse_wfo_list(status, data):
+    wfo_list = OrderedDict()
+
+    for code, name in data['locations'].items():
+        if code and name:
+            wfo_list[code] = name
+
+    return wfo_list
+
+
+def _parse_wfo_products(items):
+    products = OrderedDict(
+        (item['productCode'], item['productName']) for item in items
+    )
+
+    if not products:
+        raise WxcastNotFound('Invalid WFO code.')
+
+    return products
+
+
+def _parse_wfo_info(status, data):
+    if status == 404:
+        raise WxcastNotFound('Invalid WFO code.')
+    elif not data.get('@id'):
+        raise Exception('Invalid WFO code.')
+
+    return {
+        'name': data['name'],
+        'telephone': data['telephone'],
+        'fax number': data['faxNumber'],
+        'email': data['email'],
+        'address': f'{data["address"]["streetAddress"]}, '
+                   f'{data["address"]["addressLocality"]}, '
+                   f'{data["address"]["addressRegion"]} '
+                   f'{data["address"]["postalCode"]}'
+    }
+
+
+def _parse_stations(status, data):
+    if status == 404:
+        raise WxcastNotFound('Invalid WFO code.')
+    elif status != 200:
+        raise Exception('Invalid WFO code.')
+
+    return [
+        station.rsplit('/', maxsplit=1)[-1]
+        for station in data.get('approvedObservationStations', [])
+    ]
+
+
+def _parse_station_info(status, data):
+    if status == 404:
+        raise WxcastNotFound('Invalid station id.')
+    elif not data.get('@context'):
+        raise Exception('Invalid station id.')
+
+    return {
+        'name': data['properties']['name'],
+        'time zone': data['properties']['timeZone'],
+        'elevation': data['properties']['elevation']['value']
+    }
+
+
+def _decode_metar_chunk(raw_metars, convert, month, year, strict):
+    """
+    Decode a list of raw METARs, invalid reports decode to None.
+
+    Any other error is returned in place of the report as a
+    WxcastException so one bad report does not stop the batch.
+    """
+    from metar import Metar
+
+    results = []
+    parse = Metar.Metar
+    append = results.append
+
+    for raw_metar in raw_metars:
+        try:
+            append(
+                convert(
+                    parse(raw_metar, month=month, year=year, strict=strict)
+                )
+            )
+        except Metar.ParserError:
+            append(None)
+        except Exception as error:
+            append(
+                WxcastException(f'Could not decode {raw_metar!r}: {error}')
+            )
+
+    return results
+
+
+def _decode_chunks(raw_metars, convert, month, year, strict, processes,
+                   chunksize):
+    decode = partial(
+        _decode_metar_chunk,
+        convert=convert,
+        month=month,
+        year=year,
+        strict=strict
+    )
+    iterator = iter(raw_metars)
+    chunks = iter(lambda: list(islice(iterator, chunksize)), [])
+
+    if processes and processes > 1:
+        import multiprocessing
+
+        with multiprocessing.Pool(processes) as pool:
+            for results in pool.imap(decode, chunks):
+                yield from results
+    else:
+        for chunk in chunks:
+            yield from decode(chunk)
+
+
+def decode_metars(raw_metars,
+                  temp_unit='C',
+                  pressure_unit='MB',
+                  fields=None,
+                  month=None,
+                  year=None,
+                  strict=True,
+                  processes=None,
+                  chunksize=METAR_CHUNKSIZE):
+    """
+    Decode many raw METARs with the same output as metar_to_dict.
+
+    The input is consumed lazily in chunks and results are yielded in
+    input order. Reports are decoded in the current process unless
+    worker processes are requested.
+
+    :param raw_metars: Iterable of raw METAR strings.
+    :param temp_unit: Unit for temperature values.
+    :param pressure_unit: Unit for pressure values.
+    :param fields: Optional collection of keys to include, skipping
+        the formatting of other fields.
+    :param month: Month of the reports, guessed from today if None.
+    :param year: Year of the reports, guessed from today if None.
+    :param strict: If False reports with unparsed groups are decoded.
+    :param processes: Number of worker processes. None, 0 or 1
+        decodes in the current process.
+    :param chunksize: Number of reports per chunk.
+    :return: Generator of dictionaries, None for invalid reports and a
+        WxcastException for reports that failed to decode.
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+
+    convert = _MetarFormatter(temp_unit, pressure_unit, fields)
+    return _decode_chunks(
+        raw_metars, convert, month, year, strict, processes, chunksize
+    )
+
+
+def decode_observations(raw_metars,
+                        month=None,
+                        year=None,
+                        strict=True,
+                        processes=None,
+                        chunksize=METAR_CHUNKSIZE):
+    """
+    Decode many raw METARs into Observation records.
+
+    Works like decode_metars but yields compact numeric records.
+
+    :param raw_metars: Iterable of raw METAR strings.
+    :param month: Month of the reports, guessed from today if None.
+    :param year: Year of the reports, guessed from today if None.
+    :param strict: If False reports with unparsed groups are decoded.
+    :param processes: Number of worker processes. None, 0 or 1
+        decodes in the current process.
+    :param chunksize: Number of reports per chunk.
+    :return: Generator of Observation instances, None for invalid
+        reports and a WxcastException for reports that failed to decode.
+    """
+    from wxcast.observation import Observation
+
+    return _decode_chunks(
+        raw_metars,
+        Observation.from_metar,
+        month,
+        year,
+        strict,
+        processes,
+        chunksize
+    )
+
+
+def _get_latest_metar(station_id):
+    """
+    Retrieve the latest raw METAR and observation properties.
+    """
+    site = f'{NWS_API}/stations/{station_id}/observations/latest'
+
+    with _api_errors(f'Could not retrieve metar for {station_id}'):
+        return _parse_latest_metar(station_id, *get_json(site))
+
+
 def get_metar(station_id, temp_unit='C', decoded=False):
     """
     Retrieve METAR for ICAO.
@@ -104,47 +547,236 @@ def get_metar(station_id, temp_unit='C', decoded=False):
     :param decoded: Flag to decode the METAR.
     :return: Returns raw METAR string or dictionary with decoded info.
     """
+    raw_metar, properties = _get_latest_metar(station_id)
+
+    if decoded:
+        return _decode_metar(station_id, raw_metar, properties, temp_unit)
+
+    # else return raw metar
+    return raw_metar
+
+
+def get_observation(station_id):
+    """
+    Retrieve the latest observation for a weather station.
+
+    :param station_id: The weather station id (ICAO).
+    :return: An Observation with numeric values.
+    """
+    from metar import Metar
+
+    from wxcast.observation import Observation
+
+    raw_metar, properties = _get_latest_metar(station_id)
+
     try:
-        site = f'{NWS_API}/stations/{station_id}/observations/latest'
-        data = requests.get(site).json()
+        metar_obj = Metar.Metar(raw_metar)
+    except Metar.ParserError as error:
+        raise WxcastException(
+            f'Could not decode metar for {station_id}: {error}'
+        )
 
-        if data.get('status', 200) == 404:
-            raise Exception(
-                f'{station_id} is not a valid station id.'
-            )
+    return Observation.from_metar(
+        metar_obj,
+        elevation=properties['elevation']['value']
+    )
 
-        raw_metar = data['properties']['rawMessage']
 
-        if not raw_metar:
-            raise Exception(
-                'No metar data in response, try again in a few minutes.'
-            )
+def _get_observation_page(station_id, url):
+    """
+    Retrieve one page of the observation history of a station.
+    """
+    try:
+        status, data = get_json(url)
+
+        if 'features' not in data:
+            raise Exception(data.get('detail', 'No observations found.'))
     except requests.exceptions.ConnectionError:
         raise WxcastException(
             'Connection could not be established with the NWS rest api.'
         )
     except Exception as error:
         raise WxcastException(
-            f'Could not retrieve metar for {station_id}: {error}'
+            f'Could not retrieve observations for {station_id}: {error}'
         )
 
-    if decoded:
-        data_obj = Metar.Metar(raw_metar)
-        json_data = metar_to_dict(data_obj, temp_unit=temp_unit)
-        json_data['elevation'] = data['properties']['elevation']['value']
-        return json_data
+    return data
 
-    # else return raw metar
-    return raw_metar
 
+def _format_time(value):
+    """
+    Format a datetime or ISO-8601 string for the NWS api.
 
-def get_nws_product(wfo, product):
+    Naive datetimes are assumed to be UTC.
     """
-    Returns text from product for given WFO.
+    if not hasattr(value, 'isoformat'):
+        return value
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return value.isoformat()
+
+
+def iter_observations(station_id,
+                      start=None,
+                      end=None,
+                      page_size=HISTORY_PAGE_SIZE):
+    """
+    Iterate over the observation history of a weather station.
+
+    Pages of the /stations/{id}/observations endpoint are requested
+    lazily while the next page is prefetched in the background, so at
+    most two pages are held in memory. Observations are yielded newest
+    first as returned by the api. Reports without a METAR or that
+    can't be decoded are skipped.
+
+    :param station_id: The weather station id (ICAO).
+    :param start: Oldest observation time as datetime or ISO-8601 string.
+    :param end: Newest observation time as datetime or ISO-8601 string.
+    :param page_size: Number of observations per request.
+    :return: Generator of Observation instances.
+    """
+    from metar import Metar
+
+    from wxcast.observation import Observation
+
+    params = {'limit': page_size}
+
+    if start:
+        params['start'] = _format_time(start)
+    if end:
+        params['end'] = _format_time(end)
+
+    url = f'{NWS_API}/stations/{station_id}/observations?{urlencode(params)}'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = executor.submit(_get_observation_page, station_id, url)
+
+        try:
+            while page:
+                data = page.result()
+                next_url = (data.get('pagination') or {}).get('next')
+
+                if data['features'] and next_url and next_url != url:
+                    url = next_url
+                    page = executor.submit(
+                        _get_observation_page, station_id, url
+                    )
+                else:
+                    page = None
+
+                for feature in data['features']:
+                    properties = feature['properties']
+                    raw_metar = properties.get('rawMessage')
+
+                    if not raw_metar:
+                        continue
+
+                    # Decode the day of month against the report date.
+                    timestamp = properties['timestamp']
+
+                    try:
+                        metar_obj = Metar.Metar(
+                            raw_metar,
+                            month=int(timestamp[5:7]),
+                            year=int(timestamp[:4]),
+                            strict=False
+                        )
+                    except Metar.ParserError:
+                        metar_obj = None
+
+                    if not metar_obj or not metar_obj.time:
+                        logger.debug('Skipping invalid METAR: %s', raw_metar)
+                        continue
+
+                    yield Observation.from_metar(
+                        metar_obj,
+                        elevation=properties['elevation']['value']
+                    )
+        finally:
+            # Drop the prefetch if the consumer stops early.
+            if page:
+                page.cancel()
+
+
+def _fan_out(func, items, max_workers, ordered=False):
+    """
+    Call func for every item concurrently.
+
+    A failed item does not stop the batch, its WxcastException is
+    yielded in place of the result.
+
+    :param func: Callable taking one item.
+    :param items: Iterable of items.
+    :param max_workers: Max number of concurrent calls.
+    :param ordered: Yield in input order instead of completion order.
+    :return: Generator of (item, result, error) tuples.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = OrderedDict(
+            (executor.submit(func, item), item) for item in items
+        )
+
+        try:
+            for future in futures if ordered else as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except WxcastException as error:
+                    yield futures[future], None, error
+        finally:
+            # Drop pending requests if the consumer stops early.
+            for future in futures:
+                future.cancel()
+
+
+def get_metars(station_ids,
+               temp_unit='C',
+               decoded=False,
+               max_workers=MAX_WORKERS):
+    """
+    Retrieve METARs for many stations concurrently.
+
+    Results are yielded as each request completes. A failed station
+    does not stop the batch, the exception is yielded in its place.
+
+    :param station_ids: Iterable of station ids (ICAO).
+    :param temp_unit: Unit for temperature values when decoded.
+    :param decoded: Flag to decode the METARs.
+    :param max_workers: Max number of concurrent requests.
+    :return: Generator of (station_id, metar, error) tuples.
+    """
+    return _fan_out(
+        partial(get_metar, temp_unit=temp_unit, decoded=decoded),
+        station_ids,
+        max_workers
+    )
+
+
+def get_observations(station_ids, max_workers=MAX_WORKERS):
+    """
+    Retrieve the latest observations for many stations concurrently.
+
+    Works like get_metars but yields Observation records.
+
+    :param station_ids: Iterable of station ids (ICAO).
+    :param max_workers: Max number of concurrent requests.
+    :return: Generator of (station_id, observation, error) tuples.
+    """
+    return _fan_out(get_observation, station_ids, max_workers)
+
+
+def _get_product_listing(wfo, product, count=None):
+    """
+    Return the issuances of product for given WFO, newest first.
+
+    Only the first count issuances are kept, see session.iter_json
+    for when the rest of the listing is left unread.
 
     :param wfo: Weather forecast office abbreviation code.
-    :param product: The text product to return.
-    :return: Product text value as string.
+    :param product: The text product to list.
+    :param count: Max number of issuances, None for all.
+    :return: List of issuance dictionaries with @id and issuanceTime.
     """
     site = '{NWS_API}/products/types/{product}/locations/{wfo}'.format(
         NWS_API=NWS_API,
@@ -152,33 +784,125 @@ def get_nws_product(wfo, product):
         wfo=wfo.upper()
     )
 
-    try:
-        response = requests.get(site, headers=HEADERS)
-        if response.status_code == 404:
-            raise Exception(
-                'Unable to establish connection with NWS api.'
-            )
+    with _api_errors(
+        f'No wx data found attempting to retrieve {product} issued by {wfo}'
+    ):
+        status, items = iter_json(site, '@graph.item')
+        return _parse_product_listing(status, items, count)
 
-        response = response.json()
-        if not response.get('@graph'):
-            raise Exception('WFO and product combination not found.')
 
-        response = requests.get(
-            response['@graph'][0]['@id'],
-            headers=HEADERS
-        ).json(object_pairs_hook=OrderedDict)
-    except requests.exceptions.ConnectionError as error:
-        raise WxcastException(
-            f'Connection could not be established with the NWS website: '
-            f'{str(error)}'
-        )
-    except Exception as error:
-        raise WxcastException(
+def _get_product_text(url):
+    """
+    Return the text of a single product issuance.
+
+    :param url: The product @id url.
+    :return: Product text value as string.
+    """
+    with _api_errors(f'Unable to retrieve product {url}'):
+        status, data = get_json(url)
+        return data['productText']
+
+
+def get_nws_product(wfo, product):
+    """
+    Returns text from product for given WFO.
+
+    :param wfo: Weather forecast office abbreviation code.
+    :param product: The text product to return.
+    :return: Product text value as string.
+    """
+    listing = _get_product_listing(wfo, product, count=1)
+
+    try:
+        return _get_product_text(listing[0]['@id'])
+    except WxcastException as error:
+        raise _wrap_error(
+            error,
             f'No wx data found attempting to retrieve '
             f'{product} issued by {wfo}: {error}'
         )
 
-    return response['productText']
+
+def archive_products(wfo,
+                     product,
+                     count=ARCHIVE_COUNT,
+                     archive=None,
+                     max_workers=MAX_WORKERS):
+    """
+    Store the last count issuances of product in the local archive.
+
+    Issuances already in the archive are not requested again and the
+    remaining texts are fetched concurrently. A failed issuance does
+    not stop the batch.
+
+    :param wfo: Weather forecast office abbreviation code.
+    :param product: The text product to archive.
+    :param count: Number of most recent issuances to archive.
+    :param archive: ProductArchive instance, defaults to the local one.
+    :param max_workers: Max number of concurrent requests.
+    :return: Dictionary of listed, skipped, fetched, new text and
+        failed counts.
+    """
+    if archive is None:
+        from wxcast.archive import ProductArchive
+
+        with ProductArchive() as archive:
+            return archive_products(
+                wfo, product, count, archive, max_workers
+            )
+
+    listing = OrderedDict(
+        (item['id'], item)
+        for item in _get_product_listing(wfo, product, count)
+    )
+    missing = archive.missing(listing)
+
+    summary = OrderedDict()
+    summary['listed'] = len(listing)
+    summary['skipped'] = len(listing) - len(missing)
+    summary['fetched'] = 0
+    summary['new texts'] = 0
+    summary['failed'] = 0
+
+    results = _fan_out(
+        lambda product_id: _get_product_text(listing[product_id]['@id']),
+        missing,
+        max_workers
+    )
+
+    for product_id, text, error in results:
+        if error:
+            logger.warning(str(error))
+            summary['failed'] += 1
+            continue
+
+        summary['fetched'] += 1
+        summary['new texts'] += archive.add(
+            product_id,
+            wfo,
+            product,
+            listing[product_id].get('issuanceTime'),
+            text
+        )
+
+    return summary
+
+
+def _get_forecast_periods(location, endpoint):
+    """
+    Retrieve the forecast periods of a gridpoint endpoint for a location.
+    """
+    latitude, longitude = geocode_location(location)
+    latlong = f'{latitude},{longitude}'
+
+    with _api_errors(
+        f'No forecast found for location: {location} coordinates: {latlong}',
+        detail=False
+    ):
+        point_data = get_point_info(latlong)
+        return _parse_forecast_periods(
+            *get_json(_forecast_url(point_data, endpoint))
+        )
 
 
 def get_seven_day_forecast(location):
@@ -188,102 +912,199 @@ def get_seven_day_forecast(location):
     :param location: String value of location (address, name, zip, etc).
     :return: A dictionary with forecast split in periods.
     """
-    geolocator = ArcGIS(
-        user_agent='wxcast app. https://github.com/smarlowucf/wxcast'
+    return _get_forecast_periods(location, 'forecast')
+
+
+def get_hourly_forecast(location):
+    """
+    Retrieve the hourly forecast for the given location.
+
+    The result is columnar, see wxcast.forecast.HourlyForecast for
+    the columns and the pandas and Arrow conversions.
+
+    :param location: String value of location (address, name, zip, etc).
+    :return: An HourlyForecast with one entry per hour.
+    """
+    from wxcast.forecast import HourlyForecast
+
+    return HourlyForecast.from_periods(
+        _get_forecast_periods(location, 'forecast/hourly')
     )
-    geolocation = geolocator.geocode(location)
 
-    if not geolocation:
-        raise WxcastException(
-            f'Location not found: {location}.'
-        )
 
-    latlong = '{lat},{lon}'.format(
-        lat=geolocation.latitude,
-        lon=geolocation.longitude
+def get_forecasts(locations,
+                  hourly=False,
+                  max_workers=MAX_WORKERS,
+                  ordered=False):
+    """
+    Retrieve forecasts for many locations concurrently.
+
+    Each location runs geocode, point and forecast lookups in turn on
+    a worker, so the stages of different locations overlap. A failed
+    location does not stop the batch, the exception is yielded in its
+    place.
+
+    :param locations: Iterable of location strings.
+    :param hourly: Retrieve hourly instead of seven day forecasts.
+    :param max_workers: Max number of concurrent locations.
+    :param ordered: Yield in input order instead of completion order.
+    :return: Generator of (location, forecast, error) tuples.
+    """
+    return _fan_out(
+        get_hourly_forecast if hourly else get_seven_day_forecast,
+        locations,
+        max_workers,
+        ordered
+    )
+
+
+def geocode_location(location):
+    """
+    Retrieve the coordinates for the given location using ArcGIS.
+
+    Results are kept in the lookup cache when it is enabled.
+
+    :param location: String value of location (address, name, zip, etc).
+    :return: A tuple of (latitude, longitude).
+    """
+    cache = get_lookup_cache()
+    key = ' '.join(location.lower().split())
+
+    if cache:
+        coordinates = cache.get('geocode', key)
+
+        if coordinates:
+            logger.debug('Geocode cache hit: %s', key)
+            return tuple(coordinates)
+
+        logger.debug('Geocode cache miss: %s', key)
+
+    from geopy.exc import GeopyError
+    from geopy.geocoders import ArcGIS
+
+    geolocator = ArcGIS(
+        user_agent='wxcast app. https://github.com/smarlowucf/wxcast'
     )
 
     try:
-        point_data = get_point_info(latlong)
-        data = requests.get(
-            f'{NWS_API}/gridpoints/{point_data["wfo"]}/'
-            f'{point_data["x"]},{point_data["y"]}/forecast',
-            headers=HEADERS
-        ).json(object_pairs_hook=OrderedDict)
-        if 'properties' not in data:
-            raise Exception()
-    except requests.exceptions.ConnectionError:
+        geolocation = geolocator.geocode(location)
+    except GeopyError as error:
         raise WxcastException(
-            'Connection could not be established with the nws rest api.'
-        )
-    except Exception:
-        raise WxcastException(
-            f'No forecast found for location: {location} '
-            f'coordinates: {latlong}'
+            f'Could not geocode location: {location}: {error}'
         )
 
-    return data['properties']['periods']
+    coordinates = _parse_geolocation(location, geolocation)
+
+    if cache:
+        cache.set('geocode', key, coordinates, GEOCODE_TTL)
+
+    return coordinates
 
 
 def get_point_info(location):
     """
     Retrieve point forecast info for the given location.
 
+    Results are kept in the lookup cache when it is enabled.
+
     :param location: String value of coordinates (lat/lon).
     :return: A dictionary with info on a point forecast location.
     """
-    try:
-        data = requests.get(
-            f'{NWS_API}/points/{location}',
-            headers=HEADERS
-        ).json(object_pairs_hook=OrderedDict)
-        if 'properties' not in data:
-            raise Exception()
-    except requests.exceptions.ConnectionError:
-        raise WxcastException(
-            'Connection could not be established with the nws rest api.'
-        )
-    except Exception:
-        raise WxcastException(
-            f'No point found for coordinates: {location}.'
-        )
+    location = _point_location(location)
+    cache = get_lookup_cache()
 
-    point_data = {
-        'wfo': data['properties']['gridId'],
-        'x': data['properties']['gridX'],
-        'y': data['properties']['gridY']
-    }
+    if cache:
+        point_data = cache.get('point', location)
+
+        if point_data:
+            logger.debug('Point cache hit: %s', location)
+            return point_data
+
+        logger.debug('Point cache miss: %s', location)
+
+    with _api_errors(
+        f'No point found for coordinates: {location}.', detail=False
+    ):
+        point_data = _parse_point(*get_json(f'{NWS_API}/points/{location}'))
+
+    if cache:
+        cache.set('point', location, point_data, POINT_TTL)
 
     return point_data
 
 
-def get_wfo_list():
+def _location_coordinates(location):
     """
-    Get a list of the available weather forecast offices (wfo).
+    Return lat,lon for a location, only names and addresses are geocoded.
 
-    :return: Return dictionary of wfo {code: name}.
+    :param location: Location string, lat,lon string or (lat, lon).
+    """
+    if isinstance(location, (tuple, list)):
+        latitude, longitude = location
+    else:
+        try:
+            latitude, longitude = (
+                float(value) for value in location.split(',')
+            )
+        except ValueError:
+            latitude, longitude = geocode_location(location)
+
+    return f'{latitude},{longitude}'
+
+
+def get_gridpoint_data(location=None, layers=None, wfo=None, x=None, y=None):
+    """
+    Retrieve raw gridpoint layers as aligned hourly NumPy arrays.
+
+    The gridpoint for location is resolved with get_point_info. Give
+    wfo, x and y instead of location to request a known gridpoint.
+    Requires numpy (pip install wxcast[numpy]).
+
+    :param location: String value of location (address, name, zip, etc),
+        a lat,lon string or a (lat, lon) tuple.
+    :param layers: Names of the layers to retrieve (temperature,
+        quantitativePrecipitation), all numeric layers if None.
+    :param wfo: The weather forecast office abbreviation (BOU).
+    :param x: The gridpoint x coordinate.
+    :param y: The gridpoint y coordinate.
+    :return: Dictionary with an hourly datetime64 time array, an
+        OrderedDict of layer arrays and an OrderedDict of layer units.
     """
     try:
-        site = f'{NWS_API}/products/locations/'
-        data = requests.get(site, headers=HEADERS).json(
-            object_pairs_hook=OrderedDict
-        )
-    except requests.exceptions.ConnectionError as error:
+        from wxcast import gridpoint
+    except ImportError:
         raise WxcastException(
-            f'Connection could not be established with the avwx rest api: '
-            f'{str(error)}'
+            'numpy is required for gridpoint data: '
+            'pip install wxcast[numpy].'
         )
-    except Exception as error:
-        raise WxcastException(
-            f'Could not retrieve list of WFOs: {error}'
+
+    if None in (wfo, x, y):
+        if location is None:
+            raise WxcastException(
+                'A location or the wfo, x and y of a gridpoint is required.'
+            )
+
+        point_data = get_point_info(_location_coordinates(location))
+        wfo, x, y = point_data['wfo'], point_data['x'], point_data['y']
+
+    with _api_errors(
+        f'No gridpoint data found for: {wfo.upper()} {x},{y}.', detail=False
+    ):
+        properties = _parse_forecast_properties(
+            *get_json(f'{NWS_API}/gridpoints/{wfo.upper()}/{x},{y}')
         )
 
-    wfo_list = OrderedDict()
-    for code, name in data['locations'].items():
-        if code and name:
-            wfo_list[code] = name
+    return gridpoint.expand_gridpoint(properties, layers)
 
-    return wfo_list
+
+def get_wfo_list():
+    """
+    Get a list of the available weather forecast offices (wfo).
+
+    :return: Return dictionary of wfo {code: name}.
+    """
+    with _api_errors('Could not retrieve list of WFOs'):
+        return _parse_wfo_list(*get_json(f'{NWS_API}/products/locations/'))
 
 
 def get_wfo_products(wfo):
@@ -293,27 +1114,11 @@ def get_wfo_products(wfo):
     :param wfo: The weather forecast office to retrieve product list for.
     :return: Return dictionary of text products {code: name}.
     """
-    try:
-        site = f'{NWS_API}/products/locations/{wfo.upper()}/types'
-        data = requests.get(site, headers=HEADERS).json(
-            object_pairs_hook=OrderedDict
-        )
-
-        if not data.get('@graph'):
-            raise Exception('Invalid WFO code.')
-    except requests.exceptions.ConnectionError as error:
-        raise WxcastException(
-            f'Connection could not be established with the nws rest api: '
-            f'{str(error)}'
-        )
-    except Exception as error:
-        raise WxcastException(
-            f'Could not retrieve products for WFO {wfo}: {error}'
-        )
+    site = f'{NWS_API}/products/locations/{wfo.upper()}/types'
 
-    return OrderedDict(
-        (d['productCode'], d['productName']) for d in data['@graph']
-    )
+    with _api_errors(f'Could not retrieve products for WFO {wfo}'):
+        status, items = iter_json(site, '@graph.item')
+        return _parse_wfo_products(items)
 
 
 def get_wfo_info(wfo):
@@ -323,36 +1128,10 @@ def get_wfo_info(wfo):
     :param wfo: The weather forecast office to retrieve info for.
     :return: Return dictionary of text info {code: name}.
     """
-    try:
-        site = f'{NWS_API}/offices/{wfo.upper()}'
-        data = requests.get(site, headers=HEADERS).json(
-            object_pairs_hook=OrderedDict
-        )
+    site = f'{NWS_API}/offices/{wfo.upper()}'
 
-        if not data.get('@id'):
-            raise Exception('Invalid WFO code.')
-    except requests.exceptions.ConnectionError as error:
-        raise WxcastException(
-            f'Connection could not be established with the nws rest api: '
-            f'{str(error)}'
-        )
-    except Exception as error:
-        raise WxcastException(
-            f'Could not retrieve info for WFO {wfo}: {error}'
-        )
-
-    wfo_data = {
-        'name': data['name'],
-        'telephone': data['telephone'],
-        'fax number': data['faxNumber'],
-        'email': data['email'],
-        'address': f'{data["address"]["streetAddress"]}, '
-                   f'{data["address"]["addressLocality"]}, '
-                   f'{data["address"]["addressRegion"]} '
-                   f'{data["address"]["postalCode"]}'
-    }
-
-    return wfo_data
+    with _api_errors(f'Could not retrieve info for WFO {wfo}'):
+        return _parse_wfo_info(*get_json(site))
 
 
 def get_stations_for_wfo(wfo):
@@ -362,30 +1141,11 @@ def get_stations_for_wfo(wfo):
     :param wfo: The weather forecast office to retrieve station list for.
     :return: Return dictionary of text info {code: name}.
     """
-    try:
-        site = f'{NWS_API}/offices/{wfo.upper()}'
-        data = requests.get(site, headers=HEADERS).json(
-            object_pairs_hook=OrderedDict
-        )
+    # Same url as get_wfo_info so concurrent calls share one request.
+    site = f'{NWS_API}/offices/{wfo.upper()}'
 
-        if not data.get('@id'):
-            raise Exception('Invalid WFO code.')
-    except requests.exceptions.ConnectionError as error:
-        raise WxcastException(
-            f'Connection could not be established with the nws rest api: '
-            f'{str(error)}'
-        )
-    except Exception as error:
-        raise WxcastException(
-            f'Could not retrieve weather stations for WFO {wfo}: {error}'
-        )
-
-    stations = [
-        station.rsplit('/', maxsplit=1)[-1] for
-        station in data['approvedObservationStations']
-    ]
-
-    return stations
+    with _api_errors(f'Could not retrieve weather stations for WFO {wfo}'):
+        return _parse_stations(*get_json(site))
 
 
 def get_station_info(station_id):
@@ -395,29 +1155,9 @@ def get_station_info(station_id):
     :param station_id: The weather station id to retrieve info for.
     :return: Return dictionary of text info {code: name}.
     """
-    try:
-        site = f'{NWS_API}/stations/{station_id.upper()}'
-        data = requests.get(site, headers=HEADERS).json(
-            object_pairs_hook=OrderedDict
-        )
-
-        if not data.get('@context'):
-            raise Exception('Invalid station id.')
-    except requests.exceptions.ConnectionError as error:
-        raise WxcastException(
-            f'Connection could not be established with the nws rest api: '
-            f'{str(error)}'
-        )
-    except Exception as error:
-        raise WxcastException(
-            f'Could not retrieve info for weather station {station_id}: '
-            f'{error}'
-        )
-
-    station_data = {
-        'name': data['properties']['name'],
-        'time zone': data['properties']['timeZone'],
-        'elevation': data['properties']['elevation']['value']
-    }
+    site = f'{NWS_API}/stations/{station_id.upper()}'
 
-    return station_data
+    with _api_errors(
+        f'Could not retrieve info for weather station {station_id}'
+    ):
+        return _parse_station_info(*get_json(site))
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+
+from wxcast.cache import get_cache_dir
+
+
+def text_digest(text):
+    """
+    Return the content address for a product text.
+
+    :param text: Product text as string.
+    :return: Hex encoded sha256 digest.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ProductArchive(object):
+    """
+    Local archive of NWS text products backed by sqlite.
+
+    Products are keyed by their NWS product id. Texts are stored zlib
+    compressed and addressed by their sha256 digest so identical
+    issuances are stored once. The last seen text of each wfo and
+    product is kept for diffs.
+    """
+
+    def __init__(self, path=None):
+        if not path:
+            path = os.path.join(get_cache_dir(), 'archive.sqlite')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS texts ('
+            'digest TEXT PRIMARY KEY, body BLOB, size INTEGER);'
+            'CREATE TABLE IF NOT EXISTS products ('
+            'id TEXT PRIMARY KEY, wfo TEXT, product TEXT, issued TEXT, '
+            'digest TEXT REFERENCES texts (digest));'
+            'CREATE INDEX IF NOT EXISTS products_wfo '
+            'ON products (wfo, product, issued);'
+            'CREATE TABLE IF NOT EXISTS seen ('
+            'wfo TEXT, product TEXT, digest TEXT REFERENCES texts (digest), '
+            'PRIMARY KEY (wfo, product));'
+        )
+        self._db.commit()
+
+    def missing(self, product_ids):
+        """
+        Return the product ids that are not in the archive.
+
+        :param product_ids: Iterable of NWS product ids.
+        :return: List of ids in input order.
+        """
+        product_ids = list(product_ids)
+
+        with self._lock:
+            present = {
+                row[0] for row in self._db.execute(
+                    'SELECT id FROM products WHERE id IN ({})'.format(
+                        ', '.join('?' * len(product_ids))
+                    ),
+                    product_ids
+                )
+            } if product_ids else set()
+
+        return [
+            product_id for product_id in product_ids
+            if product_id not in present
+        ]
+
+    def add(self, product_id, wfo, product, issued, text):
+        """
+        Store a product issuance.
+
+        :param product_id: The NWS product id.
+        :param wfo: Weather forecast office abbreviation code.
+        :param product: The text product code (AFD).
+        :param issued: Issuance time as ISO string.
+        :param text: Product text as string.
+        :return: True if the text was not already stored.
+        """
+        with self._lock:
+            digest, new = self._store_text(text)
+            self._db.execute(
+                'REPLACE INTO products VALUES (?, ?, ?, ?, ?)',
+                (product_id, wfo.upper(), product.upper(), issued, digest)
+            )
+            self._db.commit()
+
+        return new
+
+    def _store_text(self, text):
+        digest = text_digest(text)
+        cursor = self._db.execute(
+            'INSERT OR IGNORE INTO texts VALUES (?, ?, ?)',
+            (digest, zlib.compress(text.encode('utf-8')), len(text))
+        )
+        return digest, bool(cursor.rowcount)
+
+    def get_text(self, product_id):
+        """
+        Return the text for a product id or None if not archived.
+
+        :param product_id: The NWS product id.
+        :return: Product text as string or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body FROM texts JOIN products USING (digest) '
+                'WHERE id = ?',
+                (product_id,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def last_seen(self, wfo, product):
+        """
+        Return the text last marked as seen for a wfo and product.
+
+        :param wfo: Weather forecast office abbreviation code.
+        :param product: The text product code (AFD).
+        :return: Product text as string or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body FROM texts JOIN seen USING (digest) '
+                'WHERE wfo = ? AND product = ?',
+                (wfo.upper(), product.upper())
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def set_last_seen(self, wfo, product, text):
+        """
+        Mark text as the last seen issuance of a wfo and product.
+
+        The previous last seen text is deleted unless it is archived
+        or last seen for another wfo and product.
+
+        :param wfo: Weather forecast office abbreviation code.
+        :param product: The text product code (AFD).
+        :param text: Product text as string.
+        """
+        key = (wfo.upper(), product.upper())
+
+        with self._lock:
+            previous = self._db.execute(
+                'SELECT digest FROM seen WHERE wfo = ? AND product = ?', key
+            ).fetchone()
+            digest, _ = self._store_text(text)
+            self._db.execute(
+                'REPLACE INTO seen VALUES (?, ?, ?)', key + (digest,)
+            )
+
+            if previous and previous[0] != digest:
+                self._db.execute(
+                    'DELETE FROM texts WHERE digest = ? '
+                    'AND NOT EXISTS ('
+                    'SELECT 1 FROM products WHERE products.digest = ?) '
+                    'AND NOT EXISTS ('
+                    'SELECT 1 FROM seen WHERE seen.digest = ?)',
+                    previous * 3
+                )
+
+            self._db.commit()
+
+    def issuances(self, wfo, product):
+        """
+        Return the archived issuances for a wfo and product.
+
+        :param wfo: Weather forecast office abbreviation code.
+        :param product: The text product code (AFD).
+        :return: List of (id, issued, digest) tuples newest first.
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT id, issued, digest FROM products '
+                'WHERE wfo = ? AND product = ? ORDER BY issued DESC',
+                (wfo.upper(), product.upper())
+            ).fetchall()
+
+    def counts(self):
+        """
+        Return the number of products and unique texts and their sizes.
+        """
+        with self._lock:
+            products = self._db.execute(
+                'SELECT COUNT(*) FROM products'
+            ).fetchone()[0]
+            texts, size, stored = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), '
+                'COALESCE(SUM(LENGTH(body)), 0) FROM texts'
+            ).fetchone()
+
+        return {
+            'products': products,
+            'texts': texts,
+            'text size': size,
+            'stored size': stored
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from wxcast.constants import CACHE_MAX_SIZE, SERVE_CACHE_SIZE
+
+_lookup_cache = None
+
+CACHEABLE_STATUS = {200, 203, 300, 301, 404, 410}
+# Body is stored decoded so these no longer describe it.
+SKIP_HEADERS = {
+    'connection',
+    'content-encoding',
+    'content-length',
+    'keep-alive',
+    'transfer-encoding'
+}
+
+
+def get_cache_dir():
+    """
+    Return the directory for wxcast cache files.
+
+    WXCAST_CACHE_DIR takes precedence over XDG_CACHE_HOME.
+
+    :return: Path to the cache directory as string.
+    """
+    path = os.environ.get('WXCAST_CACHE_DIR')
+
+    if not path:
+        path = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or
+            os.path.join(os.path.expanduser('~'), '.cache'),
+            'wxcast'
+        )
+
+    return path
+
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header into a dictionary.
+
+    Directives without a value are set to True.
+
+    :param value: Cache-Control header string.
+    :return: Dictionary of lowercase directives.
+    """
+    directives = {}
+
+    for directive in (value or '').split(','):
+        name, _, arg = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+
+    return directives
+
+
+def parse_http_date(value):
+    """
+    Convert an HTTP date header to a unix timestamp.
+
+    :param value: HTTP date string.
+    :return: Timestamp as float or None if invalid.
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry(object):
+    """
+    A stored response and its HTTP freshness information.
+    """
+    __slots__ = ('url', 'status', 'headers', 'body', 'stored')
+
+    def __init__(self, url, status, headers, body, stored):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored = stored
+
+    def _header(self, name):
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(self._header('cache-control'))
+
+    @property
+    def etag(self):
+        return self._header('etag')
+
+    @property
+    def last_modified(self):
+        return self._header('last-modified')
+
+    def freshness_lifetime(self):
+        """
+        Return the number of seconds the response is fresh for.
+
+        Uses max-age, then Expires and finally a heuristic of 10% of
+        the time since Last-Modified (capped at one day).
+        """
+        directives = self.cache_control
+
+        if 'no-cache' in directives:
+            return 0
+
+        try:
+            return int(directives['max-age'])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        date = parse_http_date(self._header('date')) or self.stored
+        expires = self._header('expires')
+        if expires:
+            expires = parse_http_date(expires)
+            return max(0, expires - date) if expires else 0
+
+        modified = parse_http_date(self.last_modified)
+        if modified:
+            return min(max(0, date - modified) / 10, 86400)
+
+        return 0
+
+    def age(self, now=None):
+        """
+        Return the current age of the response in seconds.
+        """
+        try:
+            initial = int(self._header('age') or 0)
+        except ValueError:
+            initial = 0
+
+        return initial + max(0, (now or time.time()) - self.stored)
+
+    def is_fresh(self, now=None):
+        """
+        Return True if the response can be served without revalidation.
+        """
+        return self.age(now) < self.freshness_lifetime()
+
+    def validators(self):
+        """
+        Return conditional request headers for revalidation.
+        """
+        headers = {}
+
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        return headers
+
+    def is_storable(self):
+        """
+        Return True if the response may be stored and reused.
+        """
+        directives = self.cache_control
+
+        if self.status not in CACHEABLE_STATUS:
+            return False
+        if 'no-store' in directives or self._header('vary') == '*':
+            return False
+
+        return bool(self.freshness_lifetime() or self.validators())
+
+
+class ResponseCache(object):
+    """
+    Persistent size bounded HTTP response cache backed by sqlite.
+
+    Entries are evicted least recently used first once the total size
+    of stored bodies exceeds max_size.
+    """
+
+    def __init__(self, path=None, max_size=CACHE_MAX_SIZE):
+        if not path:
+            path = os.path.join(get_cache_dir(), 'http.sqlite')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, status INTEGER, headers TEXT, '
+            'body BLOB, stored REAL, accessed REAL, size INTEGER)'
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """
+        Return the cached entry for url or None.
+
+        :param url: The request url.
+        :return: CacheEntry instance or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, headers, body, stored FROM responses '
+                'WHERE url = ?',
+                (url,)
+            ).fetchone()
+
+            if row:
+                self._db.execute(
+                    'UPDATE responses SET accessed = ? WHERE url = ?',
+                    (time.time(), url)
+                )
+                self._db.commit()
+
+        if not row:
+            return None
+
+        status, headers, body, stored = row
+        return CacheEntry(url, status, json.loads(headers), body, stored)
+
+    def set(self, url, status, headers, body):
+        """
+        Store a response if HTTP semantics allow it.
+
+        :param url: The request url.
+        :param status: HTTP status code.
+        :param headers: Dictionary of response headers.
+        :param body: Decoded response body as bytes.
+        :return: The stored CacheEntry or None if not storable.
+        """
+        headers = {
+            key: value for key, value in headers.items()
+            if key.lower() not in SKIP_HEADERS
+        }
+        entry = CacheEntry(url, status, headers, body, time.time())
+
+        if not entry.is_storable():
+            self.delete(url)
+            return None
+
+        with self._lock:
+            self._db.execute(
+                'REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    url, status, json.dumps(headers), body,
+                    entry.stored, entry.stored, len(body)
+                )
+            )
+            self._evict()
+            self._db.commit()
+
+        return entry
+
+    def refresh(self, entry, headers):
+        """
+        Update a stored entry after a 304 Not Modified response.
+
+        :param entry: The CacheEntry that was revalidated.
+        :param headers: Dictionary of headers from the 304 response.
+        :return: The updated CacheEntry.
+        """
+        lowered = {key.lower() for key in headers}
+        merged = {
+            key: value for key, value in entry.headers.items()
+            if key.lower() not in lowered
+        }
+        merged.update(
+            (key, value) for key, value in headers.items()
+            if key.lower() not in SKIP_HEADERS
+        )
+
+        entry.headers = merged
+        entry.stored = time.time()
+
+        with self._lock:
+            self._db.execute(
+                'UPDATE responses SET headers = ?, stored = ?, accessed = ? '
+                'WHERE url = ?',
+                (json.dumps(merged), entry.stored, entry.stored, entry.url)
+            )
+            self._db.commit()
+
+        return entry
+
+    def delete(self, url):
+        """
+        Remove the entry for url if it exists.
+        """
+        with self._lock:
+            self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self._db.commit()
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._db.commit()
+
+    def size(self):
+        """
+        Return the total size of stored bodies in bytes.
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+
+        if total <= self.max_size:
+            return
+
+        rows = self._db.execute(
+            'SELECT url, size FROM responses ORDER BY accessed'
+        ).fetchall()
+
+        for url, size in rows:
+            if total <= self.max_size:
+                break
+
+            self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LookupCache(object):
+    """
+    Persistent key value cache with per entry expiry backed by sqlite.
+
+    Used for lookups that rarely change such as geocoded locations and
+    NWS grid points. Values must be JSON serializable.
+    """
+
+    def __init__(self, path=None):
+        if not path:
+            path = os.path.join(get_cache_dir(), 'lookups.sqlite')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS lookups ('
+            'namespace TEXT, key TEXT, value TEXT, expires REAL, '
+            'PRIMARY KEY (namespace, key))'
+        )
+        self._db.commit()
+
+    def get(self, namespace, key):
+        """
+        Return the cached value or None if missing or expired.
+
+        :param namespace: The kind of lookup (geocode, point).
+        :param key: The lookup key.
+        :return: The cached value or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires FROM lookups '
+                'WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+
+        if not row or row[1] < time.time():
+            return None
+
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl):
+        """
+        Store a value for ttl seconds.
+
+        :param namespace: The kind of lookup (geocode, point).
+        :param key: The lookup key.
+        :param value: JSON serializable value.
+        :param ttl: Number of seconds the value is valid for.
+        """
+        with self._lock:
+            self._db.execute(
+                'REPLACE INTO lookups VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), time.time() + ttl)
+            )
+            self._db.execute(
+                'DELETE FROM lookups WHERE expires < ?',
+                (time.time(),)
+            )
+            self._db.commit()
+
+    def clear(self, namespace=None):
+        """
+        Remove all entries, or only the entries in namespace.
+        """
+        with self._lock:
+            if namespace:
+                self._db.execute(
+                    'DELETE FROM lookups WHERE namespace = ?',
+                    (namespace,)
+                )
+            else:
+                self._db.execute('DELETE FROM lookups')
+
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class MemoryCache(object):
+    """
+    Thread safe in memory key value cache with per entry expiry.
+
+    Holds at most max_entries values, the least recently used entries
+    are dropped first.
+    """
+
+    def __init__(self, max_entries=SERVE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the cached value or None if missing or expired.
+
+        :param key: Hashable key.
+        :return: The cached value or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        """
+        Store a value for ttl seconds.
+
+        :param key: Hashable key.
+        :param value: Value to store.
+        :param ttl: Number of seconds the value is valid for.
+        """
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_lookup_cache():
+    """
+    Return the shared lookup cache or None if caching is disabled.
+    """
+    return _lookup_cache
+
+
+def set_lookup_cache(cache):
+    """
+    Set the lookup cache used by the api functions.
+
+    :param cache: A LookupCache instance or None to disable caching.
+    """
+    global _lookup_cache
+    _lookup_cache = cache
@@ -23,11 +23,32 @@
 # SOFTWARE.
 
 import click
+import logging
+import time
 
 from collections import OrderedDict
 
-from wxcast import api
 from wxcast import utils
+from wxcast.constants import (
+    ARCHIVE_COUNT,
+    DAEMON_IDLE_TIMEOUT,
+    DAEMON_START_TIMEOUT,
+    MAX_WORKERS,
+    RATE_LIMIT,
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_STATIC_TTL,
+    SERVE_TTL,
+    WATCH_INTERVAL,
+    WATCH_MAX_INTERVAL,
+    WATCH_MIN_INTERVAL
+)
+from wxcast.render import FORMATS, Renderer
+from wxcast.watch import poll
+
+# The api, session, cache and index modules pull in requests and
+# sqlite3, they are imported inside the commands that need them so
+# --help, --version and --license start quickly.
 
 
 def print_license(ctx, param, value):
@@ -44,6 +65,24 @@ def print_license(ctx, param, value):
     ctx.exit()
 
 
+def output_options(func):
+    """
+    Add the --json, --ndjson and --table output format flags.
+
+    The selected format is passed as output_format, None for text.
+    """
+    for name in reversed(FORMATS):
+        func = click.option(
+            f'--{name}',
+            'output_format',
+            flag_value=name,
+            help=f'Print {name.upper() if name != "table" else "a table"} '
+                 f'instead of formatted text.'
+        )(func)
+
+    return func
+
+
 @click.group()
 @click.version_option()
 @click.option(
@@ -54,7 +93,30 @@ def print_license(ctx, param, value):
     callback=print_license,
     help='Display license information and exit.'
 )
-def main():
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    help='Do not read or store cached NWS responses.'
+)
+@click.option(
+    '--refresh',
+    is_flag=True,
+    help='Revalidate cached NWS responses before using them.'
+)
+@click.option(
+    '--rate-limit',
+    default=RATE_LIMIT,
+    show_default=True,
+    type=float,
+    help='Max NWS requests per second, 0 disables the limit.'
+)
+@click.option(
+    '--debug',
+    is_flag=True,
+    help='Display debug information on stderr.'
+)
+@click.pass_context
+def main(ctx, no_cache, refresh, rate_limit, debug):
     """
     Retrieve the latest weather information in your terminal.
 
@@ -63,7 +125,156 @@ def main():
     NWS: https://forecast-v3.weather.gov/documentation \n
     AVWX: https://avwx.rest/
     """
-    pass
+    from wxcast.cache import set_lookup_cache
+    from wxcast.session import get_rate_stats, set_session
+
+    # The daemon passes a dict in obj['warm'] to reuse the session,
+    # caches and index across commands run with the same options.
+    warm = (ctx.obj or {}).get('warm')
+
+    if debug:
+        if warm is None:
+            logging.basicConfig(
+                level=logging.DEBUG,
+                format='%(name)s: %(message)s'
+            )
+        else:
+            # The daemon adds a handler for each request, see
+            # wxcast.daemon.run_command.
+            logging.getLogger().setLevel(logging.DEBUG)
+
+        ctx.call_on_close(
+            lambda: logging.getLogger('wxcast').debug(
+                'Rate limit stats: %s', get_rate_stats()
+            )
+        )
+    key = (no_cache, refresh, rate_limit)
+    state = warm.get(key) if warm is not None else None
+
+    if state is None:
+        state = create_state(no_cache, refresh, rate_limit)
+
+        if warm is not None:
+            warm[key] = state
+
+    session, lookup_cache = state
+    set_session(session)
+    set_lookup_cache(lookup_cache)
+
+    station_index = None
+
+    if not (no_cache or refresh):
+        station_index = open_index(warm)
+
+    ctx.obj = {'index': station_index}
+
+
+def create_state(no_cache, refresh, rate_limit):
+    """
+    Create the session and lookup cache for a command.
+
+    :param no_cache: If True do not read or store cached responses.
+    :param refresh: If True revalidate cached responses before use.
+    :param rate_limit: Max NWS requests per second, 0 disables it.
+    :return: Tuple of (session, lookup cache), the lookup cache is None
+        when not available.
+    """
+    import sqlite3
+
+    from wxcast.cache import LookupCache, ResponseCache
+    from wxcast.session import create_session
+
+    cache = None
+    lookup_cache = None
+
+    if not no_cache:
+        try:
+            cache = ResponseCache()
+            lookup_cache = LookupCache()
+        except (OSError, sqlite3.Error):
+            # Cache directory is not usable, continue without cache.
+            pass
+
+    session = create_session(
+        cache=cache,
+        refresh=refresh,
+        rate_limit=max(rate_limit, 0)
+    )
+    return session, lookup_cache
+
+
+def open_index(warm=None):
+    """
+    Open the station index if it has been built and is fresh.
+
+    With warm (in the daemon) the open index is kept in between
+    commands. It is reopened when the index file was replaced and its
+    freshness is checked for every command.
+
+    :param warm: Dictionary to keep the index in between commands.
+    :return: A StationIndex or None.
+    """
+    import os
+    import sqlite3
+
+    from wxcast.cache import get_cache_dir
+    from wxcast.index import StationIndex
+
+    path = os.path.join(get_cache_dir(), 'index.sqlite')
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    version = (stat.st_ino, stat.st_mtime)
+    kept = warm.get('index') if warm is not None else None
+
+    if kept and kept[0] == version:
+        station_index = kept[1]
+    else:
+        if kept:
+            kept[1].close()
+
+        try:
+            station_index = StationIndex(path)
+        except (OSError, sqlite3.Error):
+            return None
+
+        if warm is not None:
+            warm['index'] = (version, station_index)
+
+    if station_index.is_fresh():
+        return station_index
+
+    if warm is None:
+        station_index.close()
+
+    return None
+
+
+def from_index(name, *args):
+    """
+    Answer a lookup from the local index with fallback to the NWS api.
+
+    The index is only used when it has been built and is fresh.
+
+    :param name: Name of the lookup function (get_wfo_list).
+    :param args: Arguments for the lookup function.
+    :return: The lookup result.
+    """
+    from wxcast import api
+
+    ctx = click.get_current_context(silent=True)
+    station_index = ctx.find_object(dict).get('index') if ctx else None
+
+    if station_index:
+        result = getattr(station_index, name)(*args)
+
+        if result is not None:
+            return result
+
+    return getattr(api, name)(*args)
 
 
 @click.command()
@@ -72,29 +283,249 @@ def main():
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
-@click.argument('location')
-def forecast(no_color, location):
+@click.option(
+    '--hourly',
+    is_flag=True,
+    help='Display the hourly forecast as a table.'
+)
+@click.option(
+    '-f',
+    '--file',
+    'location_file',
+    type=click.File('r'),
+    help='File with one location per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of locations retrieved concurrently.'
+)
+@click.option(
+    '--order',
+    default='input',
+    show_default=True,
+    type=click.Choice(['input', 'completion']),
+    help='Print forecasts in input order or as they complete.'
+)
+@output_options
+@click.argument('location', nargs=-1)
+def forecast(no_color, hourly, location_file, workers, order, output_format,
+             location):
     """
-    Retrieve current 7 day forecast for given location.
+    Retrieve current 7 day forecast for one or more locations.
 
-    Location can be a city, address or zip/postal code.
+    Location can be a city, address or zip/postal code. Locations with
+    spaces must be quoted.
 
     Examples:
         wxcast forecast denver
         wxcast forecast "denver, co"
+        wxcast forecast --hourly denver
+        wxcast forecast -f locations.txt --order completion
 
-    :param location: Location string to get forecast for.
+    :param location: Location strings to get forecasts for.
     :param no_color: If True do not style string output.
+    :param hourly: Flag to display the hourly forecast.
+    :param location_file: File with additional locations.
+    :param workers: Max number of concurrent locations.
+    :param order: Print in input or completion order.
+    :param output_format: json, ndjson, table or None for text.
+    """
+    from wxcast import api
+    from wxcast.export import FORECAST_SCHEMA, forecast_rows
+
+    locations = read_arguments(location, location_file, 'location')
+    results = api.get_forecasts(
+        locations,
+        hourly=hourly,
+        max_workers=workers,
+        ordered=order == 'input'
+    )
+    columns = [column for column, _ in FORECAST_SCHEMA]
+
+    with Renderer(output_format, no_color, many=True) as out:
+        for index, (name, response, error) in enumerate(results):
+            if len(locations) > 1:
+                if index:
+                    out.echo()
+
+                out.echo(name, fg='yellow')
+
+            if error:
+                out.error(error, location=name)
+            elif hourly:
+                render_hourly_forecast(out, name, response)
+            else:
+                out.dict(
+                    OrderedDict(
+                        (d['name'], d['detailedForecast']) for d in response
+                    ),
+                    record=[
+                        dict(zip(columns, row))
+                        for row in forecast_rows(name, response)
+                    ]
+                )
+
+            out.flush()
+
+
+def render_hourly_forecast(out, location, response):
+    """
+    Render an hourly forecast as a table or one record per hour.
+
+    :param out: Renderer instance.
+    :param location: The location the forecast is for.
+    :param response: HourlyForecast instance.
     """
+    def number(value, unit):
+        # NaN marks a missing value.
+        return '' if value != value else f'{value:.0f}{unit}'
+
+    out.table(
+        ['time', 'temp', 'wind', 'forecast'],
+        (
+            (
+                start.strftime('%a %d %H:%M'),
+                number(temperature, response.temperature_unit),
+                ' '.join(
+                    filter(None, [
+                        direction,
+                        number(speed, ' ' + response.wind_speed_unit)
+                    ])
+                ),
+                short_forecast
+            )
+            for start, temperature, speed, direction, short_forecast
+            in response.rows()
+        ),
+        records=(
+            OrderedDict(
+                [('location', location)] + list(record.items())
+            )
+            for record in response.to_records()
+        )
+    )
+
+
+def read_arguments(values, value_file, name='station id'):
+    """
+    Combine argument values with values read from a file.
+
+    Blank lines and lines starting with # are ignored in the file.
+
+    :param values: Tuple of values from the command line.
+    :param value_file: Open file with one value per line or None.
+    :param name: Name of a value for the usage error.
+    :return: List of values.
+    """
+    values = list(values)
+
+    if value_file:
+        for line in value_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                values.append(line)
+
+    if not values:
+        raise click.UsageError(f'At least one {name} is required.')
+
+    return values
+
+
+def render_decoded_metar(out, response):
+    """
+    Render a decoded metar dictionary with a time header.
+
+    :param out: Renderer instance.
+    :param response: Dictionary of decoded metar values.
+    """
+    if not out.is_text:
+        out.record(response)
+        return
+
+    out.echo(
+        ''.join([
+            utils.style_string(
+                'At ', out.no_color, fg='green'
+            ),
+            utils.style_string(
+                response['time'], out.no_color, fg='blue'
+            ),
+            utils.style_string(
+                ' the conditions are:', out.no_color, fg='green'
+            ),
+            '\n'
+        ])
+    )
+
+    spaces = utils.get_max_key(response)
+
     try:
-        response = api.get_seven_day_forecast(location)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        data = OrderedDict(
-            (d['name'], d['detailedForecast']) for d in response
+        # Try to convert elevation to ft and meters.
+        response['elevation'] = '{}ft ({}m)'.format(
+            int(float(response['elevation']) * 3.28084),
+            response['elevation']
         )
-        utils.echo_dict(data, no_color)
+    except (KeyError, Exception):
+        pass
+
+    out.dict(response, spaces=spaces)
+
+
+def render_conditions(out, response):
+    """
+    Render the current conditions from a decoded metar dictionary.
+
+    :param out: Renderer instance.
+    :param response: Dictionary of decoded metar values.
+    """
+    from wxcast.api import metar_conditions
+
+    record = metar_conditions(response)
+    conditions = OrderedDict(record)
+    conditions.pop('station')
+    out.dict(conditions, record=record)
+
+
+def render_product_diff(out, previous, latest, diff_format, record):
+    """
+    Render the changes between two issuances of a text product.
+
+    :param out: Renderer instance.
+    :param previous: Previously seen product text.
+    :param latest: Latest product text.
+    :param diff_format: Either unified or sections.
+    :param record: Dictionary identifying the product for records.
+    """
+    from wxcast.diff import section_diff, unified_diff
+
+    if diff_format == 'sections':
+        changes = section_diff(previous, latest)
+        record['sections'] = [
+            OrderedDict([('change', change), ('name', name), ('text', body)])
+            for change, name, body in changes
+        ]
+
+        for change, name, body in changes:
+            out.echo(
+                f'{change.upper()}: .{name}...',
+                fg='red' if change == 'removed' else 'green'
+            )
+
+            if body:
+                out.echo(body.rstrip('\n'))
+                out.echo()
+    else:
+        colors = {'+': 'green', '-': 'red', '@': 'blue'}
+        record['diff'] = unified_diff(previous, latest)
+
+        for line in record['diff']:
+            out.echo(line, fg=colors.get(line[:1]))
+
+    out.record(record)
 
 
 @click.command()
@@ -116,52 +547,119 @@ def forecast(no_color, location):
     help='Unit of measurement for temperature values. '
          'Default: (C).'
 )
-@click.argument('icao')
-def metar(decoded, no_color, temp_unit, icao):
+@click.option(
+    '-f',
+    '--file',
+    'id_file',
+    type=click.File('r'),
+    help='File with one ICAO code per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of concurrent requests.'
+)
+@click.option(
+    '--watch',
+    is_flag=False,
+    flag_value=WATCH_INTERVAL,
+    default=None,
+    metavar='[SECONDS]',
+    type=click.IntRange(min=WATCH_MIN_INTERVAL),
+    help=f'Keep polling every SECONDS (default {WATCH_INTERVAL}, at least '
+         f'{WATCH_MIN_INTERVAL}) and print only when the data changes.'
+)
+@click.option(
+    '--max-interval',
+    default=WATCH_MAX_INTERVAL,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max seconds between polls while nothing changes.'
+)
+@output_options
+@click.argument('icao', nargs=-1)
+def metar(decoded, no_color, temp_unit, id_file, workers, watch,
+          max_interval, output_format, icao):
     """
-    Retrieve the latest METAR given an airport ICAO code.
+    Retrieve the latest METAR given one or more airport ICAO codes.
 
-    Example: wxcast metar -d KSLC
+    Results are printed as they arrive. With --watch the METARs are
+    polled and printed again only when a new observation is issued.
+
+    Examples:
+        wxcast metar -d KSLC
+        wxcast metar KSLC KDEN KBOI
+        wxcast metar -f stations.txt
+        wxcast metar --watch 120 KSLC
 
     :param decoded: Flag to decode the METAR output.
     :param no_color: If True do not style string output.
-    :param icao: The airport ICAO code to retrieve METAR for.
+    :param id_file: File with additional ICAO codes.
+    :param workers: Max number of concurrent requests.
+    :param watch: Seconds between polls in watch mode or None.
+    :param max_interval: Max seconds between polls in watch mode.
+    :param output_format: json, ndjson, table or None for text.
+    :param icao: The airport ICAO codes to retrieve METAR for.
     """
-    try:
-        response = api.get_metar(icao, temp_unit, decoded)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
+    from wxcast import api
+
+    ids = read_arguments(icao, id_file)
+
+    def fetch():
+        results = api.get_metars(
+            ids,
+            temp_unit,
+            decoded,
+            max_workers=workers
+        )
+
+        for station_id, response, error in results:
+            if error:
+                marker = str(error)
+            elif decoded:
+                marker = response.get('time')
+            else:
+                marker = response
+
+            yield station_id, marker, (station_id, response, error)
+
+    if watch:
+        results = poll(fetch, watch, max_interval)
     else:
-        if decoded:
-            click.echo(
-                ''.join([
-                    utils.style_string(
-                        'At ', no_color, fg='green'
-                    ),
-                    utils.style_string(
-                        response['time'], no_color, fg='blue'
-                    ),
-                    utils.style_string(
-                        ' the conditions are:', no_color, fg='green'
-                    ),
-                    '\n'
-                ])
-            )
+        results = (item for _, _, item in fetch())
 
-            spaces = utils.get_max_key(response)
+    out = Renderer(output_format, no_color, many=not watch)
 
-            try:
-                # Try to convert elevation to ft and meters.
-                response['elevation'] = '{}ft ({}m)'.format(
-                    int(float(response['elevation']) * 3.28084),
-                    response['elevation']
+    try:
+        for index, (station_id, response, error) in enumerate(results):
+            if error:
+                out.error(error, station=station_id)
+            elif decoded:
+                if index:
+                    out.echo()
+
+                render_decoded_metar(out, response)
+            else:
+                out.text(
+                    response,
+                    OrderedDict([
+                        ('station', station_id),
+                        ('metar', response)
+                    ]),
+                    fg='blue'
                 )
-            except (KeyError, Exception):
-                pass
 
-            utils.echo_dict(response, no_color, spaces=spaces)
-        else:
-            utils.echo_style(response, no_color, fg='blue')
+            if watch:
+                out.close()
+            else:
+                out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.close()
 
 
 @click.command()
@@ -178,28 +676,105 @@ def metar(decoded, no_color, temp_unit, icao):
     help='Unit of measurement for temperature values. '
          'Default: (C).'
 )
-@click.argument('station_id')
-def conditions(no_color, temp_unit, station_id):
+@click.option(
+    '-f',
+    '--file',
+    'id_file',
+    type=click.File('r'),
+    help='File with one station id per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of concurrent requests.'
+)
+@click.option(
+    '--watch',
+    is_flag=False,
+    flag_value=WATCH_INTERVAL,
+    default=None,
+    metavar='[SECONDS]',
+    type=click.IntRange(min=WATCH_MIN_INTERVAL),
+    help=f'Keep polling every SECONDS (default {WATCH_INTERVAL}, at least '
+         f'{WATCH_MIN_INTERVAL}) and print only when the data changes.'
+)
+@click.option(
+    '--max-interval',
+    default=WATCH_MAX_INTERVAL,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max seconds between polls while nothing changes.'
+)
+@output_options
+@click.argument('station_id', nargs=-1)
+def conditions(no_color, temp_unit, id_file, workers, watch, max_interval,
+               output_format, station_id):
     """
-    Retrieve the latest conditions given a weather station id.
+    Retrieve the latest conditions given one or more weather station ids.
+
+    Results are printed as they arrive. With --watch the conditions are
+    polled and printed again only when a new observation is issued.
 
-    Example: wxcast conditions KDTW
+    Examples:
+        wxcast conditions KDTW
+        wxcast conditions KDTW KDEN
+        wxcast conditions KDTW --watch
 
     :param no_color: If True do not style string output.
-    :param station_id: The weather station id to retrieve conditions for.
+    :param id_file: File with additional station ids.
+    :param workers: Max number of concurrent requests.
+    :param watch: Seconds between polls in watch mode or None.
+    :param max_interval: Max seconds between polls in watch mode.
+    :param output_format: json, ndjson, table or None for text.
+    :param station_id: The weather station ids to retrieve conditions for.
     """
-    try:
-        response = api.get_metar(station_id, temp_unit, decoded=True)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
+    from wxcast import api
+
+    ids = read_arguments(station_id, id_file)
+
+    def fetch():
+        results = api.get_metars(
+            ids,
+            temp_unit,
+            decoded=True,
+            max_workers=workers
+        )
+
+        for station, response, error in results:
+            marker = str(error) if error else response.get('time')
+            yield station, marker, (station, response, error)
+
+    if watch:
+        results = poll(fetch, watch, max_interval)
     else:
-        response.pop('station', None)
-        response.pop('type', None)
-        response.pop('station', None)
-        response.pop('sea level pressure', None)
-        response.pop('remarks', None)
-        response.pop('elevation', None)
-        utils.echo_dict(response, no_color)
+        results = (item for _, _, item in fetch())
+
+    out = Renderer(output_format, no_color, many=not watch)
+
+    try:
+        for index, (station, response, error) in enumerate(results):
+            if len(ids) > 1:
+                if index:
+                    out.echo()
+
+                out.echo(station.upper(), fg='yellow')
+
+            if error:
+                out.error(error, station=station)
+            else:
+                render_conditions(out, response)
+
+            if watch:
+                out.close()
+            else:
+                out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.close()
 
 
 @click.command()
@@ -208,20 +783,23 @@ def conditions(no_color, temp_unit, station_id):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
-def offices(no_color):
+@output_options
+def offices(no_color, output_format):
     """
     Retrieve the available weather forecast offices (WFO).
 
     Example: wxcast offices
 
     :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
     """
-    try:
-        response = api.get_wfo_list()
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        utils.echo_dict(response, no_color)
+    with Renderer(output_format, no_color, many=True) as out:
+        try:
+            response = from_index('get_wfo_list')
+        except Exception as e:
+            out.error(e)
+        else:
+            out.mapping(response, ('wfo', 'name'))
 
 
 @click.command()
@@ -230,22 +808,25 @@ def offices(no_color):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
+@output_options
 @click.argument('wfo')
-def products(no_color, wfo):
+def products(no_color, output_format, wfo):
     """
     Retrieve the available text products for a given wfo.
 
     Example: wxcast products slc
 
     :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
     :param wfo: The weather forecast office abbreviation (BOU).
     """
-    try:
-        response = api.get_wfo_products(wfo)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        utils.echo_dict(response, no_color)
+    with Renderer(output_format, no_color, many=True) as out:
+        try:
+            response = from_index('get_wfo_products', wfo)
+        except Exception as e:
+            out.error(e, wfo=wfo.upper())
+        else:
+            out.mapping(response, ('product', 'name'))
 
 
 @click.command()
@@ -254,24 +835,128 @@ def products(no_color, wfo):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
+@click.option(
+    '--watch',
+    is_flag=False,
+    flag_value=WATCH_INTERVAL,
+    default=None,
+    metavar='[SECONDS]',
+    type=click.IntRange(min=WATCH_MIN_INTERVAL),
+    help=f'Keep polling every SECONDS (default {WATCH_INTERVAL}, at least '
+         f'{WATCH_MIN_INTERVAL}) and print only when the data changes.'
+)
+@click.option(
+    '--max-interval',
+    default=WATCH_MAX_INTERVAL,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max seconds between polls while nothing changes.'
+)
+@click.option(
+    '--diff',
+    is_flag=True,
+    help='Print only the changes since the last seen issuance.'
+)
+@click.option(
+    '--diff-format',
+    default='unified',
+    show_default=True,
+    type=click.Choice(['unified', 'sections']),
+    help='Line based unified diff or the changed sections in full.'
+)
+@output_options
 @click.argument('wfo')
 @click.argument('product')
-def text(no_color, wfo, product):
+def text(no_color, watch, max_interval, diff, diff_format,
+         output_format, wfo, product):
     """
     Retrieve the NWS text product.
 
-    Example: wxcast text slc afd
+    With --watch the product is polled and printed again, without a
+    pager, only when a new issuance is available.
+
+    With --diff only the changes since the text last seen for the wfo
+    and product are printed, without a pager. The full text is printed
+    the first time and nothing is printed when the text is unchanged.
+
+    Examples:
+        wxcast text slc afd
+        wxcast text --watch 300 slc afd
+        wxcast text --diff --diff-format sections slc afd
 
     :param no_color: If True do not style string output.
+    :param watch: Seconds between polls in watch mode or None.
+    :param max_interval: Max seconds between polls in watch mode.
+    :param diff: Flag to print only changes since the last seen text.
+    :param diff_format: Diff output format, unified or sections.
+    :param output_format: json, ndjson, table or None for text.
     :param wfo: The weather forecast office abbreviation (BOU).
     :param product: The text product to retrieve.
     """
+    from wxcast import api
+
+    product_archive = None
+
+    if diff:
+        from wxcast.archive import ProductArchive
+        product_archive = ProductArchive()
+
+    out = Renderer(output_format, no_color)
+
+    def render_text(response):
+        record = OrderedDict([
+            ('wfo', wfo.upper()),
+            ('product', product.upper())
+        ])
+        previous = None
+
+        if diff:
+            previous = product_archive.last_seen(wfo, product)
+            product_archive.set_last_seen(wfo, product, response)
+
+        if previous is None:
+            record['text'] = response
+            out.text(response, record)
+        else:
+            render_product_diff(out, previous, response, diff_format, record)
+
+        out.close()
+
     try:
-        response = api.get_nws_product(wfo, product)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        click.echo_via_pager(response)
+        if not watch:
+            try:
+                response = api.get_nws_product(wfo, product)
+            except Exception as e:
+                out.error(e, wfo=wfo.upper(), product=product.upper())
+                out.close()
+            else:
+                if diff or not out.is_text:
+                    render_text(response)
+                else:
+                    click.echo_via_pager(response)
+
+            return
+
+        def fetch():
+            try:
+                response = api.get_nws_product(wfo, product)
+            except Exception as e:
+                yield 'product', str(e), (None, e)
+            else:
+                yield 'product', response, (response, None)
+
+        try:
+            for response, error in poll(fetch, watch, max_interval):
+                if error:
+                    out.error(error, wfo=wfo.upper(), product=product.upper())
+                    out.close()
+                else:
+                    render_text(response)
+        except KeyboardInterrupt:
+            pass
+    finally:
+        if product_archive is not None:
+            product_archive.close()
 
 
 @click.command()
@@ -280,22 +965,27 @@ def text(no_color, wfo, product):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
+@output_options
 @click.argument('wfo')
-def office(no_color, wfo):
+def office(no_color, output_format, wfo):
     """
     Retrieve information for a given wfo.
 
     Example: wxcast info slc
 
     :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
     :param wfo: The weather forecast office abbreviation (BOU).
     """
-    try:
-        response = api.get_wfo_info(wfo)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        utils.echo_dict(response, no_color)
+    with Renderer(output_format, no_color) as out:
+        try:
+            response = from_index('get_wfo_info', wfo)
+        except Exception as e:
+            out.error(e, wfo=wfo.upper())
+        else:
+            record = OrderedDict([('wfo', wfo.upper())])
+            record.update(response)
+            out.dict(response, record=record)
 
 
 @click.command()
@@ -304,22 +994,29 @@ def office(no_color, wfo):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
+@output_options
 @click.argument('wfo')
-def stations(no_color, wfo):
+def stations(no_color, output_format, wfo):
     """
     Retrieve a list of stations for a given wfo.
 
     Example: wxcast info slc
 
     :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
     :param wfo: The weather forecast office abbreviation (BOU).
     """
-    try:
-        response = api.get_stations_for_wfo(wfo)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
-        utils.echo_style('\n'.join(response), no_color)
+    with Renderer(output_format, no_color, many=True) as out:
+        try:
+            response = from_index('get_stations_for_wfo', wfo)
+        except Exception as e:
+            out.error(e, wfo=wfo.upper())
+        else:
+            out.text(
+                '\n'.join(response),
+                [{'station': station_id} for station_id in response],
+                fg='yellow'
+            )
 
 
 @click.command()
@@ -328,21 +1025,28 @@ def stations(no_color, wfo):
     is_flag=True,
     help='Remove ANSI color and styling from output.'
 )
+@output_options
 @click.argument('station_id')
-def station(no_color, station_id):
+def station(no_color, output_format, station_id):
     """
     Retrieve info for a weather station.
 
     Example: wxcast station kbna
 
     :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
     :param station_id: The weather station id.
     """
-    try:
-        response = api.get_station_info(station_id)
-    except Exception as e:
-        utils.echo_style(str(e), no_color, fg='red')
-    else:
+    with Renderer(output_format, no_color) as out:
+        try:
+            response = from_index('get_station_info', station_id)
+        except Exception as e:
+            out.error(e, station=station_id.upper())
+            return
+
+        record = OrderedDict([('station', station_id.upper())])
+        record.update(response)
+
         try:
             # Try to convert elevation to ft and meters.
             response['elevation'] = '{}ft ({}m)'.format(
@@ -352,7 +1056,801 @@ def station(no_color, station_id):
         except (KeyError, Exception):
             pass
 
-        utils.echo_dict(response, no_color)
+        out.dict(response, record=record)
+
+
+@click.command()
+@click.option(
+    '--start',
+    help='Oldest observation time (ISO-8601, 2021-03-01T00:00:00Z).'
+)
+@click.option(
+    '--end',
+    help='Newest observation time (ISO-8601, 2021-03-02T00:00:00Z).'
+)
+@output_options
+@click.argument('station_id')
+def history(start, end, output_format, station_id):
+    """
+    Stream the observation history of a weather station as NDJSON.
+
+    One JSON object is printed per observation, newest first. Values
+    are numeric in fixed units (C, KT, M, MB, IN) and times are UTC.
+    --json and --table print every observation at once after the last
+    page is retrieved.
+
+    Examples:
+        wxcast history KDEN
+        wxcast history --start 2021-03-01T00:00:00Z KDEN > kden.ndjson
+
+    :param start: Oldest observation time.
+    :param end: Newest observation time.
+    :param output_format: json, ndjson or table, default ndjson.
+    :param station_id: The weather station id to retrieve history for.
+    """
+    from wxcast import api
+    from wxcast.exceptions import WxcastException
+
+    with Renderer(output_format or 'ndjson', many=True) as out:
+        try:
+            for observation in api.iter_observations(station_id, start, end):
+                out.record(observation.to_record())
+                out.flush()
+        except WxcastException as e:
+            raise click.ClickException(str(e))
+
+
+def write_export(rows, output, schema, file_format):
+    """
+    Write exported rows and print the number of rows written.
+
+    :param rows: Iterable of row tuples.
+    :param output: Output file path.
+    :param schema: Sequence of (column, type) tuples.
+    :param file_format: csv, arrow, parquet or None for the extension.
+    """
+    from wxcast.exceptions import WxcastException
+    from wxcast.export import export_rows
+
+    try:
+        count = export_rows(rows, output, schema, file_format)
+    except WxcastException as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'Wrote {count} rows to {output}')
+
+
+def echo_export_error(error):
+    """
+    Report a failed station or location without stopping the export.
+
+    :param error: The exception to print on stderr.
+    """
+    click.secho(str(error), fg='red', err=True)
+
+
+@click.group()
+def export():
+    """
+    Export observations and forecasts to CSV, Arrow or Parquet.
+
+    The format is taken from the output file extension (.csv, .arrow,
+    .feather, .parquet) unless --format is given. Rows are written in
+    chunks so large exports use constant memory.
+    """
+
+
+@export.command('metars')
+@click.option(
+    '-o',
+    '--output',
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help='Output file path.'
+)
+@click.option(
+    '--format',
+    'file_format',
+    type=click.Choice(['csv', 'arrow', 'parquet']),
+    help='Output format, from the file extension by default.'
+)
+@click.option(
+    '-f',
+    '--file',
+    'id_file',
+    type=click.File('r'),
+    help='File with one ICAO code per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of concurrent requests.'
+)
+@click.argument('icao', nargs=-1)
+def export_metars(output, file_format, id_file, workers, icao):
+    """
+    Export the latest decoded METAR of each station.
+
+    Example: wxcast export metars -o metars.parquet KDEN KSLC
+
+    :param output: Output file path.
+    :param file_format: Output format or None.
+    :param id_file: File with additional ICAO codes.
+    :param workers: Max number of concurrent requests.
+    :param icao: The airport ICAO codes to export.
+    """
+    from wxcast import api
+    from wxcast.export import OBSERVATION_SCHEMA, observation_row
+
+    ids = read_arguments(icao, id_file)
+
+    def rows():
+        results = api.get_observations(ids, max_workers=workers)
+
+        for station_id, observation, error in results:
+            if error:
+                echo_export_error(error)
+            else:
+                yield observation_row(observation)
+
+    write_export(rows(), output, OBSERVATION_SCHEMA, file_format)
+
+
+@export.command('history')
+@click.option(
+    '-o',
+    '--output',
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help='Output file path.'
+)
+@click.option(
+    '--format',
+    'file_format',
+    type=click.Choice(['csv', 'arrow', 'parquet']),
+    help='Output format, from the file extension by default.'
+)
+@click.option(
+    '-f',
+    '--file',
+    'id_file',
+    type=click.File('r'),
+    help='File with one station id per line.'
+)
+@click.option(
+    '--start',
+    help='Oldest observation time (ISO-8601, 2021-03-01T00:00:00Z).'
+)
+@click.option(
+    '--end',
+    help='Newest observation time (ISO-8601, 2021-03-02T00:00:00Z).'
+)
+@click.argument('station_id', nargs=-1)
+def export_history(output, file_format, id_file, start, end, station_id):
+    """
+    Export the observation history of one or more stations.
+
+    Example: wxcast export history --start 2021-03-01 -o kden.csv KDEN
+
+    :param output: Output file path.
+    :param file_format: Output format or None.
+    :param id_file: File with additional station ids.
+    :param start: Oldest observation time.
+    :param end: Newest observation time.
+    :param station_id: The weather station ids to export.
+    """
+    from wxcast import api
+    from wxcast.exceptions import WxcastException
+    from wxcast.export import OBSERVATION_SCHEMA, observation_row
+
+    ids = read_arguments(station_id, id_file)
+
+    def rows():
+        for station in ids:
+            try:
+                for observation in api.iter_observations(station, start, end):
+                    yield observation_row(observation)
+            except WxcastException as error:
+                echo_export_error(error)
+
+    write_export(rows(), output, OBSERVATION_SCHEMA, file_format)
+
+
+@export.command('forecast')
+@click.option(
+    '-o',
+    '--output',
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help='Output file path.'
+)
+@click.option(
+    '--format',
+    'file_format',
+    type=click.Choice(['csv', 'arrow', 'parquet']),
+    help='Output format, from the file extension by default.'
+)
+@click.option(
+    '-f',
+    '--file',
+    'location_file',
+    type=click.File('r'),
+    help='File with one location per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of locations retrieved concurrently.'
+)
+@click.argument('location', nargs=-1)
+def export_forecast(output, file_format, location_file, workers, location):
+    """
+    Export the seven day forecast periods of one or more locations.
+
+    Example: wxcast export forecast -o forecast.csv denver "boulder, co"
+
+    :param output: Output file path.
+    :param file_format: Output format or None.
+    :param location_file: File with additional locations.
+    :param workers: Max number of concurrent locations.
+    :param location: Location strings to export forecasts for.
+    """
+    from wxcast import api
+    from wxcast.export import FORECAST_SCHEMA, forecast_rows
+
+    locations = read_arguments(location, location_file, 'location')
+
+    def rows():
+        results = api.get_forecasts(
+            locations,
+            max_workers=workers,
+            ordered=True
+        )
+
+        for name, periods, error in results:
+            if error:
+                echo_export_error(error)
+            else:
+                yield from forecast_rows(name, periods)
+
+    write_export(rows(), output, FORECAST_SCHEMA, file_format)
+
+
+@click.group()
+def index():
+    """
+    Manage the local index of offices, stations and products.
+
+    The offices, office, stations, station and products commands answer
+    from the index while it is less than 7 days old. Older indexes are
+    ignored until refreshed.
+    """
+    pass
+
+
+@index.command('refresh')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of concurrent requests.'
+)
+@output_options
+def refresh_index(no_color, workers, output_format):
+    """
+    Rebuild the local index from the NWS api.
+
+    Example: wxcast index refresh
+
+    :param no_color: If True do not style string output.
+    :param workers: Max number of concurrent requests.
+    :param output_format: json, ndjson, table or None for text.
+    """
+    from wxcast.index import StationIndex
+
+    with Renderer(output_format, no_color) as out:
+        try:
+            response = StationIndex().refresh(max_workers=workers)
+        except Exception as e:
+            out.error(e)
+        else:
+            text = OrderedDict(response)
+            text['updated'] = 'yes' if response['updated'] else 'no'
+            out.dict(text, record=response)
+
+
+@index.command('status')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@output_options
+def index_status(no_color, output_format):
+    """
+    Display the age and size of the local index.
+
+    Example: wxcast index status
+
+    :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
+    """
+    from wxcast.index import StationIndex
+
+    with Renderer(output_format, no_color) as out:
+        try:
+            station_index = StationIndex()
+        except Exception as e:
+            out.error(e)
+            return
+
+        refreshed = station_index.refreshed
+        response = OrderedDict()
+        response['path'] = station_index.path
+        response['refreshed'] = (
+            time.ctime(refreshed) if refreshed else 'never'
+        )
+        response['fresh'] = 'yes' if station_index.is_fresh() else 'no'
+        response.update(station_index.counts())
+
+        record = OrderedDict(response)
+        record['refreshed'] = refreshed
+        record['fresh'] = station_index.is_fresh()
+        out.dict(response, record=record)
+
+
+@click.group()
+def archive():
+    """
+    Manage the local archive of NWS text products.
+
+    Texts are stored compressed and identical issuances are stored
+    once. Fetching again only requests issuances not yet archived.
+    """
+    pass
+
+
+@archive.command('fetch')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@click.option(
+    '-n',
+    '--count',
+    default=ARCHIVE_COUNT,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Number of most recent issuances to archive.'
+)
+@click.option(
+    '-f',
+    '--file',
+    'wfo_file',
+    type=click.File('r'),
+    help='File with one WFO per line.'
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=MAX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help='Max number of concurrent requests.'
+)
+@output_options
+@click.argument('product')
+@click.argument('wfo', nargs=-1)
+def fetch_archive(no_color, count, wfo_file, workers, output_format, product,
+                  wfo):
+    """
+    Archive the latest issuances of a text product for one or more WFOs.
+
+    Examples:
+        wxcast archive fetch afd bou
+        wxcast archive fetch -n 50 afd bou slc
+
+    :param no_color: If True do not style string output.
+    :param count: Number of most recent issuances to archive.
+    :param wfo_file: File with additional WFOs.
+    :param workers: Max number of concurrent requests.
+    :param output_format: json, ndjson, table or None for text.
+    :param product: The text product to archive.
+    :param wfo: The weather forecast office abbreviations (BOU).
+    """
+    from wxcast import api
+    from wxcast.archive import ProductArchive
+
+    wfos = read_arguments(wfo, wfo_file, name='wfo')
+
+    with ProductArchive() as product_archive, \
+            Renderer(output_format, no_color, many=True) as out:
+        for index, office_id in enumerate(wfos):
+            if len(wfos) > 1:
+                if index:
+                    out.echo()
+
+                out.echo(office_id.upper(), fg='yellow')
+
+            try:
+                response = api.archive_products(
+                    office_id,
+                    product,
+                    count=count,
+                    archive=product_archive,
+                    max_workers=workers
+                )
+            except Exception as e:
+                out.error(e, wfo=office_id.upper())
+            else:
+                record = OrderedDict([('wfo', office_id.upper())])
+                record.update(response)
+                out.dict(response, record=record)
+
+            out.flush()
+
+
+@archive.command('list')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@output_options
+@click.argument('wfo')
+@click.argument('product')
+def list_archive(no_color, output_format, wfo, product):
+    """
+    List the archived issuances of a text product, newest first.
+
+    Example: wxcast archive list bou afd
+
+    :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
+    :param wfo: The weather forecast office abbreviation (BOU).
+    :param product: The text product to list.
+    """
+    from wxcast.archive import ProductArchive
+
+    with ProductArchive() as product_archive:
+        issuances = product_archive.issuances(wfo, product)
+
+    with Renderer(output_format, no_color, many=True) as out:
+        if not issuances and out.is_text:
+            out.error('No archived issuances found.')
+            return
+
+        out.table(
+            ('id', 'issued', 'digest'),
+            (
+                (product_id, issued or '', digest[:12])
+                for product_id, issued, digest in issuances
+            ),
+            records=(
+                OrderedDict([
+                    ('id', product_id),
+                    ('issued', issued),
+                    ('digest', digest)
+                ])
+                for product_id, issued, digest in issuances
+            )
+        )
+
+
+@archive.command('show')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@output_options
+@click.argument('product_id')
+def show_archive(no_color, output_format, product_id):
+    """
+    Display an archived product text.
+
+    Example: wxcast archive show a3ab8059-8ae0-4a2c-ad43-09100e5452ad
+
+    :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
+    :param product_id: The NWS product id.
+    """
+    from wxcast.archive import ProductArchive
+
+    with ProductArchive() as product_archive:
+        response = product_archive.get_text(product_id)
+
+    with Renderer(output_format, no_color) as out:
+        if response is None:
+            out.error('Product not found in archive.', id=product_id)
+        elif out.is_text:
+            click.echo_via_pager(response)
+        else:
+            out.record(
+                OrderedDict([('id', product_id), ('text', response)])
+            )
+
+
+@archive.command('status')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@output_options
+def archive_status(no_color, output_format):
+    """
+    Display the size of the local product archive.
+
+    Example: wxcast archive status
+
+    :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
+    """
+    from wxcast.archive import ProductArchive
+
+    with ProductArchive() as product_archive:
+        response = OrderedDict()
+        response['path'] = product_archive.path
+        response.update(product_archive.counts())
+
+    with Renderer(output_format, no_color) as out:
+        out.dict(response)
+
+
+@click.command()
+@click.option(
+    '--host',
+    default=SERVE_HOST,
+    show_default=True,
+    help='Address to listen on.'
+)
+@click.option(
+    '-p',
+    '--port',
+    default=SERVE_PORT,
+    show_default=True,
+    type=click.IntRange(min=0, max=65535),
+    help='Port to listen on.'
+)
+@click.option(
+    '--ttl',
+    default=SERVE_TTL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help='Seconds to cache observations, forecasts and products.'
+)
+@click.option(
+    '--static-ttl',
+    default=SERVE_STATIC_TTL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help='Seconds to cache office and station information.'
+)
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+def serve(host, port, ttl, static_ttl, no_color):
+    """
+    Serve wxcast data as JSON over local HTTP.
+
+    All clients share one in memory cache and one upstream session,
+    concurrent requests for the same resource share a single NWS
+    request.
+
+    \b
+    Endpoints:
+        /metar/ICAO?decoded=1&temp_unit=F
+        /conditions/STATION
+        /forecast?location=LOCATION&hourly=1
+        /text/WFO/PRODUCT
+        /offices
+        /offices/WFO
+        /offices/WFO/products
+        /offices/WFO/stations
+        /stations/STATION
+        /stats
+
+    Example: wxcast serve --port 8765
+
+    :param host: Address to listen on.
+    :param port: Port to listen on.
+    :param ttl: Seconds to cache observations, forecasts and products.
+    :param static_ttl: Seconds to cache office and station information.
+    :param no_color: If True do not style string output.
+    """
+    from wxcast.gateway import Gateway, GatewayServer
+
+    try:
+        server = GatewayServer(
+            (host, port),
+            Gateway(ttl=ttl, static_ttl=static_ttl)
+        )
+    except OSError as error:
+        raise click.ClickException(
+            f'Unable to listen on {host}:{port}: {error}'
+        )
+
+    address, port = server.server_address[:2]
+    utils.echo_style(
+        f'Serving on http://{address}:{port}/ (Ctrl+C to stop)',
+        no_color,
+        fg='green'
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@click.group()
+def daemon():
+    """
+    Run commands in a warm background process.
+
+    While a daemon is running the wxcast command forwards metar,
+    conditions, forecast, text, office and station commands to it over
+    a Unix socket. The daemon keeps its connection pool and caches
+    between commands so repeated calls skip startup and connection
+    setup. Without a daemon commands run in process as usual, set
+    WXCAST_NO_DAEMON=1 to always run in process.
+    """
+
+
+@daemon.command('start')
+@click.option(
+    '--idle-timeout',
+    default=DAEMON_IDLE_TIMEOUT,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help='Seconds without requests before the daemon exits, 0 to never '
+         'exit.'
+)
+@click.option(
+    '--foreground',
+    is_flag=True,
+    help='Run the daemon in this process instead of in the background.'
+)
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+def start_daemon(idle_timeout, foreground, no_color):
+    """
+    Start the daemon.
+
+    Example: wxcast daemon start
+
+    :param idle_timeout: Seconds without requests before exiting.
+    :param foreground: If True serve in this process.
+    :param no_color: If True do not style string output.
+    """
+    import subprocess
+    import sys
+
+    from wxcast.daemon import DaemonServer, ping
+
+    if foreground:
+        try:
+            server = DaemonServer(idle_timeout=idle_timeout)
+        except OSError as error:
+            raise click.ClickException(str(error))
+
+        utils.echo_style(
+            f'Daemon listening on {server.path}', no_color, fg='green'
+        )
+
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            pass
+
+        return
+
+    status = ping()
+
+    if status is None:
+        subprocess.Popen(
+            [
+                sys.executable, '-m', 'wxcast', 'daemon', 'start',
+                '--foreground', '--idle-timeout', str(idle_timeout)
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        deadline = time.time() + DAEMON_START_TIMEOUT
+
+        while status is None and time.time() < deadline:
+            time.sleep(0.05)
+            status = ping()
+
+        if status is None:
+            raise click.ClickException('Daemon did not start.')
+
+        message = 'Daemon started'
+    else:
+        message = 'Daemon already running'
+
+    utils.echo_style(
+        f'{message} (pid {status["pid"]}) on {status["socket"]}',
+        no_color,
+        fg='green'
+    )
+
+
+@daemon.command('stop')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+def stop_daemon(no_color):
+    """
+    Stop the running daemon.
+
+    Example: wxcast daemon stop
+
+    :param no_color: If True do not style string output.
+    """
+    from wxcast.daemon import stop
+
+    status = stop()
+
+    if status is None:
+        utils.echo_style('No daemon running.', no_color, fg='red')
+    else:
+        utils.echo_style(
+            f'Daemon stopped (pid {status["pid"]}).', no_color, fg='green'
+        )
+
+
+@daemon.command('status')
+@click.option(
+    '--no-color',
+    is_flag=True,
+    help='Remove ANSI color and styling from output.'
+)
+@output_options
+def daemon_status(no_color, output_format):
+    """
+    Show the status of the running daemon.
+
+    Example: wxcast daemon status
+
+    :param no_color: If True do not style string output.
+    :param output_format: json, ndjson, table or None for text.
+    """
+    from wxcast.daemon import ping
+
+    status = ping()
+
+    with Renderer(output_format, no_color) as out:
+        if status is None:
+            out.error('No daemon running.')
+        else:
+            out.dict(status)
 
 
 main.add_command(metar)
@@ -364,3 +1862,9 @@ main.add_command(office)
 main.add_command(stations)
 main.add_command(station)
 main.add_command(conditions)
+main.add_command(history)
+main.add_command(index)
+main.add_command(export)
+main.add_command(archive)
+main.add_command(serve)
+main.add_command(daemon)
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import socket
+import sys
+
+from wxcast import __version__
+from wxcast.constants import (
+    DAEMON_SOCKET,
+    DAEMON_TIMEOUT,
+    DAEMON_WAIT_TIMEOUT
+)
+
+# This module is the console entry point. It only imports the standard
+# library so commands answered by a running daemon skip importing
+# click, requests and the rest of wxcast.
+
+# Commands the daemon runs. Commands that write files, stream long
+# histories, serve or manage the daemon always run in process.
+FORWARD_COMMANDS = frozenset([
+    'conditions',
+    'forecast',
+    'metar',
+    'office',
+    'offices',
+    'products',
+    'station',
+    'stations',
+    'text'
+])
+# Commands that use a pager when printing text to a terminal.
+PAGED_COMMANDS = frozenset(['text'])
+MACHINE_OPTIONS = frozenset(['--json', '--ndjson', '--table', '--diff'])
+# Environment variables that change how commands behave. The daemon
+# only runs commands for clients with the same values.
+ENVIRONMENT = ('HOME', 'WXCAST_CACHE_DIR', 'WXCAST_JSON', 'XDG_CACHE_HOME')
+# Options of the main group that take a value.
+VALUE_OPTIONS = frozenset(['--rate-limit'])
+
+
+def get_socket_path():
+    """
+    Return the path of the daemon socket.
+
+    WXCAST_DAEMON_SOCKET takes precedence over the cache directory.
+
+    :return: Path to the Unix socket as string.
+    """
+    path = os.environ.get('WXCAST_DAEMON_SOCKET')
+
+    if path:
+        return path
+
+    cache_dir = os.environ.get('WXCAST_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or
+        os.path.join(os.path.expanduser('~'), '.cache'),
+        'wxcast'
+    )
+    return os.path.join(cache_dir, DAEMON_SOCKET)
+
+
+def get_environment():
+    """
+    Return the values of the environment variables in ENVIRONMENT.
+
+    :return: Dictionary of {name: value or None}.
+    """
+    return {name: os.environ.get(name) for name in ENVIRONMENT}
+
+
+def get_command(args):
+    """
+    Return the name of the command in the argument list.
+
+    :param args: List of command line arguments.
+    :return: Command name or None.
+    """
+    args = iter(args)
+
+    for arg in args:
+        if arg in VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+
+    return None
+
+
+def should_forward(args, isatty=False):
+    """
+    Return True if the command can be answered by the daemon.
+
+    Long running commands (--watch), commands reading stdin and paged
+    output to a terminal stay in process.
+
+    :param args: List of command line arguments.
+    :param isatty: True if stdout is a terminal.
+    :return: Boolean.
+    """
+    command = get_command(args)
+
+    if command not in FORWARD_COMMANDS:
+        return False
+
+    watch = any(arg.split('=')[0] == '--watch' for arg in args)
+
+    if watch or '-' in args:
+        return False
+
+    if command in PAGED_COMMANDS and isatty:
+        return bool(MACHINE_OPTIONS.intersection(args))
+
+    return True
+
+
+def request(message, path=None, timeout=None):
+    """
+    Send a request to the daemon and return its response.
+
+    :param message: JSON serializable request dictionary.
+    :param path: Socket path, defaults to get_socket_path().
+    :param timeout: Socket timeout in seconds or None to wait.
+    :return: Response dictionary or None if no daemon answered.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+
+    try:
+        client.connect(path or get_socket_path())
+        client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        client.shutdown(socket.SHUT_WR)
+
+        with client.makefile('rb') as reader:
+            response = json.loads(reader.readline().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    finally:
+        client.close()
+
+    if not isinstance(response, dict) or response.get('error'):
+        return None
+
+    return response
+
+
+def _read_frame(reader):
+    line = reader.readline()
+
+    if not line:
+        raise OSError('Connection closed by the daemon.')
+
+    return json.loads(line.decode('utf-8'))
+
+
+def forward(args, path=None, stdout=None, stderr=None):
+    """
+    Run a command in the daemon and write its output as it arrives.
+
+    :param args: List of command line arguments.
+    :param path: Socket path, defaults to get_socket_path().
+    :param stdout: Text stream for output, defaults to sys.stdout.
+    :param stderr: Text stream for errors, defaults to sys.stderr.
+    :return: The exit code or None if the daemon did not run the
+        command, because none is running or it is busy.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    message = {
+        'op': 'run',
+        'version': __version__,
+        'args': args,
+        'cwd': os.getcwd(),
+        'color': stdout.isatty(),
+        'env': get_environment()
+    }
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # The daemon answers within DAEMON_WAIT_TIMEOUT, with a start frame
+    # or an error when busy.
+    client.settimeout(DAEMON_WAIT_TIMEOUT + 1)
+
+    try:
+        try:
+            client.connect(path or get_socket_path())
+            client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            client.shutdown(socket.SHUT_WR)
+            reader = client.makefile('rb')
+            frame = _read_frame(reader)
+        except (OSError, ValueError):
+            return None
+
+        if 'start' not in frame:
+            return None
+
+        client.settimeout(DAEMON_TIMEOUT)
+
+        try:
+            while True:
+                frame = _read_frame(reader)
+
+                if 'out' in frame:
+                    stdout.write(frame['out'])
+                    stdout.flush()
+                elif 'err' in frame:
+                    stderr.write(frame['err'])
+                    stderr.flush()
+                elif 'exit' in frame:
+                    return frame['exit']
+        except (OSError, ValueError) as error:
+            # Output was already written, running again would repeat it.
+            stderr.write(f'Error: Lost connection to the daemon: {error}\n')
+            return 1
+    finally:
+        client.close()
+
+
+def main(args=None):
+    """
+    Entry point that forwards commands to a running daemon.
+
+    Falls back to running the command in process when no daemon is
+    running or WXCAST_NO_DAEMON is set.
+
+    :param args: List of command line arguments, defaults to sys.argv.
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    if not os.environ.get('WXCAST_NO_DAEMON') and \
+            should_forward(args, sys.stdout.isatty()):
+        code = forward(args)
+
+        if code is not None:
+            sys.exit(code)
+
+    from wxcast.cli import main as cli_main
+
+    cli_main(args=args, prog_name='wxcast')
@@ -22,13 +22,44 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import requests
-
-
-HEADERS = requests.utils.default_headers()
-HEADERS.update(
-    {
-        'User-Agent': 'wxcast app. https://github.com/smarlowucf/wxcast',
-    }
-)
+HEADERS = {
+    'User-Agent': 'wxcast app. https://github.com/smarlowucf/wxcast',
+}
 NWS_API = 'https://api.weather.gov'
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+MAX_WORKERS = 8
+CACHE_MAX_SIZE = 50 * 1024 * 1024
+GEOCODE_TTL = 90 * 24 * 60 * 60
+POINT_TTL = 30 * 24 * 60 * 60
+INDEX_MAX_AGE = 7 * 24 * 60 * 60
+# Share of failed office or station requests that aborts an index refresh.
+INDEX_MAX_FAILURES = 0.1
+METAR_CHUNKSIZE = 512
+WATCH_INTERVAL = 60
+# Shortest poll interval, observations and products change in minutes.
+WATCH_MIN_INTERVAL = 10
+WATCH_MAX_INTERVAL = 600
+HISTORY_PAGE_SIZE = 100
+EXPORT_CHUNKSIZE = 10000
+ARCHIVE_COUNT = 10
+STREAM_CHUNKSIZE = 16384
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8765
+SERVE_TTL = 60
+SERVE_STATIC_TTL = 3600
+SERVE_CACHE_SIZE = 4096
+DAEMON_SOCKET = 'daemon.sock'
+DAEMON_IDLE_TIMEOUT = 1800
+DAEMON_START_TIMEOUT = 5
+# Seconds a client waits for a busy daemon before running in process.
+DAEMON_WAIT_TIMEOUT = 1
+# Seconds a client waits for output of a running command.
+DAEMON_TIMEOUT = 120
+RATE_LIMIT = 10.0
+RATE_BURST = 10
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 30.0
+# The NWS api answers unknown ids with a 500, those are not retried.
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
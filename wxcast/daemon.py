@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+
+from contextlib import redirect_stderr, redirect_stdout
+from socketserver import (
+    StreamRequestHandler,
+    ThreadingMixIn,
+    UnixStreamServer
+)
+
+from wxcast import __version__
+from wxcast.client import get_environment, get_socket_path, request
+from wxcast.constants import DAEMON_IDLE_TIMEOUT, DAEMON_WAIT_TIMEOUT
+
+logger = logging.getLogger('wxcast')
+
+
+class FrameWriter(io.TextIOBase):
+    """
+    Text stream that sends every write to the client as a frame.
+    """
+
+    def __init__(self, send, name):
+        self._send = send
+        self._name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            # Like other text streams, click relies on this to tell
+            # text and binary streams apart.
+            raise TypeError(f'write() argument must be str, not '
+                            f'{type(text).__name__}')
+
+        if text:
+            self._send({self._name: text})
+
+        return len(text)
+
+
+def run_command(args, stdout, stderr, cwd=None, color=None, warm=None):
+    """
+    Run a wxcast command in process with its output redirected.
+
+    :param args: List of command line arguments.
+    :param stdout: Text stream for the standard output of the command.
+    :param stderr: Text stream for errors and log records.
+    :param cwd: Directory to run the command in.
+    :param color: True to keep ANSI styling in the output.
+    :param warm: Dictionary to keep sessions and caches in between
+        commands.
+    :return: The exit code.
+    """
+    from wxcast.cli import main
+
+    previous = os.getcwd()
+    code = 0
+
+    # Log records of this command go to its own stderr, --debug lowers
+    # the root level for this command only.
+    root = logging.getLogger()
+    level = root.level
+    handler = logging.StreamHandler(stderr)
+    handler.setFormatter(logging.Formatter('%(name)s: %(message)s'))
+    root.addHandler(handler)
+
+    try:
+        if cwd:
+            os.chdir(cwd)
+
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            main.main(
+                args=args,
+                prog_name='wxcast',
+                obj={'warm': warm},
+                color=color
+            )
+    except SystemExit as error:
+        if isinstance(error.code, int) or error.code is None:
+            code = error.code or 0
+        else:
+            stderr.write(f'{error.code}\n')
+            code = 1
+    except OSError as error:
+        # The client went away, there is nobody left to answer.
+        logger.debug('Client disconnected: %s', error)
+        code = 1
+    except Exception:
+        stderr.write(traceback.format_exc())
+        code = 1
+    finally:
+        os.chdir(previous)
+        root.removeHandler(handler)
+        root.setLevel(level)
+
+    return code
+
+
+class DaemonHandler(StreamRequestHandler):
+    """
+    Answer one JSON request per connection with JSON frames.
+    """
+
+    def send(self, frame):
+        self.wfile.write(json.dumps(frame).encode('utf-8') + b'\n')
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline().decode('utf-8'))
+        except ValueError as error:
+            self.send({'error': f'Invalid request: {error}'})
+        else:
+            try:
+                self.server.dispatch(message, self.send)
+            except OSError as error:
+                logger.debug('Client disconnected: %s', error)
+
+
+class DaemonServer(ThreadingMixIn, UnixStreamServer):
+    """
+    Unix socket server that runs wxcast commands in a warm process.
+
+    Every connection is handled in its own thread, but commands run one
+    at a time so the shared session, caches and redirected output are
+    never used by two commands at once. A command that cannot start
+    within DAEMON_WAIT_TIMEOUT is refused and the client runs it in
+    process. Output is sent in frames as it is written:
+
+        {"start": pid}, {"out": text}, {"err": text}, {"exit": code}
+
+    The server stops after idle_timeout seconds without requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path=None, idle_timeout=DAEMON_IDLE_TIMEOUT):
+        self.path = path or get_socket_path()
+        self.idle_timeout = idle_timeout
+        # Poll interval of run for stop requests and the idle timeout.
+        self.timeout = 0.5
+        self.started = self.active = time.time()
+        self.requests = 0
+        self.warm = {}
+        self.stopped = False
+        self._command_lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.path):
+            if request({'op': 'ping'}, self.path, timeout=1):
+                raise OSError(f'A daemon is already running on {self.path}')
+
+            # Left behind by a daemon that did not shut down cleanly.
+            os.unlink(self.path)
+
+        # Only the owner may connect to the socket.
+        umask = os.umask(0o077)
+        try:
+            UnixStreamServer.__init__(self, self.path, DaemonHandler)
+        finally:
+            os.umask(umask)
+
+    def status(self):
+        """
+        Return information about the running daemon.
+
+        :return: Dictionary with pid, version, socket, uptime and
+            request count.
+        """
+        return {
+            'pid': os.getpid(),
+            'version': __version__,
+            'socket': self.path,
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests
+        }
+
+    def dispatch(self, message, send):
+        """
+        Answer a request dictionary.
+
+        :param message: Request with an op of run, ping or stop.
+        :param send: Function to send a response frame.
+        """
+        op = message.get('op')
+        self.active = time.time()
+
+        if op == 'ping':
+            send(self.status())
+        elif op == 'stop':
+            self.stopped = True
+            send(self.status())
+        elif op != 'run':
+            send({'error': f'Unknown op: {op}'})
+        elif message.get('version') != __version__:
+            # Let clients of another version run in process.
+            send({'error': f'Daemon version is {__version__}'})
+        elif message.get('env') != get_environment():
+            # The cache directory and JSON backend are set up from the
+            # environment of the daemon.
+            send({'error': 'Daemon environment differs'})
+        elif not self._command_lock.acquire(timeout=DAEMON_WAIT_TIMEOUT):
+            send({'error': 'Daemon is busy'})
+        else:
+            try:
+                self.requests += 1
+                send({'start': os.getpid()})
+                start = time.time()
+                code = run_command(
+                    message.get('args', []),
+                    FrameWriter(send, 'out'),
+                    FrameWriter(send, 'err'),
+                    message.get('cwd'),
+                    message.get('color'),
+                    self.warm
+                )
+                logger.debug(
+                    'Ran %s in %.1fms', message.get('args'),
+                    (time.time() - start) * 1000
+                )
+                send({'exit': code})
+            finally:
+                self.active = time.time()
+                self._command_lock.release()
+
+    def handle_timeout(self):
+        idle = time.time() - self.active
+
+        if self.idle_timeout and idle > self.idle_timeout and \
+                not self._command_lock.locked():
+            self.stopped = True
+
+    def run(self):
+        """
+        Serve requests until stopped or idle for idle_timeout seconds.
+        """
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            self.server_close()
+
+    def server_close(self):
+        super().server_close()
+
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def ping(path=None):
+    """
+    Return the status of the running daemon.
+
+    :param path: Socket path, defaults to get_socket_path().
+    :return: Status dictionary or None if no daemon is running.
+    """
+    return request({'op': 'ping'}, path, timeout=5)
+
+
+def stop(path=None):
+    """
+    Ask the running daemon to shut down.
+
+    :param path: Socket path, defaults to get_socket_path().
+    :return: Status dictionary or None if no daemon is running.
+    """
+    return request({'op': 'stop'}, path, timeout=5)
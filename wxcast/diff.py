@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import difflib
+import re
+
+from collections import OrderedDict
+
+# AFD style section headers such as ".SHORT TERM...(Tonight)".
+SECTION = re.compile(r'^\.([A-Z0-9][^\n]*?)\.\.\.', re.MULTILINE)
+
+
+def split_sections(text):
+    """
+    Split a product text into its dot headed sections.
+
+    Text before the first section is keyed by an empty string.
+    Repeated section names are numbered to keep every section.
+
+    :param text: Product text as string.
+    :return: OrderedDict of section name to section text.
+    """
+    sections = OrderedDict()
+    matches = list(SECTION.finditer(text))
+    starts = [0] + [match.start() for match in matches] + [len(text)]
+    names = [''] + [match.group(1).strip() for match in matches]
+
+    for index, name in enumerate(names):
+        body = text[starts[index]:starts[index + 1]]
+
+        if not name and not body.strip():
+            continue
+
+        key, count = name, 1
+        while key in sections:
+            count += 1
+            key = f'{name} ({count})'
+
+        sections[key] = body
+
+    return sections
+
+
+def unified_diff(old, new, old_name='previous', new_name='latest'):
+    """
+    Return a unified diff between two product texts.
+
+    :param old: Previous product text.
+    :param new: Latest product text.
+    :param old_name: Label of the previous text.
+    :param new_name: Label of the latest text.
+    :return: List of diff lines without line endings.
+    """
+    return list(
+        difflib.unified_diff(
+            old.splitlines(),
+            new.splitlines(),
+            old_name,
+            new_name,
+            lineterm=''
+        )
+    )
+
+
+def section_diff(old, new):
+    """
+    Compare two product texts section by section.
+
+    Text before the first section (the issuance header) is ignored.
+
+    :param old: Previous product text.
+    :param new: Latest product text.
+    :return: List of (change, name, text) tuples where change is one of
+        added, changed or removed and text is the latest section text
+        (empty for removed sections).
+    """
+    old_sections = split_sections(old)
+    new_sections = split_sections(new)
+    old_sections.pop('', None)
+    new_sections.pop('', None)
+    changes = []
+
+    for name, body in new_sections.items():
+        if name not in old_sections:
+            changes.append(('added', name, body))
+        elif old_sections[name].strip() != body.strip():
+            changes.append(('changed', name, body))
+
+    for name in old_sections:
+        if name not in new_sections:
+            changes.append(('removed', name, ''))
+
+    return changes
@@ -25,3 +25,7 @@
 
 class WxcastException(Exception):
     """Generic wxcast exception."""
+
+
+class WxcastNotFound(WxcastException):
+    """The requested station, office, product or location does not exist."""
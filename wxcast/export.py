@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import csv
+import os
+
+from datetime import datetime, timezone
+from itertools import islice
+
+from wxcast.constants import EXPORT_CHUNKSIZE
+from wxcast.exceptions import WxcastException
+from wxcast.forecast import parse_time
+
+FORMATS = {
+    '.csv': 'csv',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.parquet': 'parquet',
+}
+
+# (column, type) where type is one of string, int64, float64, bool
+# or timestamp (UTC). Columns are only ever appended.
+OBSERVATION_SCHEMA = (
+    ('station', 'string'),
+    ('report_type', 'string'),
+    ('time', 'timestamp'),
+    ('elevation', 'float64'),
+    ('temperature', 'float64'),
+    ('dewpoint', 'float64'),
+    ('wind_direction', 'float64'),
+    ('wind_direction_from', 'float64'),
+    ('wind_direction_to', 'float64'),
+    ('wind_speed', 'float64'),
+    ('wind_gust', 'float64'),
+    ('peak_wind_direction', 'float64'),
+    ('peak_wind_speed', 'float64'),
+    ('peak_wind_time', 'timestamp'),
+    ('visibility', 'float64'),
+    ('pressure', 'float64'),
+    ('sea_level_pressure', 'float64'),
+    ('max_temp_6hr', 'float64'),
+    ('min_temp_6hr', 'float64'),
+    ('max_temp_24hr', 'float64'),
+    ('min_temp_24hr', 'float64'),
+    ('precip_1hr', 'float64'),
+    ('precip_3hr', 'float64'),
+    ('precip_6hr', 'float64'),
+    ('precip_24hr', 'float64'),
+    ('weather', 'string'),
+    ('sky', 'string'),
+    ('remarks', 'string'),
+)
+
+FORECAST_SCHEMA = (
+    ('location', 'string'),
+    ('number', 'int64'),
+    ('name', 'string'),
+    ('start_time', 'timestamp'),
+    ('end_time', 'timestamp'),
+    ('is_daytime', 'bool'),
+    ('temperature', 'float64'),
+    ('temperature_unit', 'string'),
+    ('wind_speed', 'string'),
+    ('wind_direction', 'string'),
+    ('short_forecast', 'string'),
+    ('detailed_forecast', 'string'),
+)
+
+
+def observation_row(observation):
+    """
+    Convert an Observation to a row of OBSERVATION_SCHEMA.
+
+    :param observation: Observation instance.
+    :return: Tuple of column values.
+    """
+    row = []
+
+    for name, column_type in OBSERVATION_SCHEMA:
+        value = getattr(observation, name)
+
+        if column_type == 'timestamp' and value is not None:
+            # METAR times are naive UTC.
+            value = value.replace(tzinfo=timezone.utc)
+
+        row.append(value)
+
+    return tuple(row)
+
+
+def _period_time(value):
+    if not value:
+        return None
+
+    return datetime.fromtimestamp(parse_time(value)[0], timezone.utc)
+
+
+def forecast_rows(location, periods):
+    """
+    Convert NWS forecast periods to rows of FORECAST_SCHEMA.
+
+    :param location: The location the forecast is for.
+    :param periods: List of forecast period dictionaries.
+    :return: Generator of tuples of column values.
+    """
+    for period in periods:
+        temperature = period.get('temperature')
+
+        if isinstance(temperature, dict):
+            temperature = temperature.get('value')
+
+        yield (
+            location,
+            period.get('number'),
+            period.get('name') or None,
+            _period_time(period.get('startTime')),
+            _period_time(period.get('endTime')),
+            period.get('isDaytime'),
+            None if temperature is None else float(temperature),
+            period.get('temperatureUnit'),
+            period.get('windSpeed'),
+            period.get('windDirection'),
+            period.get('shortForecast'),
+            period.get('detailedForecast')
+        )
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    return value
+
+
+class CsvWriter(object):
+    """
+    Write rows to a CSV file with a header row.
+
+    Timestamps are written as ISO-8601 UTC and missing values as
+    empty fields.
+    """
+
+    def __init__(self, path, schema):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in schema])
+
+    def write(self, rows):
+        self.writer.writerows(
+            [_format_value(value) for value in row] for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowWriter(object):
+    """
+    Write rows to an Arrow IPC file or Parquet file.
+
+    Every chunk of rows becomes one record batch or row group.
+    """
+
+    def __init__(self, path, schema, file_format='arrow'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise WxcastException(
+                'pyarrow is required for arrow and parquet export: '
+                'pip install wxcast[arrow].'
+            )
+
+        types = {
+            'string': pa.string(),
+            'int64': pa.int64(),
+            'float64': pa.float64(),
+            'bool': pa.bool_(),
+            'timestamp': pa.timestamp('ms', tz='UTC'),
+        }
+        self.pa = pa
+        self.schema = pa.schema(
+            [(name, types[column_type]) for name, column_type in schema]
+        )
+
+        if file_format == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        batch = self.pa.RecordBatch.from_arrays(
+            [
+                self.pa.array(column, type=field.type)
+                for column, field in zip(columns, self.schema)
+            ],
+            schema=self.schema
+        )
+        self.writer.write_table(self.pa.Table.from_batches([batch]))
+
+    def close(self):
+        self.writer.close()
+
+
+def get_format(path, file_format=None):
+    """
+    Return the export format for a path.
+
+    :param path: Output file path.
+    :param file_format: Explicit format (csv, arrow, parquet) or None
+        to use the file extension.
+    :return: The format name.
+    """
+    if file_format:
+        return file_format
+
+    extension = os.path.splitext(path)[1].lower()
+
+    try:
+        return FORMATS[extension]
+    except KeyError:
+        raise WxcastException(
+            f'Unknown export format for {path}, use one of: '
+            f'{", ".join(sorted(FORMATS))}.'
+        )
+
+
+def export_rows(rows,
+                path,
+                schema,
+                file_format=None,
+                chunksize=EXPORT_CHUNKSIZE):
+    """
+    Write rows to a CSV, Arrow IPC or Parquet file in chunks.
+
+    Rows are consumed chunksize at a time so only one chunk is held in
+    memory however many rows there are.
+
+    :param rows: Iterable of row tuples matching schema.
+    :param path: Output file path.
+    :param schema: Sequence of (column, type) tuples.
+    :param file_format: csv, arrow or parquet, from the extension if None.
+    :param chunksize: Number of rows per chunk.
+    :return: Number of rows written.
+    """
+    file_format = get_format(path, file_format)
+
+    if file_format == 'csv':
+        writer = CsvWriter(path, schema)
+    else:
+        writer = ArrowWriter(path, schema, file_format)
+
+    count = 0
+    rows = iter(rows)
+
+    try:
+        for chunk in iter(lambda: list(islice(rows, chunksize)), []):
+            writer.write(chunk)
+            count += len(chunk)
+    finally:
+        writer.close()
+
+    return count
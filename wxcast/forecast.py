@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import sys
+
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+NAN = float('nan')
+SPEED = re.compile(r'\d+')
+
+
+def parse_time(value):
+    """
+    Parse an NWS timestamp (2021-03-03T14:00:00-07:00).
+
+    :param value: The timestamp string.
+    :return: Tuple of (epoch seconds, utc offset seconds).
+    """
+    # Python 3.6 strptime does not accept a colon in the offset.
+    if value[-3] == ':':
+        value = value[:-3] + value[-2:]
+
+    moment = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z')
+    return int(moment.timestamp()), int(moment.utcoffset().total_seconds())
+
+
+def _number(value):
+    """Return value as a float with NaN for missing values."""
+    return NAN if value is None else float(value)
+
+
+class HourlyForecast(object):
+    """
+    Columnar hourly forecast.
+
+    Every column holds one entry per hour. Times and numbers are kept in
+    typed arrays with NaN for missing values and repeated strings, like
+    the wind direction, are shared between hours.
+    """
+
+    __slots__ = (
+        'start_time',
+        'utc_offset',
+        'temperature',
+        'temperature_unit',
+        'wind_speed',
+        'wind_speed_unit',
+        'wind_direction',
+        'short_forecast',
+    )
+
+    COLUMNS = (
+        'start_time',
+        'temperature',
+        'wind_speed',
+        'wind_direction',
+        'short_forecast',
+    )
+
+    def __init__(self, temperature_unit='F', wind_speed_unit='mph'):
+        self.start_time = array('q')
+        self.utc_offset = array('i')
+        self.temperature = array('f')
+        self.temperature_unit = temperature_unit
+        self.wind_speed = array('f')
+        self.wind_speed_unit = wind_speed_unit
+        self.wind_direction = []
+        self.short_forecast = []
+
+    def __len__(self):
+        return len(self.start_time)
+
+    def __repr__(self):
+        return f'HourlyForecast(hours={len(self)})'
+
+    @classmethod
+    def from_periods(cls, periods):
+        """
+        Create an hourly forecast from NWS forecast periods.
+
+        :param periods: List of period dictionaries from the
+            /gridpoints/{wfo}/{x},{y}/forecast/hourly endpoint.
+        :return: HourlyForecast instance.
+        """
+        forecast = cls()
+
+        if periods:
+            first = periods[0]
+            forecast.temperature_unit = first.get('temperatureUnit') or 'F'
+            speed = (first.get('windSpeed') or '').split()
+            forecast.wind_speed_unit = speed[-1] if speed else 'mph'
+
+        for period in periods:
+            forecast.append(period)
+
+        return forecast
+
+    def append(self, period):
+        """
+        Append an NWS forecast period.
+
+        :param period: Period dictionary with startTime, temperature,
+            windSpeed, windDirection and shortForecast.
+        """
+        start, offset = parse_time(period['startTime'])
+        # Only the upper bound of ranges like "5 to 10 mph" is kept.
+        speeds = SPEED.findall(period.get('windSpeed') or '')
+        temperature = period.get('temperature')
+
+        if isinstance(temperature, dict):
+            # Newer api versions return {"unitCode": ..., "value": ...}.
+            temperature = temperature.get('value')
+
+        self.start_time.append(start)
+        self.utc_offset.append(offset)
+        self.temperature.append(_number(temperature))
+        self.wind_speed.append(float(speeds[-1]) if speeds else NAN)
+        self.wind_direction.append(
+            sys.intern(period.get('windDirection') or '')
+        )
+        self.short_forecast.append(
+            sys.intern(period.get('shortForecast') or '')
+        )
+
+    def local_time(self, index):
+        """
+        Return the start of an hour in the forecast location time zone.
+
+        :param index: Position of the hour.
+        :return: Timezone aware datetime.
+        """
+        return datetime.fromtimestamp(
+            self.start_time[index],
+            timezone(timedelta(seconds=self.utc_offset[index]))
+        )
+
+    def rows(self):
+        """
+        Iterate over the forecast one hour at a time.
+
+        :return: Generator of (local time, temperature, wind speed,
+            wind direction, short forecast) tuples.
+        """
+        for index in range(len(self)):
+            yield (
+                self.local_time(index),
+                self.temperature[index],
+                self.wind_speed[index],
+                self.wind_direction[index],
+                self.short_forecast[index]
+            )
+
+    def to_records(self):
+        """
+        Iterate over the forecast as one dictionary per hour.
+
+        :return: Generator of OrderedDicts, times are timezone aware
+            datetimes and missing numbers are None.
+        """
+        for start, temperature, speed, direction, short_forecast in \
+                self.rows():
+            yield OrderedDict([
+                ('start_time', start),
+                (
+                    'temperature',
+                    None if temperature != temperature else temperature
+                ),
+                ('temperature_unit', self.temperature_unit),
+                ('wind_speed', None if speed != speed else speed),
+                ('wind_speed_unit', self.wind_speed_unit),
+                ('wind_direction', direction or None),
+                ('short_forecast', short_forecast)
+            ])
+
+    def to_dict(self):
+        """
+        Return the columns as lists.
+
+        :return: OrderedDict of {column: list}, start times as epoch
+            seconds.
+        """
+        return OrderedDict(
+            (name, list(getattr(self, name))) for name in self.COLUMNS
+        )
+
+    def to_pandas(self):
+        """
+        Convert the forecast to a pandas DataFrame.
+
+        Start times are UTC, repeated strings are categoricals.
+        Requires pandas.
+
+        :return: pandas.DataFrame with one row per hour.
+        """
+        import numpy as np
+        import pandas as pd
+
+        return pd.DataFrame(
+            OrderedDict([
+                (
+                    'start_time',
+                    pd.to_datetime(
+                        np.frombuffer(self.start_time, dtype=np.int64),
+                        unit='s',
+                        utc=True
+                    )
+                ),
+                (
+                    'temperature',
+                    np.frombuffer(self.temperature, dtype=np.float32)
+                ),
+                (
+                    'wind_speed',
+                    np.frombuffer(self.wind_speed, dtype=np.float32)
+                ),
+                ('wind_direction', pd.Categorical(self.wind_direction)),
+                ('short_forecast', pd.Categorical(self.short_forecast)),
+            ])
+        )
+
+    def to_arrow(self):
+        """
+        Convert the forecast to an Arrow table.
+
+        Numeric columns are copied in one block each, so the forecast
+        can still be appended to, and repeated strings are dictionary
+        encoded. Requires pyarrow.
+
+        :return: pyarrow.Table with one row per hour.
+        """
+        import pyarrow as pa
+
+        def column(data, data_type):
+            return pa.Array.from_buffers(
+                data_type,
+                len(data),
+                # A copy, a shared buffer would lock the array size.
+                [None, pa.py_buffer(bytes(data))]
+            )
+
+        return pa.table(
+            OrderedDict([
+                (
+                    'start_time',
+                    column(self.start_time, pa.timestamp('s', tz='UTC'))
+                ),
+                ('temperature', column(self.temperature, pa.float32())),
+                ('wind_speed', column(self.wind_speed, pa.float32())),
+                (
+                    'wind_direction',
+                    pa.array(self.wind_direction).dictionary_encode()
+                ),
+                (
+                    'short_forecast',
+                    pa.array(self.short_forecast).dictionary_encode()
+                ),
+            ])
+        )
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import time
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from wxcast import api
+from wxcast.cache import MemoryCache
+from wxcast.constants import SERVE_STATIC_TTL, SERVE_TTL
+from wxcast.exceptions import WxcastException, WxcastNotFound
+from wxcast.render import dumps
+from wxcast.singleflight import SingleFlight
+
+logger = logging.getLogger('wxcast')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+class BadRequest(Exception):
+    """
+    Raised for invalid request parameters.
+    """
+
+
+def _flag(query, name):
+    return query.get(name, '').lower() in TRUE_VALUES
+
+
+def _temp_unit(query):
+    unit = query.get('temp_unit', 'C').upper()
+
+    if unit not in ('C', 'F'):
+        raise BadRequest('temp_unit must be C or F.')
+
+    return unit
+
+
+def _metar(query, station_id):
+    return api.get_metar(
+        station_id, _temp_unit(query), decoded=_flag(query, 'decoded')
+    )
+
+
+def _conditions(query, station_id):
+    return api.metar_conditions(
+        api.get_metar(station_id, _temp_unit(query), decoded=True)
+    )
+
+
+def _forecast(query):
+    location = query.get('location')
+
+    if not location:
+        raise BadRequest('location is required.')
+
+    if _flag(query, 'hourly'):
+        return list(api.get_hourly_forecast(location).to_records())
+
+    from wxcast.export import FORECAST_SCHEMA, forecast_rows
+
+    columns = [column for column, _ in FORECAST_SCHEMA]
+    return [
+        OrderedDict(zip(columns, row))
+        for row in forecast_rows(
+            location, api.get_seven_day_forecast(location)
+        )
+    ]
+
+
+def _text(query, wfo, product):
+    return OrderedDict([
+        ('wfo', wfo.upper()),
+        ('product', product.upper()),
+        ('text', api.get_nws_product(wfo, product))
+    ])
+
+
+# (path segments, handler, static) where None matches any one segment
+# and the matched segments are passed to the handler after the query.
+# Static routes serve office and station metadata that rarely changes.
+ROUTES = (
+    (('metar', None), _metar, False),
+    (('conditions', None), _conditions, False),
+    (('forecast',), _forecast, False),
+    (('text', None, None), _text, False),
+    (('offices',), lambda query: api.get_wfo_list(), True),
+    (
+        ('offices', None),
+        lambda query, wfo: api.get_wfo_info(wfo),
+        True
+    ),
+    (
+        ('offices', None, 'products'),
+        lambda query, wfo: api.get_wfo_products(wfo),
+        True
+    ),
+    (
+        ('offices', None, 'stations'),
+        lambda query, wfo: api.get_stations_for_wfo(wfo),
+        True
+    ),
+    (
+        ('stations', None),
+        lambda query, station_id: api.get_station_info(station_id),
+        True
+    ),
+)
+
+
+def is_transport_error(error):
+    """
+    Return True if error was caused by a connection failure or timeout.
+
+    :param error: The exception raised by a wxcast.api function.
+    :return: Boolean.
+    """
+    from requests.exceptions import ConnectionError, Timeout
+
+    while error is not None:
+        if isinstance(error, (ConnectionError, Timeout)):
+            return True
+
+        error = error.__cause__ or error.__context__
+
+    return False
+
+
+def match_route(segments):
+    """
+    Find the route for the given path segments.
+
+    :param segments: List of path segments.
+    :return: Tuple of (handler, args, static) or None if no route matches.
+    """
+    for pattern, handler, static in ROUTES:
+        if len(pattern) != len(segments):
+            continue
+
+        args = []
+        for part, segment in zip(pattern, segments):
+            if part is None:
+                args.append(segment)
+            elif part != segment.lower():
+                break
+        else:
+            return handler, args, static
+
+    return None
+
+
+class Gateway(object):
+    """
+    Serve wxcast.api results as JSON from a shared in memory cache.
+
+    Responses are cached for ttl seconds, office and station metadata
+    for static_ttl seconds. Concurrent requests for the same resource
+    share a single upstream fetch.
+    """
+
+    def __init__(self, ttl=SERVE_TTL, static_ttl=SERVE_STATIC_TTL,
+                 cache=None):
+        self.ttl = ttl
+        self.static_ttl = static_ttl
+        self.cache = MemoryCache() if cache is None else cache
+        self._flight = SingleFlight()
+
+    def _fetch(self, key, handler, query, args, ttl):
+        try:
+            status, value = 200, handler(query, *args)
+        except BadRequest as error:
+            return 400, dumps({'error': str(error)}).encode('utf-8'), 0
+        except WxcastNotFound as error:
+            # Cache unknown ids briefly so they do not hammer the api.
+            status, value = 404, {'error': str(error)}
+            ttl = min(ttl, self.ttl)
+        except WxcastException as error:
+            # Upstream failures are retried by the next request.
+            status = 503 if is_transport_error(error) else 502
+            return status, dumps({'error': str(error)}).encode('utf-8'), 0
+
+        body = dumps(value).encode('utf-8')
+
+        if ttl > 0:
+            self.cache.set(key, (time.time() + ttl, status, body), ttl)
+
+        return status, body, ttl
+
+    def stats(self):
+        """
+        Return cache, coalescing and upstream counters.
+
+        :return: Dictionary of counters.
+        """
+        from wxcast.session import get_coalesce_stats, get_rate_stats
+
+        return OrderedDict([
+            ('cache', OrderedDict([
+                ('entries', len(self.cache)),
+                ('hits', self.cache.hits),
+                ('misses', self.cache.misses)
+            ])),
+            ('coalesced', self._flight.stats()),
+            ('upstream', get_coalesce_stats()),
+            ('rate', get_rate_stats())
+        ])
+
+    def handle(self, target):
+        """
+        Handle a GET request.
+
+        :param target: The request target, path and query string.
+        :return: Tuple of (status, headers, body bytes).
+        """
+        parts = urlsplit(target)
+        segments = [
+            unquote(segment)
+            for segment in parts.path.split('/') if segment
+        ]
+        headers = OrderedDict([('Content-Type', 'application/json')])
+
+        if [segment.lower() for segment in segments] == ['stats']:
+            headers['Cache-Control'] = 'no-store'
+            return 200, headers, dumps(self.stats()).encode('utf-8')
+
+        route = match_route(segments)
+
+        if route is None:
+            body = dumps({'error': f'Not found: {parts.path}'})
+            return 404, headers, body.encode('utf-8')
+
+        handler, args, static = route
+        query = dict(parse_qsl(parts.query))
+        key = '/'.join(segment.lower() for segment in segments)
+
+        if query:
+            key += '?' + '&'.join(
+                f'{name}={value.lower()}'
+                for name, value in sorted(query.items())
+            )
+
+        entry = self.cache.get(key)
+
+        if entry:
+            expires, status, body = entry
+            headers['X-Cache'] = 'HIT'
+            max_age = max(int(expires - time.time()), 0)
+        else:
+            status, body, max_age = self._flight.do(
+                key, self._fetch, key, handler, query, args,
+                self.static_ttl if static else self.ttl
+            )
+            headers['X-Cache'] = 'MISS'
+
+        if max_age:
+            headers['Cache-Control'] = f'max-age={max_age}'
+        else:
+            headers['Cache-Control'] = 'no-store'
+
+        return status, headers, body
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """
+    HTTP request handler that answers from server.gateway.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'wxcast'
+
+    def do_GET(self):
+        try:
+            status, headers, body = self.server.gateway.handle(self.path)
+        except Exception as error:
+            logger.exception('Gateway request failed: %s', self.path)
+            status = 500
+            headers = {'Content-Type': 'application/json'}
+            body = dumps({'error': str(error)}).encode('utf-8')
+
+        self.send_response(status)
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class GatewayServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server for a Gateway.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, gateway=None):
+        HTTPServer.__init__(self, address, GatewayHandler)
+        self.gateway = Gateway() if gateway is None else gateway
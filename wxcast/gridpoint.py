@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+
+import numpy as np
+
+from collections import OrderedDict
+
+from wxcast.exceptions import WxcastException
+
+DURATION = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$')
+
+
+def duration_hours(duration):
+    """
+    Convert an ISO-8601 duration (P1DT6H) to a number of hours.
+
+    Minutes are rounded up to the next hour.
+
+    :param duration: The duration string.
+    :return: Number of hours as an integer.
+    """
+    match = DURATION.match(duration)
+
+    if not match or duration in ('P', 'PT'):
+        raise WxcastException(f'Invalid ISO-8601 duration: {duration}.')
+
+    days, hours, minutes = (int(value or 0) for value in match.groups())
+    return days * 24 + hours + -(-minutes // 60)
+
+
+def parse_valid_times(valid_times):
+    """
+    Split ISO-8601 intervals (start/duration) into starts and lengths.
+
+    The starts are parsed as an array and only the distinct durations,
+    usually a handful per gridpoint, are parsed individually.
+
+    :param valid_times: Sequence of UTC interval strings.
+    :return: Tuple of (datetime64[h] starts, int64 hours) arrays.
+    """
+    parts = np.char.partition(np.asarray(valid_times, dtype=str), '/')
+    starts, durations = parts[:, 0], parts[:, 2]
+
+    if not np.char.endswith(starts, '+00:00').all():
+        raise WxcastException('Gridpoint valid times must be in UTC.')
+
+    # Drop the UTC offset, numpy datetimes are timezone naive.
+    starts = starts.astype('U19').astype('datetime64[s]')
+    unique, inverse = np.unique(durations, return_inverse=True)
+    hours = np.array(
+        [duration_hours(duration) for duration in unique],
+        dtype=np.int64
+    )
+
+    return starts.astype('datetime64[h]'), hours[inverse.ravel()]
+
+
+def expand_layer(layer, start, size):
+    """
+    Expand the values of a layer onto an hourly axis.
+
+    Every value is repeated for each hour of its validTime interval.
+    Hours without a value are NaN.
+
+    :param layer: Gridpoint layer dictionary with a values list.
+    :param start: First hour of the axis as datetime64[h].
+    :param size: Number of hours on the axis.
+    :return: Array of floats with one value per hour.
+    """
+    result = np.full(size, np.nan)
+    values = layer['values']
+
+    if not values:
+        return result
+
+    starts, hours = parse_valid_times(
+        [value['validTime'] for value in values]
+    )
+    data = np.array([value['value'] for value in values], dtype=float)
+
+    # Axis position of every expanded hour: the offset of the interval
+    # start plus the position of the hour within its interval.
+    first = np.repeat(np.cumsum(hours) - hours, hours)
+    index = (
+        np.repeat((starts - start).astype(np.int64), hours) +
+        np.arange(first.size) - first
+    )
+    samples = np.repeat(data, hours)
+    inside = (index >= 0) & (index < size)
+    result[index[inside]] = samples[inside]
+
+    return result
+
+
+def expand_gridpoint(properties, layers=None):
+    """
+    Expand gridpoint layers onto the hourly axis of the gridpoint.
+
+    :param properties: The properties of a /gridpoints/{wfo}/{x},{y}
+        response.
+    :param layers: Names of the layers to expand, all numeric layers
+        if None.
+    :return: Dictionary with the hourly time array, layer arrays and
+        layer units.
+    """
+    starts, hours = parse_valid_times([properties['validTimes']])
+    start, size = starts[0], int(hours[0])
+
+    if layers is None:
+        layers = [
+            name for name, layer in properties.items()
+            if isinstance(layer, dict) and 'uom' in layer and 'values' in layer
+        ]
+
+    data = OrderedDict()
+    units = OrderedDict()
+
+    for name in layers:
+        layer = properties.get(name)
+
+        if not isinstance(layer, dict) or 'values' not in layer:
+            raise WxcastException(f'Gridpoint layer not found: {name}.')
+
+        try:
+            data[name] = expand_layer(layer, start, size)
+        except (TypeError, ValueError):
+            raise WxcastException(f'Gridpoint layer is not numeric: {name}.')
+
+        units[name] = layer.get('uom')
+
+    return {
+        'time': start + np.arange(size),
+        'layers': data,
+        'units': units
+    }
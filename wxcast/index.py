@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from wxcast.cache import get_cache_dir
+from wxcast.constants import INDEX_MAX_AGE, INDEX_MAX_FAILURES, MAX_WORKERS
+from wxcast.exceptions import WxcastException, WxcastNotFound
+
+logger = logging.getLogger('wxcast')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)',
+    'CREATE TABLE IF NOT EXISTS offices ('
+    'code TEXT PRIMARY KEY, name TEXT, full_name TEXT, telephone TEXT, '
+    'fax TEXT, email TEXT, address TEXT, position INTEGER)',
+    'CREATE TABLE IF NOT EXISTS office_stations ('
+    'wfo TEXT, station TEXT, position INTEGER)',
+    'CREATE TABLE IF NOT EXISTS stations ('
+    'id TEXT PRIMARY KEY, name TEXT, time_zone TEXT, elevation REAL)',
+    'CREATE TABLE IF NOT EXISTS products ('
+    'wfo TEXT, code TEXT, name TEXT, position INTEGER)',
+    'CREATE INDEX IF NOT EXISTS office_stations_wfo '
+    'ON office_stations (wfo)',
+    'CREATE INDEX IF NOT EXISTS products_wfo ON products (wfo)',
+)
+
+
+def _fetch_office(code):
+    """
+    Retrieve info, stations and products for a WFO.
+
+    Not every location in the WFO list is an office with info and
+    stations so not found errors are ignored, any other error marks
+    the office as failed.
+    """
+    from wxcast import api
+
+    results = []
+    failed = False
+
+    for func in (
+        api.get_wfo_info,
+        api.get_stations_for_wfo,
+        api.get_wfo_products
+    ):
+        try:
+            results.append(func(code))
+        except WxcastNotFound:
+            results.append(None)
+        except WxcastException:
+            results.append(None)
+            failed = True
+
+    return (code, *results, failed)
+
+
+def _fetch_station(station_id):
+    """
+    Retrieve info for a station, None if not found or failed.
+    """
+    from wxcast import api
+
+    try:
+        return station_id, api.get_station_info(station_id), False
+    except WxcastNotFound:
+        return station_id, None, False
+    except WxcastException:
+        return station_id, None, True
+
+
+class StationIndex(object):
+    """
+    Local sqlite index of WFOs, their stations and text products.
+
+    The index is built with refresh and is considered stale once it is
+    older than max_age seconds. Lookups return None for unknown keys
+    so callers can fall back to the NWS api.
+    """
+
+    def __init__(self, path=None, max_age=INDEX_MAX_AGE):
+        if not path:
+            path = os.path.join(get_cache_dir(), 'index.sqlite')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+        self._db.commit()
+
+    def _query(self, sql, *args):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    @property
+    def refreshed(self):
+        """
+        Timestamp of the last refresh or None if never built.
+        """
+        rows = self._query(
+            "SELECT value FROM meta WHERE key = 'refreshed'"
+        )
+        return float(rows[0][0]) if rows else None
+
+    def age(self):
+        """
+        Return the age of the index in seconds or None if never built.
+        """
+        refreshed = self.refreshed
+        return time.time() - refreshed if refreshed else None
+
+    def is_fresh(self):
+        """
+        Return True if the index exists and is younger than max_age.
+        """
+        age = self.age()
+        return age is not None and age < self.max_age
+
+    def counts(self):
+        """
+        Return the number of indexed offices, stations and products.
+        """
+        return OrderedDict(
+            (table, self._query(f'SELECT COUNT(*) FROM {table}')[0][0])
+            for table in ('offices', 'stations', 'products')
+        )
+
+    def refresh(self, max_workers=MAX_WORKERS,
+                max_failures=INDEX_MAX_FAILURES):
+        """
+        Rebuild the index from the NWS api using concurrent requests.
+
+        If more than max_failures of the office or station requests
+        fail the previous index is kept and not marked as refreshed.
+
+        :param max_workers: Max number of concurrent requests.
+        :param max_failures: Max share of failed offices or stations.
+        :return: Dictionary with the number of indexed records, failed
+            offices and stations and whether the index was updated.
+        """
+        from wxcast import api
+
+        wfo_list = api.get_wfo_list()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            offices = list(executor.map(_fetch_office, wfo_list))
+
+            station_ids = OrderedDict()
+            for _, _, office_stations, _, _ in offices:
+                for station in office_stations or []:
+                    station_ids[station] = None
+
+            stations = list(executor.map(_fetch_station, station_ids))
+
+        failed_offices = sum(office[-1] for office in offices)
+        failed_stations = sum(station[-1] for station in stations)
+        updated = (
+            failed_offices <= max_failures * len(offices)
+            and failed_stations <= max_failures * len(stations)
+        )
+
+        if updated:
+            self._replace(wfo_list, offices, stations)
+        else:
+            logger.warning(
+                'Index refresh failed for %d of %d offices and %d of %d '
+                'stations, keeping the previous index.',
+                failed_offices, len(offices),
+                failed_stations, len(stations)
+            )
+
+        summary = self.counts()
+        summary['failed offices'] = failed_offices
+        summary['failed stations'] = failed_stations
+        summary['updated'] = updated
+        return summary
+
+    def _replace(self, wfo_list, offices, stations):
+        """
+        Replace the indexed rows and mark the index as refreshed.
+        """
+        with self._lock:
+            with self._db:
+                for table in (
+                    'offices', 'office_stations', 'stations', 'products'
+                ):
+                    self._db.execute(f'DELETE FROM {table}')
+
+                for position, (code, info, office_stations, products, _) \
+                        in enumerate(offices):
+                    info = info or {}
+                    self._db.execute(
+                        'INSERT INTO offices VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (
+                            code.upper(), wfo_list[code], info.get('name'),
+                            info.get('telephone'), info.get('fax number'),
+                            info.get('email'), info.get('address'), position
+                        )
+                    )
+                    self._db.executemany(
+                        'INSERT INTO office_stations VALUES (?, ?, ?)',
+                        (
+                            (code.upper(), station, index)
+                            for index, station in
+                            enumerate(office_stations or [])
+                        )
+                    )
+                    self._db.executemany(
+                        'INSERT INTO products VALUES (?, ?, ?, ?)',
+                        (
+                            (code.upper(), product, name, index)
+                            for index, (product, name) in
+                            enumerate((products or {}).items())
+                        )
+                    )
+
+                self._db.executemany(
+                    'INSERT INTO stations VALUES (?, ?, ?, ?)',
+                    (
+                        (
+                            station_id.upper(), info['name'],
+                            info['time zone'], info['elevation']
+                        )
+                        for station_id, info, _ in stations if info
+                    )
+                )
+                self._db.execute(
+                    "REPLACE INTO meta VALUES ('refreshed', ?)",
+                    (str(time.time()),)
+                )
+
+    def get_wfo_list(self):
+        """
+        Return dictionary of wfo {code: name} or None if not indexed.
+        """
+        rows = self._query(
+            'SELECT code, name FROM offices ORDER BY position'
+        )
+        return OrderedDict(rows) if rows else None
+
+    def get_wfo_info(self, wfo):
+        """
+        Return info for the given WFO or None if not indexed.
+        """
+        rows = self._query(
+            'SELECT full_name, telephone, fax, email, address '
+            'FROM offices WHERE code = ? AND full_name IS NOT NULL',
+            wfo.upper()
+        )
+
+        if not rows:
+            return None
+
+        return dict(
+            zip(('name', 'telephone', 'fax number', 'email', 'address'),
+                rows[0])
+        )
+
+    def get_stations_for_wfo(self, wfo):
+        """
+        Return a list of stations for the WFO or None if not indexed.
+        """
+        rows = self._query(
+            'SELECT station FROM office_stations WHERE wfo = ? '
+            'ORDER BY position',
+            wfo.upper()
+        )
+        return [row[0] for row in rows] or None
+
+    def get_station_info(self, station_id):
+        """
+        Return info for the station or None if not indexed.
+        """
+        rows = self._query(
+            'SELECT name, time_zone, elevation FROM stations WHERE id = ?',
+            station_id.upper()
+        )
+
+        if not rows:
+            return None
+
+        return dict(zip(('name', 'time zone', 'elevation'), rows[0]))
+
+    def get_wfo_products(self, wfo):
+        """
+        Return dictionary of text products {code: name} or None.
+        """
+        rows = self._query(
+            'SELECT code, name FROM products WHERE wfo = ? '
+            'ORDER BY position',
+            wfo.upper()
+        )
+        return OrderedDict(rows) if rows else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import logging
+import os
+
+from wxcast.exceptions import WxcastException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger('wxcast')
+
+BACKENDS = {'json': json.loads}
+if orjson is not None:
+    BACKENDS['orjson'] = orjson.loads
+
+_backend = None
+_loads = None
+
+
+def get_backend():
+    """
+    Return the name of the JSON backend in use.
+    """
+    return _backend
+
+
+def set_backend(name=None):
+    """
+    Select the JSON backend used to parse NWS responses.
+
+    Without a name WXCAST_JSON is used if set, otherwise orjson when
+    installed and the standard library json module if not. Both return
+    plain dictionaries which keep the document key order.
+
+    An unknown WXCAST_JSON logs a warning and falls back to json, an
+    unknown name raises.
+
+    :param name: Backend name (json, orjson) or None for the default.
+    """
+    global _backend, _loads
+
+    if not name:
+        name = os.environ.get('WXCAST_JSON') or (
+            'orjson' if 'orjson' in BACKENDS else 'json'
+        )
+
+        if name not in BACKENDS:
+            logger.warning(
+                'WXCAST_JSON backend %s is not available, using json.', name
+            )
+            name = 'json'
+
+    try:
+        _loads = BACKENDS[name]
+    except KeyError:
+        raise WxcastException(
+            f'JSON backend {name} is not available, choose from: '
+            f'{", ".join(sorted(BACKENDS))}.'
+        )
+
+    _backend = name
+
+
+def loads(data):
+    """
+    Parse a JSON document with the selected backend.
+
+    :param data: JSON document as bytes or string.
+    :return: The parsed document.
+    """
+    return _loads(data)
+
+
+set_backend()
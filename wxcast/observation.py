@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+
+from metar import Datatypes
+
+TIME_FIELDS = ('time', 'peak_wind_time', 'wind_shift_time')
+
+
+def _value(datatype, units=None):
+    """Return the numeric value of a python-metar datatype or None."""
+    if datatype is None:
+        return None
+
+    return datatype.value(units) if units else datatype.value()
+
+
+class Observation(object):
+    """
+    Compact weather observation decoded from a METAR.
+
+    Values are stored as numbers in fixed units, see Observation.UNITS.
+    Display strings are only built when to_dict is called, except for
+    visibility and runway visual range which keep the reported text.
+    """
+
+    __slots__ = (
+        'station',
+        'report_type',
+        'time',
+        'elevation',
+        'temperature',
+        'dewpoint',
+        'wind_direction',
+        'wind_direction_from',
+        'wind_direction_to',
+        'wind_speed',
+        'wind_gust',
+        'peak_wind_direction',
+        'peak_wind_speed',
+        'peak_wind_time',
+        'wind_shift_time',
+        'visibility',
+        'visibility_text',
+        'visual_range',
+        'pressure',
+        'sea_level_pressure',
+        'max_temp_6hr',
+        'min_temp_6hr',
+        'max_temp_24hr',
+        'min_temp_24hr',
+        'precip_1hr',
+        'precip_3hr',
+        'precip_6hr',
+        'precip_24hr',
+        'ice_1hr',
+        'ice_3hr',
+        'ice_6hr',
+        'weather',
+        'sky',
+        'remarks',
+    )
+
+    UNITS = {
+        'elevation': 'M',
+        'temperature': 'C',
+        'dewpoint': 'C',
+        'wind_direction': 'DEG',
+        'wind_direction_from': 'DEG',
+        'wind_direction_to': 'DEG',
+        'wind_speed': 'KT',
+        'wind_gust': 'KT',
+        'peak_wind_direction': 'DEG',
+        'peak_wind_speed': 'KT',
+        'visibility': 'M',
+        'pressure': 'MB',
+        'sea_level_pressure': 'MB',
+        'max_temp_6hr': 'C',
+        'min_temp_6hr': 'C',
+        'max_temp_24hr': 'C',
+        'min_temp_24hr': 'C',
+        'precip_1hr': 'IN',
+        'precip_3hr': 'IN',
+        'precip_6hr': 'IN',
+        'precip_24hr': 'IN',
+        'ice_1hr': 'IN',
+        'ice_3hr': 'IN',
+        'ice_6hr': 'IN',
+    }
+
+    def __init__(self, station, **kwargs):
+        self.station = station
+
+        for name in self.__slots__[1:]:
+            setattr(self, name, kwargs.pop(name, None))
+
+        if kwargs:
+            raise TypeError(
+                f'Unexpected observation fields: {", ".join(kwargs)}'
+            )
+
+    def __repr__(self):
+        return f'Observation({self.station!r}, time={self.time!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Observation):
+            return NotImplemented
+
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    @classmethod
+    def from_metar(cls, metar_obj, elevation=None):
+        """
+        Create an observation from a parsed METAR.
+
+        :param metar_obj: A Metar.Metar instance.
+        :param elevation: Station elevation in meters.
+        :return: Observation instance.
+        """
+        # Few distinct report types, share the strings between records.
+        report_type = None
+        if metar_obj.type:
+            report_type = sys.intern(metar_obj.report_type())
+
+        # Visibility text depends on the reported units, fractions and
+        # limits, keep it as reported. Few distinct values, share them.
+        visibility_text = None
+        if metar_obj.vis:
+            visibility_text = sys.intern(metar_obj.visibility())
+
+        remarks = metar_obj.remarks(', ') if metar_obj._remarks else ''
+        if metar_obj._unparsed_remarks:
+            remarks += ', '.join(metar_obj._unparsed_remarks)
+
+        return cls(
+            metar_obj.station_id,
+            report_type=report_type,
+            time=metar_obj.time,
+            elevation=elevation,
+            temperature=_value(metar_obj.temp, 'C'),
+            dewpoint=_value(metar_obj.dewpt, 'C'),
+            wind_direction=_value(metar_obj.wind_dir),
+            wind_direction_from=_value(metar_obj.wind_dir_from),
+            wind_direction_to=_value(metar_obj.wind_dir_to),
+            wind_speed=_value(metar_obj.wind_speed, 'KT'),
+            wind_gust=_value(metar_obj.wind_gust, 'KT'),
+            peak_wind_direction=_value(metar_obj.wind_dir_peak),
+            peak_wind_speed=_value(metar_obj.wind_speed_peak, 'KT'),
+            peak_wind_time=metar_obj.peak_wind_time,
+            wind_shift_time=metar_obj.wind_shift_time,
+            visibility=_value(metar_obj.vis, 'M'),
+            visibility_text=visibility_text,
+            visual_range=metar_obj.runway_visual_range() or None,
+            pressure=_value(metar_obj.press, 'MB'),
+            sea_level_pressure=_value(metar_obj.press_sea_level, 'MB'),
+            max_temp_6hr=_value(metar_obj.max_temp_6hr, 'C'),
+            min_temp_6hr=_value(metar_obj.min_temp_6hr, 'C'),
+            max_temp_24hr=_value(metar_obj.max_temp_24hr, 'C'),
+            min_temp_24hr=_value(metar_obj.min_temp_24hr, 'C'),
+            precip_1hr=_value(metar_obj.precip_1hr, 'IN'),
+            precip_3hr=_value(metar_obj.precip_3hr, 'IN'),
+            precip_6hr=_value(metar_obj.precip_6hr, 'IN'),
+            precip_24hr=_value(metar_obj.precip_24hr, 'IN'),
+            ice_1hr=_value(metar_obj.ice_accretion_1hr, 'IN'),
+            ice_3hr=_value(metar_obj.ice_accretion_3hr, 'IN'),
+            ice_6hr=_value(metar_obj.ice_accretion_6hr, 'IN'),
+            weather=metar_obj.present_weather() or None,
+            sky=metar_obj.sky_conditions(', ') or None,
+            remarks=remarks or None
+        )
+
+    def wind(self, speed_unit='KT'):
+        """
+        Return a textual description of the wind.
+        """
+        if self.wind_speed is None:
+            return None
+
+        if self.wind_speed == 0.0:
+            return 'calm'
+
+        speed = Datatypes.speed(self.wind_speed, 'KT').string(speed_unit)
+
+        if self.wind_direction is None:
+            text = f'variable at {speed}'
+        elif self.wind_direction_from is not None:
+            text = '{0} to {1} at {2}'.format(
+                Datatypes.direction(self.wind_direction_from).compass(),
+                Datatypes.direction(self.wind_direction_to).compass(),
+                speed
+            )
+        else:
+            text = '{0} at {1}'.format(
+                Datatypes.direction(self.wind_direction).compass(),
+                speed
+            )
+
+        if self.wind_gust:
+            text += ', gusting to {0}'.format(
+                Datatypes.speed(self.wind_gust, 'KT').string(speed_unit)
+            )
+
+        return text
+
+    def peak_wind(self, speed_unit='KT'):
+        """
+        Return a textual description of the peak wind.
+        """
+        if not self.peak_wind_speed:
+            return 'calm' if self.peak_wind_speed == 0.0 else None
+
+        text = Datatypes.speed(self.peak_wind_speed, 'KT').string(speed_unit)
+
+        if self.peak_wind_direction is not None:
+            text = '{0} at {1}'.format(
+                Datatypes.direction(self.peak_wind_direction).compass(),
+                text
+            )
+
+            if self.peak_wind_time is not None:
+                text += ' at ' + self.peak_wind_time.strftime('%H:%M')
+
+        return text
+
+    def to_dict(self,
+                temp_unit='C',
+                pressure_unit='MB',
+                speed_unit='KT',
+                distance_unit=None):
+        """
+        Format the observation for display.
+
+        Keys and strings are built from wxcast.api.METAR_FIELDS and match
+        the output of wxcast.api.metar_to_dict, with the station
+        elevation added when known.
+
+        :param temp_unit: Unit for temperature values (C, F).
+        :param pressure_unit: Unit for pressure values (MB, HPA, IN).
+        :param speed_unit: Unit for wind speed (KT, MPH, KMH, MPS).
+        :param distance_unit: Unit for visibility (SM, M), defaults to
+            the reported text.
+        :return: Dictionary of display strings.
+        """
+        from wxcast.api import metar_to_dict
+
+        data = metar_to_dict(
+            _MetarView(self, speed_unit, distance_unit),
+            temp_unit=temp_unit,
+            pressure_unit=pressure_unit
+        )
+
+        if self.elevation is not None:
+            data['elevation'] = self.elevation
+
+        return data
+
+    def to_record(self):
+        """
+        Return all fields as plain JSON serializable values.
+
+        Numbers are in the units of Observation.UNITS and times are
+        ISO-8601 strings in UTC.
+
+        :return: Dictionary with one key per field.
+        """
+        data = {}
+
+        for name in self.__slots__:
+            value = getattr(self, name)
+
+            if name in TIME_FIELDS and value is not None:
+                value = value.isoformat() + 'Z'
+
+            data[name] = value
+
+        return data
+
+
+class _MetarView(object):
+    """
+    Present an Observation with the attributes of a Metar.Metar.
+
+    Only what the formatters in wxcast.api.METAR_FIELDS use is provided,
+    values are wrapped in python-metar datatypes so the same fields are
+    present and formatted the same way.
+    """
+
+    def __init__(self, observation, speed_unit='KT', distance_unit=None):
+        def wrap(datatype, value, *units):
+            return None if value is None else datatype(value, *units)
+
+        self.observation = observation
+        self.speed_unit = speed_unit
+        self.distance_unit = distance_unit
+
+        self.station_id = observation.station
+        self.type = observation.report_type
+        self.time = observation.time
+        self.temp = wrap(Datatypes.temperature, observation.temperature, 'C')
+        self.dewpt = wrap(Datatypes.temperature, observation.dewpoint, 'C')
+        self.wind_speed = wrap(Datatypes.speed, observation.wind_speed, 'KT')
+        self.wind_speed_peak = wrap(
+            Datatypes.speed, observation.peak_wind_speed, 'KT'
+        )
+        self.wind_shift_time = observation.wind_shift_time
+        self.vis = wrap(Datatypes.distance, observation.visibility, 'M')
+        self.runway = observation.visual_range
+        self.press = wrap(Datatypes.pressure, observation.pressure, 'MB')
+        self.press_sea_level = wrap(
+            Datatypes.pressure, observation.sea_level_pressure, 'MB'
+        )
+        self.weather = observation.weather
+        self.sky = observation.sky
+        self._remarks = observation.remarks
+        # Already joined into the remarks by Observation.from_metar.
+        self._unparsed_remarks = ()
+
+        for name in (
+            'max_temp_6hr',
+            'min_temp_6hr',
+            'max_temp_24hr',
+            'min_temp_24hr'
+        ):
+            setattr(
+                self,
+                name,
+                wrap(Datatypes.temperature, getattr(observation, name), 'C')
+            )
+
+        for name, field in (
+            ('precip_1hr', 'precip_1hr'),
+            ('precip_3hr', 'precip_3hr'),
+            ('precip_6hr', 'precip_6hr'),
+            ('precip_24hr', 'precip_24hr'),
+            ('ice_accretion_1hr', 'ice_1hr'),
+            ('ice_accretion_3hr', 'ice_3hr'),
+            ('ice_accretion_6hr', 'ice_6hr'),
+        ):
+            setattr(
+                self,
+                name,
+                wrap(
+                    Datatypes.precipitation,
+                    getattr(observation, field),
+                    'IN'
+                )
+            )
+
+    def report_type(self):
+        return self.type
+
+    def wind(self):
+        return self.observation.wind(self.speed_unit)
+
+    def peak_wind(self):
+        return self.observation.peak_wind(self.speed_unit)
+
+    def wind_shift(self):
+        return self.wind_shift_time.strftime('%H:%M')
+
+    def visibility(self):
+        if self.distance_unit:
+            return self.vis.string(self.distance_unit)
+
+        return self.observation.visibility_text
+
+    def runway_visual_range(self):
+        return self.runway
+
+    def present_weather(self):
+        return self.weather
+
+    def sky_conditions(self, sep):
+        return self.sky
+
+    def remarks(self, sep):
+        return self._remarks
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import random
+import threading
+import time
+
+from wxcast.cache import parse_http_date
+from wxcast.constants import (
+    RATE_BURST,
+    RATE_LIMIT,
+    RETRY_BACKOFF,
+    RETRY_MAX_DELAY
+)
+
+
+def parse_retry_after(value):
+    """
+    Convert a Retry-After header to a number of seconds.
+
+    :param value: Delay in seconds or an HTTP date.
+    :return: Seconds to wait as float or None if missing or invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        timestamp = parse_http_date(value)
+
+    if timestamp is None:
+        return None
+
+    return max(timestamp - time.time(), 0.0)
+
+
+def backoff_delay(attempt, backoff=RETRY_BACKOFF, max_delay=RETRY_MAX_DELAY):
+    """
+    Exponential backoff delay with jitter for a retry attempt.
+
+    The delay is between half and all of backoff * 2 ** attempt so
+    clients that failed together do not retry together.
+
+    :param attempt: Number of the retry starting at 0.
+    :param backoff: Base delay in seconds.
+    :param max_delay: Upper bound of the delay in seconds.
+    :return: Seconds to wait as float.
+    """
+    delay = min(max_delay, backoff * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket allowing rate requests per second.
+
+    Up to burst requests can be made at once after an idle period.
+    Requests beyond that wait for their turn in arrival order.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the time to wait before using it.
+
+        :return: Seconds to wait as float.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst,
+                self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+
+            return max(
+                -self.tokens / self.rate,
+                self.paused_until - now,
+                0.0
+            )
+
+    def pause(self, seconds):
+        """
+        Hold all requests for the given number of seconds.
+
+        :param seconds: Time to pause as float.
+        """
+        with self._lock:
+            self.paused_until = max(
+                self.paused_until,
+                self.clock() + seconds
+            )
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limiter with one bucket per host.
+
+    Counts the requests that had to wait and the retries made so
+    callers can see how often the api was throttled.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, sleep=None):
+        self.rate = rate
+        self.burst = burst
+        self.sleep = sleep or time.sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(
+                    self.rate, self.burst
+                )
+
+            return bucket
+
+    def acquire(self, host):
+        """
+        Wait until a request to host is allowed.
+
+        :param host: The host name (and port) of the request.
+        :return: Seconds waited as float.
+        """
+        wait = self.reserve(host)
+
+        if wait:
+            self.sleep(wait)
+
+        return wait
+
+    def reserve(self, host):
+        """
+        Reserve a request to host without waiting.
+
+        Used by callers that wait on their own, such as coroutines.
+
+        :param host: The host name (and port) of the request.
+        :return: Seconds to wait before sending as float.
+        """
+        wait = self._bucket(host).reserve()
+
+        with self._lock:
+            self._stats['requests'] += 1
+
+            if wait:
+                self._stats['throttled'] += 1
+                self._stats['throttle_wait'] += wait
+
+        return wait
+
+    def pause(self, host, seconds):
+        """
+        Hold all requests to host, used when the api asks to slow down.
+
+        :param host: The host name (and port).
+        :param seconds: Time to pause as float.
+        """
+        self._bucket(host).pause(seconds)
+
+    def record_retry(self, status):
+        """
+        Count a retry caused by status (a code or the exception name).
+
+        :param status: Status code or error name of the failed attempt.
+        """
+        with self._lock:
+            self._stats['retries'] += 1
+            statuses = self._stats['retry_statuses']
+            statuses[status] = statuses.get(status, 0) + 1
+
+    def stats(self):
+        """
+        Return a copy of the throttle and retry counters.
+
+        :return: Dictionary with requests, throttled, throttle_wait,
+            retries and retry_statuses.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['retry_statuses'] = dict(stats['retry_statuses'])
+            return stats
+
+    def reset_stats(self):
+        """Reset the counters to zero."""
+        with self._lock:
+            self._stats = {
+                'requests': 0,
+                'throttled': 0,
+                'throttle_wait': 0.0,
+                'retries': 0,
+                'retry_statuses': {}
+            }
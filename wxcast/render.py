@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import click
+import json
+
+from datetime import date
+
+from wxcast import utils
+
+FORMATS = ('json', 'ndjson', 'table')
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(value, indent=None):
+    """
+    Serialize a value as JSON, dates as ISO-8601 strings.
+
+    :param value: JSON serializable value.
+    :param indent: Indent for pretty printing or None for one line.
+    :return: JSON string.
+    """
+    return json.dumps(
+        value,
+        default=_default,
+        ensure_ascii=False,
+        indent=indent,
+        separators=None if indent else (',', ':')
+    )
+
+
+def _cell(value):
+    if value is None:
+        return ''
+
+    if isinstance(value, (dict, list, tuple)):
+        return dumps(value)
+
+    return value
+
+
+class Renderer(object):
+    """
+    Buffered output of a command as styled text or as records.
+
+    Text is styled and wrapped as before. The json, ndjson and table
+    formats receive plain records instead and skip styling and
+    wrapping. Output is kept in a buffer and written with a single echo
+    on flush. Tables, and the json array of a command with many
+    results, need every record and are written on close.
+
+    The shape of json output is set by the command, not by the data:
+
+    * A single result (many=False) is one object. Its identifying
+      fields (station, wfo, ...) come first, followed by the values or
+      by an error field.
+    * A listing or a command with many targets (many=True) is one
+      array of such objects, empty when nothing was found. Errors are
+      objects in the array.
+
+    ndjson writes the same objects one per line. In watch mode every
+    change is a single result written as its own document.
+    """
+
+    def __init__(self, output_format=None, no_color=False, many=False):
+        """
+        :param output_format: json, ndjson, table or None for text.
+        :param no_color: If True do not style text output.
+        :param many: If True json output is an array of all records,
+            otherwise every record is written as its own object.
+        """
+        self.output_format = output_format
+        self.no_color = no_color
+        self.many = many
+        self._lines = []
+        self._records = []
+        self._fields = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def is_text(self):
+        return self.output_format is None
+
+    def echo(self, message='', fg=None):
+        """
+        Add a line of text output, ignored by the record formats.
+
+        :param message: String to add.
+        :param fg: Color of the line or None for no style.
+        """
+        if self.is_text:
+            self._lines.append(
+                utils.style_string(message, self.no_color, fg=fg)
+                if fg else message
+            )
+
+    def error(self, error, **fields):
+        """
+        Add an error as a red line or as a record with an error field.
+
+        :param error: The exception or message.
+        :param fields: Identifying fields for the record (station).
+        """
+        if self.is_text:
+            self.echo(str(error), fg='red')
+        else:
+            fields['error'] = str(error)
+            self._add(fields)
+
+    def record(self, record):
+        """
+        Add a record, ignored by text output.
+
+        :param record: Dictionary, or list of dictionaries.
+        """
+        if self.is_text:
+            return
+
+        if isinstance(record, list):
+            for item in record:
+                self._add(item)
+        else:
+            self._add(record)
+
+    def text(self, message, record, fg=None):
+        """
+        Add text output or its record.
+
+        :param message: String for text output.
+        :param record: Dictionary, or list of dictionaries, for the
+            record formats.
+        :param fg: Color of the text or None for no style.
+        """
+        if self.is_text:
+            self.echo(message, fg=fg)
+        else:
+            self.record(record)
+
+    def dict(self, data, record=None, **kwargs):
+        """
+        Add a dictionary pretty-print style or as a record.
+
+        Tables show a single record as field and value rows.
+
+        :param data: Dictionary for text output.
+        :param record: Dictionary, or list of dictionaries, for the
+            record formats. Default data.
+        :param kwargs: Keyword arguments for utils.format_dict.
+        """
+        if self.is_text:
+            self._lines.append(
+                utils.format_dict(data, self.no_color, **kwargs)
+            )
+        else:
+            self._fields = not self.many
+            self.record(data if record is None else record)
+
+    def mapping(self, data, columns):
+        """
+        Add a dictionary of names such as {code: name}.
+
+        The record formats have one record per item with the key and
+        value named by columns.
+
+        :param data: Dictionary of key values.
+        :param columns: Names of the key and value in a record.
+        """
+        if self.is_text:
+            self._lines.append(utils.format_dict(data, self.no_color))
+        else:
+            for key, value in data.items():
+                self._add({columns[0]: key, columns[1]: value})
+
+    def table(self, headers, rows, records=None):
+        """
+        Add a table or its rows as records.
+
+        :param headers: List of column titles.
+        :param rows: Iterable of row tuples for text output.
+        :param records: Iterable of dictionaries for the record formats,
+            default the rows keyed by headers.
+        """
+        if self.is_text:
+            self._lines.append(
+                utils.format_table(headers, rows, self.no_color)
+            )
+            return
+
+        if records is None:
+            records = (dict(zip(headers, row)) for row in rows)
+
+        for record in records:
+            self._add(record)
+
+    def _add(self, record):
+        if self.output_format == 'ndjson':
+            self._lines.append(dumps(record))
+        elif self.output_format == 'json' and not self.many:
+            self._lines.append(dumps(record, indent=2))
+        else:
+            self._records.append(record)
+
+    def flush(self):
+        """
+        Write the buffered lines with a single echo.
+        """
+        if self._lines:
+            click.echo('\n'.join(self._lines))
+            self._lines = []
+
+    def close(self):
+        """
+        Write the buffered output including tables and json arrays.
+        """
+        if self.output_format == 'json' and self.many:
+            self._lines.append(dumps(self._records, indent=2))
+        elif self.output_format == 'table' and self._records:
+            self._lines.append(self._format_table())
+
+        self._records = []
+        self.flush()
+
+    def _format_table(self):
+        if self._fields and len(self._records) == 1:
+            headers = ['field', 'value']
+            rows = list(self._records[0].items())
+        else:
+            headers = []
+            for record in self._records:
+                headers.extend(key for key in record if key not in headers)
+
+            rows = [
+                [record.get(header) for header in headers]
+                for record in self._records
+            ]
+
+        return utils.format_table(
+            headers,
+            ([_cell(value) for value in row] for row in rows),
+            no_color=True
+        )
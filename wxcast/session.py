@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import threading
+import time
+
+import requests
+
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from wxcast import jsonlib
+from wxcast.constants import (
+    HEADERS,
+    MAX_RETRIES,
+    NWS_API,
+    POOL_CONNECTIONS,
+    POOL_MAXSIZE,
+    RATE_BURST,
+    RATE_LIMIT,
+    RETRY_MAX_DELAY,
+    RETRY_STATUSES,
+    STREAM_CHUNKSIZE
+)
+from wxcast.ratelimit import RateLimiter, backoff_delay, parse_retry_after
+from wxcast.singleflight import SingleFlight
+
+logger = logging.getLogger('wxcast')
+
+_session = None
+_session_lock = threading.Lock()
+_flight = SingleFlight()
+
+
+class RetryAdapter(HTTPAdapter):
+    """
+    HTTP adapter that rate limits requests per host and retries them.
+
+    GET requests that fail to connect or return 429, 502, 503 or 504
+    are retried with jittered exponential backoff. A Retry-After header
+    sets the minimum delay and pauses every request to the host
+    meanwhile.
+    """
+
+    def __init__(self, limiter=None, retries=MAX_RETRIES, sleep=None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.retries = retries
+        self.sleep = sleep or time.sleep
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        retries = self.retries if request.method in ('GET', 'HEAD') else 0
+        attempt = 0
+
+        while True:
+            if self.limiter:
+                self.limiter.acquire(host)
+
+            try:
+                response = super().send(request, **kwargs)
+            except requests.exceptions.ConnectionError as error:
+                if attempt >= retries:
+                    raise
+
+                status = type(error).__name__
+                delay = backoff_delay(attempt)
+            else:
+                status = response.status_code
+
+                if status not in RETRY_STATUSES or attempt >= retries:
+                    return response
+
+                retry_after = parse_retry_after(
+                    response.headers.get('Retry-After')
+                )
+
+                if retry_after and retry_after > RETRY_MAX_DELAY:
+                    # Waiting that long is worse than failing.
+                    return response
+
+                delay = max(retry_after or 0, backoff_delay(attempt))
+                response.close()
+
+                if self.limiter and (retry_after or status == 429):
+                    self.limiter.pause(host, delay)
+
+            if self.limiter:
+                self.limiter.record_retry(status)
+
+            attempt += 1
+            logger.debug(
+                'Retry %d for %s after %s in %.2fs',
+                attempt, request.url, status, delay
+            )
+            self.sleep(delay)
+
+
+class CacheAdapter(RetryAdapter):
+    """
+    HTTP adapter that serves GET requests from a response cache.
+
+    Fresh entries are returned without a request. Stale entries are
+    revalidated with If-None-Match/If-Modified-Since and a 304 response
+    refreshes the stored entry.
+    """
+
+    def __init__(self, cache, refresh=False, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.refresh = refresh
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry and not self.refresh and entry.is_fresh():
+            return self.build_cached_response(request, entry)
+
+        if entry:
+            request.headers.update(entry.validators())
+
+        response = super().send(request, **kwargs)
+
+        if entry and response.status_code == 304:
+            response.close()
+            entry = self.cache.refresh(entry, response.headers)
+            return self.build_cached_response(request, entry)
+
+        self.cache.set(
+            request.url,
+            response.status_code,
+            response.headers,
+            response.content
+        )
+        return response
+
+    def build_cached_response(self, request, entry):
+        """
+        Build a requests response from a cache entry.
+
+        :param request: The prepared request.
+        :param entry: The CacheEntry to serve.
+        :return: A requests response with from_cache set to True.
+        """
+        response = requests.Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = entry.body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+
+def create_session(pool_connections=POOL_CONNECTIONS,
+                   pool_maxsize=POOL_MAXSIZE,
+                   keep_alive=True,
+                   cache=None,
+                   refresh=False,
+                   rate_limit=RATE_LIMIT,
+                   burst=RATE_BURST,
+                   retries=MAX_RETRIES):
+    """
+    Create a pooled requests session for the NWS api.
+
+    :param pool_connections: Number of host pools to cache.
+    :param pool_maxsize: Max number of connections kept alive per host.
+    :param keep_alive: If False connections are closed after each request.
+    :param cache: A ResponseCache to serve and store GET responses.
+    :param refresh: If True always revalidate cached responses.
+    :param rate_limit: Max requests per second per host, None or 0
+        disables rate limiting.
+    :param burst: Max requests per host sent at once after idling.
+    :param retries: Max retries for failed or throttled GET requests.
+    :return: A requests session with the wxcast headers.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    kwargs = {
+        'limiter': RateLimiter(rate_limit, burst) if rate_limit else None,
+        'retries': retries,
+        'pool_connections': pool_connections,
+        'pool_maxsize': pool_maxsize
+    }
+
+    if cache is not None:
+        adapter = CacheAdapter(cache, refresh=refresh, **kwargs)
+    else:
+        adapter = RetryAdapter(**kwargs)
+
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def get_session():
+    """
+    Return the shared session, creating it on first use.
+
+    :return: The module level requests session.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+
+    return _session
+
+
+def set_session(session):
+    """
+    Replace the shared session used by all api functions.
+
+    The caller owns the given session. Passing None resets the
+    shared session and a new default session is created on next use.
+
+    :param session: A requests session (or compatible object) or None.
+    """
+    global _session
+
+    with _session_lock:
+        _session = session
+
+
+def get_json(url):
+    """
+    GET url with the shared session and parse the JSON body.
+
+    The body is parsed with the backend selected in wxcast.jsonlib.
+    Identical concurrent requests are merged into one network call and
+    all callers share the parsed result, which must not be modified.
+
+    :param url: The url to request.
+    :return: Tuple of (status code, parsed body). The body is None for
+        error responses that are not JSON.
+    """
+    def fetch():
+        response = get_session().get(url)
+
+        try:
+            return response.status_code, jsonlib.loads(response.content)
+        except ValueError:
+            if response.ok:
+                raise
+
+            return response.status_code, None
+
+    return _flight.do(url, fetch)
+
+
+class _StreamReader(object):
+    """
+    File like reader over a streamed response.
+    """
+
+    def __init__(self, response):
+        self._chunks = response.iter_content(STREAM_CHUNKSIZE)
+        self._buffer = b''
+        self.complete = False
+
+    def read(self, size=-1):
+        while not self.complete and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.complete = True
+            else:
+                self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _select(data, path):
+    """
+    Yield the values at an ijson style path in a parsed document.
+    """
+    if not path:
+        yield data
+        return
+
+    key, rest = path[0], path[1:]
+
+    if key == 'item':
+        values = data if isinstance(data, list) else ()
+    elif isinstance(data, dict) and key in data:
+        values = (data[key],)
+    else:
+        values = ()
+
+    for value in values:
+        yield from _select(value, rest)
+
+
+def _is_cached(url):
+    """
+    Return True if requests for url go through a response cache.
+
+    Sessions without adapters, such as plain objects with a get method,
+    are treated as not cached.
+    """
+    get_adapter = getattr(get_session(), 'get_adapter', None)
+
+    if get_adapter is None:
+        return False
+
+    return getattr(get_adapter(url), 'cache', None) is not None
+
+
+def iter_json(url, prefix):
+    """
+    GET url and yield only the values at prefix of the JSON body.
+
+    When the session has a response cache the body is read with
+    get_json, so it is cached, revalidated and coalesced like any other
+    request. Without a cache and with ijson installed the body is
+    parsed incrementally as it is read from the socket, so values are
+    available before the download completes and a consumer that stops
+    early skips the rest of the body.
+
+    Streamed requests are not coalesced, so only use this for urls that
+    are not also fetched with get_json.
+
+    :param url: The url to request.
+    :param prefix: ijson style path of the values such as @graph.item.
+    :return: Tuple of (status code, generator of values).
+    """
+    path = prefix.split('.') if prefix else []
+
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None or _is_cached(url):
+        status, data = get_json(url)
+        return status, _select(data, path)
+
+    response = get_session().get(url, stream=True)
+
+    if response.status_code != 200:
+        try:
+            data = jsonlib.loads(response.content)
+        except ValueError:
+            data = None
+
+        return response.status_code, _select(data, path)
+
+    def values():
+        reader = _StreamReader(response)
+
+        try:
+            yield from ijson.items(reader, prefix, use_float=True)
+        finally:
+            response.close()
+
+    return response.status_code, values()
+
+
+def get_coalesce_stats():
+    """
+    Return counters for requests made and requests coalesced.
+
+    :return: Dictionary with calls and coalesced counts.
+    """
+    return _flight.stats()
+
+
+def get_rate_limiter():
+    """
+    Return the rate limiter of the shared session.
+
+    The aio functions use it too, so both share one budget per host.
+
+    :return: A RateLimiter or None if the session is not rate limited.
+    """
+    try:
+        return get_session().get_adapter(NWS_API).limiter
+    except AttributeError:
+        return None
+
+
+def get_rate_stats():
+    """
+    Return throttle and retry counters of the shared session.
+
+    :return: Dictionary with requests, throttled, throttle_wait,
+        retries and retry_statuses, empty if the session is not rate
+        limited.
+    """
+    limiter = get_rate_limiter()
+    return limiter.stats() if limiter else {}
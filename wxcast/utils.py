@@ -41,32 +41,90 @@ def echo_dict(data,
     :param spaces: Number of spaces to offset values. Max length of keys.
     :param value_color: Color for values.
     """
+    click.echo(format_dict(data, no_color, key_color, spaces, value_color))
+
+
+def format_dict(data,
+                no_color,
+                key_color='green',
+                spaces=None,
+                value_color='blue'):
+    """
+    Format a dictionary pretty-print style.
+
+    Nested dictionaries are formatted in place with the same offset.
+
+    :param data: The dictionary of key:vals to format.
+    :param no_color: If true formats with no ascii color.
+    :param key_color: Color for dictionary keys.
+    :param spaces: Number of spaces to offset values. Max length of keys.
+    :param value_color: Color for values.
+    :return: The formatted lines as one string.
+    """
     if not spaces:
         spaces = get_max_key(data)
 
+    wrapper = TextWrapper(
+        width=(82 - spaces),
+        subsequent_indent=' ' * (spaces + 3)
+    )
+    lines = []
+
     for key, value in data.items():
+        if isinstance(value, dict):
+            lines.append(
+                format_dict(value, no_color, key_color, spaces, value_color)
+            )
+            continue
+
         title = '{spaces}{key}:  '.format(
             spaces=' ' * (spaces - len(key)),
             key=key
         )
-        wrapper = TextWrapper(
-            width=(82 - spaces),
-            subsequent_indent=' ' * (spaces + 3)
+        lines.append(
+            ''.join([
+                style_string(title, no_color, fg=key_color),
+                wrapper.fill(
+                    style_string(str(value), no_color, fg=value_color)
+                )
+            ])
         )
 
-        if isinstance(value, dict):
-            echo_dict(value, no_color, key_color, spaces, value_color)
-        else:
-            click.echo(
-                ''.join([
-                    style_string(title, no_color, fg=key_color),
-                    wrapper.fill(
-                        style_string(
-                            str(value), no_color, fg=value_color
-                        )
-                    )
-                ])
-            )
+    return '\n'.join(lines)
+
+
+def format_table(headers,
+                 rows,
+                 no_color,
+                 header_color='green',
+                 value_color='blue'):
+    """
+    Format rows of values as a table with aligned columns.
+
+    :param headers: List of column titles.
+    :param rows: Iterable of row tuples, values are printed as strings.
+    :param no_color: If true formats with no ascii color.
+    :param header_color: Color for the column titles.
+    :param value_color: Color for the rows.
+    :return: The formatted lines as one string.
+    """
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [
+        max([len(header)] + [len(row[index]) for row in rows])
+        for index, header in enumerate(headers)
+    ]
+
+    def format_row(values):
+        return '  '.join(
+            value.ljust(width) for value, width in zip(values, widths)
+        ).rstrip()
+
+    lines = [style_string(format_row(headers), no_color, fg=header_color)]
+    lines.extend(
+        style_string(format_row(row), no_color, fg=value_color)
+        for row in rows
+    )
+    return '\n'.join(lines)
 
 
 def echo_style(message, no_color, fg='yellow'):
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# wxcast: A Python API and cli to collect weather information.
+#
+# Copyright (c) 2021 Sean Marlow
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from wxcast.constants import WATCH_INTERVAL, WATCH_MAX_INTERVAL
+
+_MISSING = object()
+
+
+def poll(fetch,
+         interval=WATCH_INTERVAL,
+         max_interval=WATCH_MAX_INTERVAL,
+         backoff=2.0,
+         sleep=None):
+    """
+    Call fetch repeatedly and yield only the items that changed.
+
+    fetch returns an iterable of (name, marker, item) tuples. An item is
+    yielded when its marker differs from the last marker seen for the
+    same name. While nothing changes the delay between polls grows by
+    backoff up to max_interval, and resets to interval on a change.
+
+    :param fetch: Callable returning (name, marker, item) tuples.
+    :param interval: Seconds between polls after a change.
+    :param max_interval: Max seconds between polls.
+    :param backoff: Factor to grow the delay by when nothing changed.
+    :param sleep: Function used to wait between polls (time.sleep).
+    :return: Generator of changed items.
+    """
+    sleep = sleep or time.sleep
+    last = {}
+    delay = interval
+
+    while True:
+        changed = False
+
+        for name, marker, item in fetch():
+            if last.get(name, _MISSING) != marker:
+                last[name] = marker
+                changed = True
+                yield item
+
+        if changed:
+            delay = interval
+        else:
+            delay = min(delay * backoff, max(max_interval, interval))
+
+        sleep(delay)